@@ -1,3 +1,46 @@
-from django.contrib import admin
-
-# Register your models here.
+from django.contrib import admin
+from shoply.pagination import EstimatedCountPaginator
+from .models import Order, OrderAllocation, OrderItem, OrderStatusHistory
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    autocomplete_fields = ('product',)  # ✅ No <select> with every product
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
+
+class OrderStatusHistoryInline(admin.TabularInline):
+    model = OrderStatusHistory
+    extra = 0
+    can_delete = False
+    readonly_fields = ('previous_status', 'new_status', 'changed_at')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+class OrderAllocationInline(admin.TabularInline):
+    model = OrderAllocation
+    extra = 0
+    can_delete = False
+    readonly_fields = ('product', 'warehouse', 'quantity')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product', 'warehouse')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'is_paid', 'total_price', 'created_at')
+    list_select_related = ('user',)  # Order.__str__ and the user column read user.username
+    list_filter = ('status', ('created_at', admin.DateFieldListFilter))  # both indexed
+    search_fields = ('=id', '=user__email')  # exact lookups only; no LIKE scans
+    raw_id_fields = ('user',)
+    readonly_fields = ('created_at', 'updated_at')
+    ordering = ('-id',)
+    inlines = (OrderItemInline, OrderAllocationInline, OrderStatusHistoryInline)
+    # ✅ Planner estimate instead of COUNT(*) on large tables
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
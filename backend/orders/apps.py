@@ -1,9 +1,9 @@
-from django.apps import AppConfig
-
-
-class OrdersConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'orders'
-    
-    def ready(self):
+from django.apps import AppConfig
+
+
+class OrdersConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'orders'
+    
+    def ready(self):
         import orders.signals  # ✅ Register signals
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Order archival. archive_batch() moves closed orders created before a cutoff,
+with their items and status history, into the Archived* tables in one
+transaction per batch. The live tables and their indexes then only hold recent
+and open orders. order_history() and load_orders() let the history endpoints
+page through both tables as one list.
+"""
+from django.db import connection, transaction
+from django.db.models import Value
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, ArchivedOrderStatusHistory,
+    Order, OrderAllocation, OrderItem, OrderStatusHistory,
+)
+
+CLOSED_STATUSES = ('delivered', 'cancelled')
+ORDER_FIELDS = ['id', 'user_id', 'created_at', 'updated_at', 'total_price', 'is_paid', 'payment_id',
+                'payment_status', 'status', 'is_refunded', 'refund_id']
+
+
+def archivable(cutoff):
+    return Order.objects.filter(status__in=CLOSED_STATUSES, created_at__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size):
+    """Move up to ``batch_size`` closed orders created before ``cutoff``; returns how many moved."""
+    with transaction.atomic():
+        # Rows another transaction is changing are skipped and picked up by a later run
+        ids = list(archivable(cutoff).select_for_update(skip_locked=True)
+                   .order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return 0
+        ArchivedOrder.objects.bulk_create(
+            ArchivedOrder(**row) for row in Order.objects.filter(id__in=ids).values(*ORDER_FIELDS)
+        )
+        ArchivedOrderItem.objects.bulk_create(
+            ArchivedOrderItem(id=row['id'], order_id=row['order_id'], product_id=row['product_id'],
+                              product_name=row['product__name'], quantity=row['quantity'], price=row['price'])
+            for row in OrderItem.objects.filter(order_id__in=ids)
+            .values('id', 'order_id', 'product_id', 'product__name', 'quantity', 'price')
+        )
+        ArchivedOrderStatusHistory.objects.bulk_create(
+            ArchivedOrderStatusHistory(**row) for row in OrderStatusHistory.objects.filter(order_id__in=ids)
+            .values('id', 'order_id', 'previous_status', 'new_status', 'changed_at')
+        )
+        # Plain DELETEs: Model.delete() would fire the item signals that recompute order totals.
+        # Warehouse allocations are only needed while an order ships and are not archived.
+        for model, column in ((OrderAllocation, 'order_id'), (OrderStatusHistory, 'order_id'),
+                              (OrderItem, 'order_id'), (Order, 'id')):
+            _delete_where_in(model, column, ids)
+    return len(ids)
+
+
+def _delete_where_in(model, column, ids):
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(column)} IN ({placeholders})", ids)
+
+
+def order_history(user):
+    """Live and archived orders of ``user`` as one ``(id, created_at, archived)`` values queryset, newest first."""
+    live = Order.objects.filter(user=user).values('id', 'created_at').annotate(archived=Value(False))
+    archived = ArchivedOrder.objects.filter(user=user).values('id', 'created_at').annotate(archived=Value(True))
+    return live.union(archived, all=True).order_by('-created_at', '-id')
+
+
+def load_orders(rows):
+    """Order / ArchivedOrder instances, items prefetched, for order_history() rows in the same order."""
+    live_ids = [row['id'] for row in rows if not row['archived']]
+    archived_ids = [row['id'] for row in rows if row['archived']]
+    live = Order.objects.prefetch_related('items__product').in_bulk(live_ids) if live_ids else {}
+    archived = ArchivedOrder.objects.prefetch_related('items').in_bulk(archived_ids) if archived_ids else {}
+    return [(archived if row['archived'] else live)[row['id']] for row in rows]
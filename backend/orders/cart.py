@@ -0,0 +1,70 @@
+"""
+Server-side carts. Each change touches one CartItem row and adjusts the cart's
+running totals in the same transaction; product names, prices and stock come
+from the product cache, so no product row is read or locked until checkout.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from products import cache as product_cache
+from .models import Cart, CartItem
+from .services import create_order
+
+
+def get_cart(user):
+    return Cart.objects.get_or_create(user=user)[0]
+
+
+def set_quantity(user, product_id, quantity, add=False):
+    """
+    Set the quantity of one product (``add=True`` adds to it instead); 0 removes
+    the line. Stock is only checked against the cached hint here; checkout has
+    the final say. Returns the updated cart.
+    """
+    product = product_cache.get_product(product_id)
+    if product is None:
+        raise ValidationError("Product not found.")
+
+    with transaction.atomic():
+        # The cart row serialises concurrent changes to the same cart, and only those
+        cart, _ = Cart.objects.select_for_update().get_or_create(user=user)
+        item = cart.items.filter(product_id=product_id).first()
+        old_quantity, old_total = (item.quantity, item.quantity * item.unit_price) if item else (0, 0)
+        new_quantity = old_quantity + quantity if add else quantity
+        if new_quantity > product['stock']:
+            raise ValidationError(f"Only {product['stock']} of {product['name']} in stock.")
+
+        if new_quantity == 0:
+            if item:
+                item.delete()
+        elif item:
+            item.quantity, item.unit_price = new_quantity, product['price']
+            item.save(update_fields=['quantity', 'unit_price'])
+        else:
+            if cart.items.count() >= settings.CART_MAX_LINES:
+                raise ValidationError(f"A cart can hold at most {settings.CART_MAX_LINES} products.")
+            CartItem.objects.create(cart=cart, product_id=product_id, quantity=new_quantity,
+                                    unit_price=product['price'])
+
+        cart.item_count += new_quantity - old_quantity
+        cart.total_price += new_quantity * product['price'] - old_total
+        cart.save(update_fields=['item_count', 'total_price', 'updated_at'])
+    return cart
+
+
+def remove_item(user, product_id):
+    return set_quantity(user, product_id, 0)
+
+
+def checkout(user, destination=None):
+    """Turn the cart into an Order at current prices and empty it, all or nothing."""
+    with transaction.atomic():
+        cart = Cart.objects.select_for_update().filter(user=user).first()
+        lines = list(cart.items.values_list('product_id', 'quantity')) if cart else []
+        if not lines:
+            raise ValidationError("Your cart is empty.")
+        order = create_order(user, [(product_id, quantity, None) for product_id, quantity in lines], destination)
+        cart.items.all().delete()
+        cart.item_count, cart.total_price = 0, 0
+        cart.save(update_fields=['item_count', 'total_price', 'updated_at'])
+    return order
@@ -0,0 +1,41 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from orders.archive import archivable, archive_batch
+
+
+class Command(BaseCommand):
+    help = ("Move delivered and cancelled orders created more than --older-than-days ago "
+            "(ORDER_ARCHIVE_AFTER_DAYS) into the archive tables, in batches of --batch-size "
+            "orders per transaction with a --sleep pause between batches to limit load on "
+            "the live database. Safe to interrupt and rerun.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--sleep', type=float, default=0.5, help="Seconds between batches.")
+        parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the orders that would move.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        if options['dry_run']:
+            self.stdout.write(f"{archivable(cutoff).count():,} orders created before {cutoff:%Y-%m-%d} would be archived")
+            return
+
+        started = time.perf_counter()
+        moved = batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            count = archive_batch(cutoff, options['batch_size'])
+            if not count:
+                break
+            moved += count
+            batches += 1
+            self.stdout.write(f"Batch {batches}: {count} orders")
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(f"Archived {moved:,} orders in {batches} batches, {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,42 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from orders.user_stats import backfill
+
+
+class Command(BaseCommand):
+    help = ("Recompute UserOrderStats from the orders table, a range of user ids at a time. "
+            "Orders placed while a chunk is being recomputed can be counted twice or missed, "
+            "so run it off-peak or rerun it for the affected users (--from-id / --to-id).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Users per transaction.")
+        parser.add_argument('--from-id', type=int, default=None)
+        parser.add_argument('--to-id', type=int, default=None)
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help="Seconds to pause between chunks, to leave the database room.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        users = get_user_model().objects.order_by('pk')
+        if options['from_id'] is not None:
+            users = users.filter(pk__gte=options['from_id'])
+        if options['to_id'] is not None:
+            users = users.filter(pk__lte=options['to_id'])
+
+        started = time.perf_counter()
+        done, last_id = 0, None
+        while True:
+            # Keyset pagination: each chunk starts after the last id of the previous one
+            chunk = users.filter(pk__gt=last_id) if last_id is not None else users
+            user_ids = list(chunk.values_list('pk', flat=True)[:options['chunk_size']])
+            if not user_ids:
+                break
+            with transaction.atomic():
+                done += backfill(user_ids)
+            last_id = user_ids[-1]
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(f"Backfilled order stats for {done:,} users in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,109 @@
+import statistics
+import threading
+import time
+import uuid
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections, transaction
+from django.test.utils import override_settings
+from products.models import Product, ProductChange
+from orders.models import Order
+from orders.services import create_order
+
+MODES = ('lock', 'conditional')
+
+
+class Command(BaseCommand):
+    help = ("Place orders for one hot product from many threads in each ORDER_STOCK_DECREMENT "
+            "mode and compare throughput with how long each order holds the product row lock "
+            "(from the locking statement to commit). Run it against PostgreSQL: SQLite locks "
+            "the whole database, so it cannot show row-lock contention.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=50, help="Orders per thread and mode.")
+        parser.add_argument('--lines', type=int, default=5,
+                            help="Items per order: the hot product plus products nobody else buys.")
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['orders'] < 1 or options['lines'] < 1:
+            raise CommandError("--threads, --orders and --lines must be at least 1.")
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                f"Running on {connection.vendor}: expect database-level locking, not row locks."))
+
+        tag = uuid.uuid4().hex[:8]
+        user = get_user_model().objects.create_user(
+            username=f"bench-{tag}", email=f"bench-{tag}@example.com", password=None)
+        total_orders = options['threads'] * options['orders']
+        hot = Product.objects.create(name=f"Hot {tag}", price=1, stock=total_orders * len(MODES))
+        cold = [Product.objects.create(name=f"Cold {tag} {n}", price=1, stock=total_orders * len(MODES))
+                for n in range(options['threads'] * (options['lines'] - 1))]
+        try:
+            for mode in MODES:
+                with override_settings(ORDER_STOCK_DECREMENT=mode):
+                    self.report(mode, *self.run(user, hot, cold, options))
+        finally:
+            Order.objects.filter(user=user).delete()
+            product_ids = [hot.pk, *(product.pk for product in cold)]
+            Product.objects.filter(pk__in=product_ids).delete()
+            ProductChange.objects.filter(product_id__in=product_ids).delete()
+            user.delete()
+
+    def run(self, user, hot, cold, options):
+        holds, waits, failures = [], [], []
+        state = threading.local()  # when the current thread's open order took its first lock
+        product_table = Product._meta.db_table
+        start = threading.Barrier(options['threads'] + 1)
+        per_thread = options['lines'] - 1
+
+        def lock_timer(execute, sql, params, many, context):
+            # The row lock is taken by SELECT ... FOR UPDATE ('lock') or by the UPDATE itself
+            takes_lock = product_table in sql and (sql.startswith('UPDATE') or 'FOR UPDATE' in sql)
+            started = time.perf_counter()
+            result = execute(sql, params, many, context)
+            if takes_lock and state.locked_at is None:
+                state.locked_at = locked_at = time.perf_counter()
+                waits.append(locked_at - started)
+                transaction.on_commit(lambda: holds.append(time.perf_counter() - locked_at))
+            return result
+
+        def buyer(number):
+            lines = [(hot.pk, 1, None)] + [(product.pk, 1, None)
+                                           for product in cold[number * per_thread:(number + 1) * per_thread]]
+            try:
+                with connection.execute_wrapper(lock_timer):
+                    start.wait()
+                    for _ in range(options['orders']):
+                        state.locked_at = None
+                        try:
+                            create_order(user, lines)
+                        except (DatabaseError, ValidationError) as e:
+                            failures.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buyer, args=(n,)) for n in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - began, holds, waits, failures
+
+    def report(self, mode, elapsed, holds, waits, failures):
+        def ms(values, q):
+            values = sorted(values)
+            return values[max(int(len(values) * q) - 1, 0)] * 1000 if values else 0.0
+
+        self.stdout.write(
+            f"{mode:<12} {len(holds) / elapsed:8.1f} orders/s  "
+            f"lock hold p50 {ms(holds, 0.5):7.3f} ms p95 {ms(holds, 0.95):7.3f} ms  "
+            f"lock wait p50 {ms(waits, 0.5):7.3f} ms p95 {ms(waits, 0.95):7.3f} ms  "
+            f"failed {len(failures)}"
+        )
+        if holds:
+            self.stdout.write(f"{'':<12} mean lock hold {statistics.mean(holds) * 1000:.3f} ms "
+                              f"over {len(holds)} orders")
@@ -0,0 +1,221 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import accumulate
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from orders.models import Order, OrderItem, OrderStatusHistory
+from products.models import Product, ProductChange
+
+User = get_user_model()
+
+# Final status of generated orders and how often it occurs
+STATUS_WEIGHTS = {'delivered': 55, 'shipped': 15, 'processing': 10, 'pending': 12, 'cancelled': 8}
+# Transitions that lead to each final status (cancelled orders were cancelled while processing)
+STATUS_PATHS = {
+    'pending': [],
+    'processing': ['processing'],
+    'shipped': ['processing', 'shipped'],
+    'delivered': ['processing', 'shipped', 'delivered'],
+    'cancelled': ['processing', 'cancelled'],
+}
+QUANTITY_WEIGHTS = (70, 20, 7, 3)  # quantity 1..4
+
+
+class RowInserter:
+    """
+    Multi-row INSERTs for one model: each statement carries up to ROWS_PER_STATEMENT
+    ``VALUES (...), (...)`` tuples, so a batch costs a handful of round-trips on any
+    backend. Rows are plain tuples, so no model instances are created and no
+    signals fire; the statement for each row count is built once and reused.
+    """
+    ROWS_PER_STATEMENT = 1000
+
+    def __init__(self, model, field_names, using=DEFAULT_DB_ALIAS):
+        self.connection = connections[using]
+        self.fields = [model._meta.get_field(name) for name in field_names]
+        quote = self.connection.ops.quote_name
+        columns = ', '.join(quote(field.column) for field in self.fields)
+        self.prefix = f"INSERT INTO {quote(model._meta.db_table)} ({columns}) "
+        # Stay under the backend's bind-parameter limit (SQLite: 999 or 32766; PostgreSQL: 65535)
+        max_params = self.connection.features.max_query_params or 65535
+        self.rows_per_statement = max(1, min(self.ROWS_PER_STATEMENT, max_params // len(self.fields)))
+        self.statements = {}
+        # Only datetimes and decimals need backend adaptation (e.g. SQLite stores naive UTC)
+        self.adapters = [
+            (index, field) for index, field in enumerate(self.fields)
+            if field.get_internal_type() in ('DateTimeField', 'DecimalField')
+        ]
+
+    def statement(self, count):
+        sql = self.statements.get(count)
+        if sql is None:
+            placeholders = [['%s'] * len(self.fields)] * count
+            sql = self.statements[count] = self.prefix + self.connection.ops.bulk_insert_sql(self.fields, placeholders)
+        return sql
+
+    def insert(self, cursor, rows):
+        if self.adapters:
+            rows = [self.adapt(row) for row in rows]
+        for start in range(0, len(rows), self.rows_per_statement):
+            chunk = rows[start:start + self.rows_per_statement]
+            cursor.execute(self.statement(len(chunk)), [value for row in chunk for value in row])
+
+    def adapt(self, row):
+        row = list(row)
+        for index, field in self.adapters:
+            row[index] = field.get_db_prep_save(row[index], self.connection)
+        return row
+
+
+def next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = ("Generate a deterministic synthetic dataset (products with Zipf-distributed "
+            "popularity, users, orders with items and status histories) with multi-row "
+            "INSERT ... VALUES (...), (...) statements. Per-row save() and signals are bypassed; the product change "
+            "log is written in bulk so delta sync clients still see the new products.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--orders', type=int, default=1_000_000)
+        parser.add_argument('--items-per-order', type=int, default=10, help="Average items per order.")
+        parser.add_argument('--zipf', type=float, default=1.1, help="Zipf exponent of product popularity.")
+        parser.add_argument('--days', type=int, default=365, help="Orders are spread over this many days.")
+        parser.add_argument('--end-date', default='2025-01-01', help="Day the generated history ends (UTC).")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000, help="Orders (or products/users) per transaction.")
+        parser.add_argument('--password', default='password', help="Password of every generated user.")
+
+    def handle(self, *args, **options):
+        if options['products'] < 1 or options['users'] < 1 or options['items_per_order'] < 1:
+            raise CommandError("--products, --users and --items-per-order must be at least 1.")
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.end = timezone.make_aware(datetime.fromisoformat(options['end_date']), dt_timezone.utc)
+        self.span = timedelta(days=options['days']).total_seconds()
+
+        products = self.generate_products(options['products'])
+        user_ids = self.generate_users(options['users'], options['password'])
+        self.generate_orders(options['orders'], options['items_per_order'], products, user_ids, options['zipf'])
+
+        # Rows were inserted with explicit ids; move the sequences past them
+        sql = connection.ops.sequence_reset_sql(
+            no_style(), [Product, ProductChange, User, Order, OrderItem, OrderStatusHistory]
+        )
+        if sql:
+            with connection.cursor() as cursor:
+                for statement in sql:
+                    cursor.execute(statement)
+
+    def random_time(self):
+        return self.end - timedelta(seconds=self.rng.random() * self.span)
+
+    def batches(self, first, count):
+        for offset in range(0, count, self.batch_size):
+            yield range(first + offset, first + min(offset + self.batch_size, count))
+
+    def report(self, label, count, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label:<12} {count:>12,} rows  {elapsed:7.1f}s  {count / max(elapsed, 1e-9):>10,.0f} rows/s")
+
+    def generate_products(self, count):
+        """Returns (id, price) of every new product."""
+        started = time.perf_counter()
+        product_rows = RowInserter(Product, ['id', 'name', 'description', 'price', 'stock',
+                                             'created_at', 'updated_at'])
+        change_rows = RowInserter(ProductChange, ['product_id', 'action', 'changed_at'])
+        products = []
+        for ids in self.batches(next_id(Product), count):
+            rows, changes = [], []
+            for pk in ids:
+                price = Decimal(f"{min(max(self.rng.lognormvariate(3.5, 1.0), 1), 5000):.2f}")
+                created = self.random_time() - timedelta(days=30)
+                rows.append((pk, f"Product {pk}", f"Synthetic product {pk}", price,
+                             self.rng.randint(0, 500), created, created))
+                changes.append((pk, ProductChange.CREATED, created))
+                products.append((pk, price))
+            with transaction.atomic(), connection.cursor() as cursor:
+                product_rows.insert(cursor, rows)
+                change_rows.insert(cursor, changes)
+        self.report("products", count, started)
+        return products
+
+    def generate_users(self, count, password):
+        started = time.perf_counter()
+        user_rows = RowInserter(User, ['id', 'username', 'email', 'password', 'first_name', 'last_name',
+                                       'is_superuser', 'is_staff', 'is_active', 'is_verified', 'date_joined'])
+        password_hash = make_password(password)  # hashing per user would dominate the run
+        first = next_id(User)
+        for ids in self.batches(first, count):
+            rows = [(pk, f"synthetic{pk}", f"synthetic{pk}@example.com", password_hash, '', '',
+                     False, False, True, True, self.random_time()) for pk in ids]
+            with transaction.atomic(), connection.cursor() as cursor:
+                user_rows.insert(cursor, rows)
+        self.report("users", count, started)
+        return range(first, first + count)
+
+    def generate_orders(self, count, items_per_order, products, user_ids, zipf):
+        started = time.perf_counter()
+        order_rows = RowInserter(Order, ['id', 'user_id', 'created_at', 'updated_at', 'total_price', 'is_paid',
+                                         'payment_id', 'payment_status', 'status', 'is_refunded'])
+        item_rows = RowInserter(OrderItem, ['id', 'order_id', 'product_id', 'quantity', 'price'])
+        history_rows = RowInserter(OrderStatusHistory, ['id', 'order_id', 'previous_status', 'new_status',
+                                                        'changed_at'])
+        # Popularity rank is independent of id and price; the most popular product gets weight 1
+        ranked = products[:]
+        self.rng.shuffle(ranked)
+        cum_weights = list(accumulate(1 / rank ** zipf for rank in range(1, len(ranked) + 1)))
+        statuses, status_weights = list(STATUS_WEIGHTS), list(accumulate(STATUS_WEIGHTS.values()))
+        quantities, quantity_weights = range(1, len(QUANTITY_WEIGHTS) + 1), list(accumulate(QUANTITY_WEIGHTS))
+
+        item_id, history_id = next_id(OrderItem), next_id(OrderStatusHistory)
+        total_items = 0
+        for batch_number, ids in enumerate(self.batches(next_id(Order), count)):
+            orders, items, histories = [], [], []
+            for order_id in ids:
+                created = self.random_time()
+                final_status = self.rng.choices(statuses, cum_weights=status_weights)[0]
+                size = self.rng.randint(1, 2 * items_per_order - 1)
+                picks = self.rng.choices(ranked, cum_weights=cum_weights, k=size)
+                amounts = self.rng.choices(quantities, cum_weights=quantity_weights, k=size)
+
+                lines = {}
+                for (pk, price), quantity in zip(picks, amounts):
+                    lines[pk] = (price, quantity + lines.get(pk, (None, 0))[1])
+                total = Decimal(0)
+                for pk, (price, quantity) in lines.items():
+                    items.append((item_id, order_id, pk, quantity, price))
+                    item_id += 1
+                    total += price * quantity
+
+                previous_status, changed = 'pending', created
+                for new_status in STATUS_PATHS[final_status]:
+                    changed += timedelta(hours=self.rng.uniform(1, 72))
+                    histories.append((history_id, order_id, previous_status, new_status, changed))
+                    history_id += 1
+                    previous_status = new_status
+
+                paid = final_status not in ('pending', 'cancelled')
+                orders.append((order_id, self.rng.choice(user_ids), created, changed, total, paid,
+                               f"synthetic_{order_id}" if paid else None, 'paid' if paid else 'unpaid',
+                               final_status, False))
+
+            with transaction.atomic(), connection.cursor() as cursor:
+                order_rows.insert(cursor, orders)
+                item_rows.insert(cursor, items)
+                history_rows.insert(cursor, histories)
+            total_items += len(items)
+            if batch_number % 20 == 19:
+                self.stdout.write(f"  {(batch_number + 1) * self.batch_size:,} / {count:,} orders")
+        self.report("orders", count, started)
+        self.report("order items", total_items, started)
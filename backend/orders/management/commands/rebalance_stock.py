@@ -0,0 +1,72 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from products.inventory import apportion
+from products.models import StockLevel
+from orders.models import OrderAllocation
+
+
+class Command(BaseCommand):
+    help = ("Redistribute each product's stock across the warehouses that carry it, in "
+            "proportion to the units each warehouse shipped over the last --days (evenly "
+            "without history). Inactive warehouses are emptied. Products are processed in "
+            "chunks; each chunk locks its stock levels and is written with one UPDATE.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help="Demand history to weight by.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Products per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Report the moves without writing them.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        started = time.perf_counter()
+        since = timezone.now() - timedelta(days=options['days'])
+        product_ids = list(StockLevel.objects.order_by('product_id')
+                           .values_list('product_id', flat=True).distinct())
+        moved = changed = 0
+        for start in range(0, len(product_ids), options['chunk_size']):
+            chunk = product_ids[start:start + options['chunk_size']]
+            with transaction.atomic():
+                units, rows = self.rebalance(chunk, since, options['dry_run'])
+            moved += units
+            changed += rows
+        verb = "Would move" if options['dry_run'] else "Moved"
+        self.stdout.write(f"{verb} {moved:,} units ({changed:,} stock levels) across "
+                          f"{len(product_ids):,} products in {time.perf_counter() - started:.1f}s")
+
+    def rebalance(self, product_ids, since, dry_run):
+        levels = list(StockLevel.objects.select_for_update()
+                      .filter(product_id__in=product_ids).select_related('warehouse').order_by('pk'))
+        demand = {
+            (row['product_id'], row['warehouse_id']): row['units']
+            for row in OrderAllocation.objects.filter(product_id__in=product_ids, order__created_at__gte=since)
+            .values('product_id', 'warehouse_id').annotate(units=Sum('quantity')).order_by()
+        }
+        by_product = {}
+        for level in levels:
+            by_product.setdefault(level.product_id, []).append(level)
+
+        updates, moved = [], 0
+        for product_id, product_levels in by_product.items():
+            active = [level for level in product_levels if level.warehouse.is_active]
+            if not active:
+                continue
+            total = sum(level.quantity for level in product_levels)
+            targets = dict(zip(
+                (level.pk for level in active),
+                apportion(total, [demand.get((product_id, level.warehouse_id), 0) for level in active]),
+            ))
+            for level in product_levels:
+                target = targets.get(level.pk, 0)
+                if target != level.quantity:
+                    moved += max(level.quantity - target, 0)
+                    level.quantity = target
+                    updates.append(level)
+        if updates and not dry_run:
+            # Totals per product are unchanged, so Product.stock needs no resync
+            StockLevel.objects.bulk_update(updates, ['quantity'])
+        return moved, len(updates)
@@ -1,33 +1,33 @@
-# Generated by Django 5.1.7 on 2025-03-23 17:06
-
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('orders', '0002_order_status'),
-    ]
-
-    operations = [
-        migrations.AddField(
-            model_name='order',
-            name='is_refunded',
-            field=models.BooleanField(default=False),
-        ),
-        migrations.AddField(
-            model_name='order',
-            name='payment_id',
-            field=models.CharField(blank=True, max_length=100, null=True),
-        ),
-        migrations.AddField(
-            model_name='order',
-            name='payment_status',
-            field=models.CharField(default='pending', max_length=20),
-        ),
-        migrations.AddField(
-            model_name='order',
-            name='refund_id',
-            field=models.CharField(blank=True, max_length=100, null=True),
-        ),
-    ]
+# Generated by Django 5.1.7 on 2025-03-23 17:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='is_refunded',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='payment_id',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='payment_status',
+            field=models.CharField(default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='refund_id',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+    ]
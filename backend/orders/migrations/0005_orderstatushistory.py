@@ -1,24 +1,24 @@
-# Generated by Django 5.1.7 on 2025-03-23 17:27
-
-import django.db.models.deletion
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('orders', '0004_alter_order_payment_status'),
-    ]
-
-    operations = [
-        migrations.CreateModel(
-            name='OrderStatusHistory',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('previous_status', models.CharField(max_length=20)),
-                ('new_status', models.CharField(max_length=20)),
-                ('changed_at', models.DateTimeField(auto_now_add=True)),
-                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_history', to='orders.order')),
-            ],
-        ),
-    ]
+# Generated by Django 5.1.7 on 2025-03-23 17:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_alter_order_payment_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_status', models.CharField(max_length=20)),
+                ('new_status', models.CharField(max_length=20)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_history', to='orders.order')),
+            ],
+        ),
+    ]
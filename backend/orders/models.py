@@ -1,110 +1,233 @@
-from django.conf import settings
-from django.db import models, transaction
-from django.core.exceptions import ValidationError
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
-from products.models import Product
-
-# orders/models.py
-class Order(models.Model):
-    STATUS_CHOICES = [
-        ('pending', 'Pending'),
-        ('processing', 'Processing'),
-        ('shipped', 'Shipped'),
-        ('delivered', 'Delivered'),
-        ('cancelled', 'Cancelled'),
-    ]
-
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders')
-    created_at = models.DateTimeField(auto_now_add=True)
-    total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    is_paid = models.BooleanField(default=False)
-    payment_id = models.CharField(max_length=100, blank=True, null=True)
-    payment_status = models.CharField(max_length=20, default='unpaid')  # unpaid, paid, failed
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    is_refunded = models.BooleanField(default=False)
-    refund_id = models.CharField(max_length=100, blank=True, null=True)
-
-    def update_total_price(self):
-        # Safely recalculate the total price
-        self.total_price = sum(item.price * item.quantity for item in self.items.all())
-        self.save(update_fields=['total_price'])
-    
-    def save(self, *args, **kwargs):
-            """Track status changes automatically before saving."""
-            if self.pk:
-                old_order = Order.objects.get(pk=self.pk)
-                if old_order.status != self.status:
-                    OrderStatusHistory.objects.create(
-                        order=self,
-                        previous_status=old_order.status,
-                        new_status=self.status
-                    )
-
-            super().save(*args, **kwargs)
-            
-    def __str__(self):
-        return f"Order #{self.id} - {self.get_status_display()} by {self.user.username}"
-
-class OrderItem(models.Model):
-    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
-    product = models.ForeignKey(Product, on_delete=models.CASCADE)
-    quantity = models.PositiveIntegerField(default=1)
-    price = models.DecimalField(max_digits=10, decimal_places=2)
-
-    def clean(self):
-        """Check stock availability before saving."""
-        if self.quantity > self.product.stock:
-            raise ValidationError(f"Insufficient stock for {self.product.name}. Available: {self.product.stock}")
-
-    @transaction.atomic
-    def save(self, *args, **kwargs):
-        """Ensure stock update is atomic and prevent race conditions."""
-        with transaction.atomic():
-            product = Product.objects.select_for_update().get(id=self.product.id)
-
-            if self.quantity > product.stock:
-                raise ValidationError(f"Insufficient stock for {product.name}. Available: {product.stock}")
-
-            # If price is not set, use product price
-            if not self.price:
-                self.price = product.price
-
-            # Reduce stock
-            product.stock -= self.quantity
-            product.save()
-
-            super().save(*args, **kwargs)
-
-            # Update order total price
-            self.order.update_total_price()
-
-    def __str__(self):
-        return f"{self.quantity} x {self.product.name}"
-
-class OrderStatusHistory(models.Model):
-    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_history')
-    previous_status = models.CharField(max_length=20)
-    new_status = models.CharField(max_length=20)
-    changed_at = models.DateTimeField(auto_now_add=True)
-
-    def __str__(self):
-        return f"Order {self.order.id} changed from {self.previous_status} to {self.new_status} on {self.changed_at}"
-
-@receiver(post_save, sender=OrderItem)
-@receiver(post_delete, sender=OrderItem)
-def update_order_total(sender, instance, **kwargs):
-    order = instance.order
-    order.total_price = sum(item.price * item.quantity for item in order.items.all())
-    order.save()
-
-@receiver(post_save, sender=Order)
-def log_order_status_change(sender, instance, created, **kwargs):
-    if not created:
-        previous_status = instance.__class__.objects.get(pk=instance.pk).status
-        if previous_status != instance.status:
-            OrderStatusHistory.objects.create(
-                order=instance,
-                previous_status=previous_status,
-                new_status=instance.status
+from django.conf import settings
+from django.db import models, transaction
+from django.core.exceptions import ValidationError
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from products import inventory
+from products.models import Product, Warehouse
+from .signals import order_cancelled, order_paid, order_refunded, order_updated
+
+# orders/models.py
+class Order(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('shipped', 'Shipped'),
+        ('delivered', 'Delivered'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    is_paid = models.BooleanField(default=False)
+    payment_id = models.CharField(max_length=100, blank=True, null=True)
+    payment_status = models.CharField(max_length=20, default='unpaid')  # unpaid, paid, failed
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    is_refunded = models.BooleanField(default=False)
+    refund_id = models.CharField(max_length=100, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # ✅ Admin list filters and date-range reports
+            models.Index(fields=['status'], name='order_status_idx'),
+            models.Index(fields=['created_at'], name='order_created_at_idx'),
+        ]
+
+    def update_total_price(self):
+        # Safely recalculate the total price
+        self.total_price = sum(item.price * item.quantity for item in self.items.all())
+        self.save(update_fields=['total_price', 'updated_at'])
+    
+    def save(self, *args, **kwargs):
+            """Track status changes automatically before saving."""
+            was_paid, was_cancelled, was_refunded = False, False, False
+            old_order = None
+            if self.pk:
+                old_order = Order.objects.get(pk=self.pk)
+                was_paid, was_cancelled = old_order.is_paid, old_order.status == 'cancelled'
+                was_refunded = old_order.is_refunded
+                if old_order.status != self.status:
+                    OrderStatusHistory.objects.create(
+                        order=self,
+                        previous_status=old_order.status,
+                        new_status=self.status
+                    )
+
+            super().save(*args, **kwargs)
+
+            if self.is_paid and not was_paid:
+                order_paid.send(sender=Order, order=self)
+            if self.status == 'cancelled' and not was_cancelled:
+                order_cancelled.send(sender=Order, order=self)
+            if self.is_refunded and not was_refunded:
+                order_refunded.send(sender=Order, order=self)
+            if old_order is not None:
+                order_updated.send(sender=Order, order=self, previous=old_order,
+                                   update_fields=kwargs.get('update_fields'))
+            
+    def __str__(self):
+        return f"Order #{self.id} - {self.get_status_display()} by {self.user.username}"
+
+class OrderItem(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def clean(self):
+        """Check stock availability before saving."""
+        if self.quantity > self.product.stock:
+            raise ValidationError(f"Insufficient stock for {self.product.name}. Available: {self.product.stock}")
+
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        """Save the item and take its stock in one transaction (see ORDER_STOCK_DECREMENT)."""
+        with transaction.atomic():
+            product = inventory.read_products([self.product_id])[self.product_id]
+
+            # If price is not set, use product price
+            if not self.price:
+                self.price = product.price
+
+            super().save(*args, **kwargs)
+
+            # Update order total price
+            self.order.update_total_price()
+
+            # Reduce stock last: a conditional UPDATE that fails rolls the item back
+            inventory.decrement_stock({self.product_id: self.quantity})
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.name}"
+
+class OrderStatusHistory(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_history')
+    previous_status = models.CharField(max_length=20)
+    new_status = models.CharField(max_length=20)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Order {self.order.id} changed from {self.previous_status} to {self.new_status} on {self.changed_at}"
+
+class OrderAllocation(models.Model):
+    """Which warehouse ships how many units of each product; written by services.create_order()."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='allocations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, related_name='+')
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.quantity} x product {self.product_id} from warehouse {self.warehouse_id}"
+
+class ArchivedOrder(models.Model):
+    """
+    A closed order moved out of the live tables by orders/archive.py, keeping its
+    original id. Read-only; order history endpoints read it alongside Order.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_orders')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    is_paid = models.BooleanField()
+    payment_id = models.CharField(max_length=100, blank=True, null=True)
+    payment_status = models.CharField(max_length=20)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    is_refunded = models.BooleanField()
+    refund_id = models.CharField(max_length=100, blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_order_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.id}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    # Archives outlive products: keep the name, and the id only while the product exists
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='+')
+    product_name = models.CharField(max_length=100)
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name}"
+
+class ArchivedOrderStatusHistory(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='status_history')
+    previous_status = models.CharField(max_length=20)
+    new_status = models.CharField(max_length=20)
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Archived order {self.order_id} changed from {self.previous_status} to {self.new_status}"
+
+class UserOrderStats(models.Model):
+    """
+    Per-customer order figures for account pages and support tools, kept up to date
+    by orders/user_stats.py as orders are placed, paid, refunded and cancelled
+    (rebuild with the backfill_user_order_stats command).
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                                primary_key=True, related_name='order_stats')
+    order_count = models.PositiveIntegerField(default=0)  # placed and not cancelled
+    paid_order_count = models.PositiveIntegerField(default=0)  # paid and not refunded
+    cancelled_order_count = models.PositiveIntegerField(default=0)
+    lifetime_spend = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # paid minus refunded
+    last_order_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Order stats of user {self.user_id}"
+
+class Cart(models.Model):
+    """
+    One per user. ``item_count`` and ``total_price`` are running totals kept by
+    orders/cart.py on every change, so reading a cart never sums its items.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cart')
+    item_count = models.PositiveIntegerField(default=0)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Cart of {self.user}"
+
+class CartItem(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)  # price when last added
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='cart_item_product_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x product {self.product_id}"
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def update_order_total(sender, instance, **kwargs):
+    order = instance.order
+    order.total_price = sum(item.price * item.quantity for item in order.items.all())
+    order.save()
+
+@receiver(post_save, sender=Order)
+def log_order_status_change(sender, instance, created, **kwargs):
+    if not created:
+        previous_status = instance.__class__.objects.get(pk=instance.pk).status
+        if previous_status != instance.status:
+            OrderStatusHistory.objects.create(
+                order=instance,
+                previous_status=previous_status,
+                new_status=instance.status
             )
\ No newline at end of file
@@ -1,105 +1,148 @@
-from rest_framework import serializers
-from django.db import transaction
-from .models import Order, OrderItem
-from products.models import Product
-
-class OrderItemSerializer(serializers.ModelSerializer):
-    product_name = serializers.ReadOnlyField(source='product.name')
-
-    class Meta:
-        model = OrderItem
-        fields = ['id', 'product', 'product_name', 'quantity', 'price']
-
-class OrderSerializer(serializers.ModelSerializer):
-    items = OrderItemSerializer(many=True)  # ✅ Nested Serializer
-
-    class Meta:
-        model = Order
-        fields = ['id', 'created_at', 'total_price', 'is_paid', 'status', 'items']
-
-    def validate_items(self, value):
-        if not value:
-            raise serializers.ValidationError("Order must contain at least one item.")
-        return value
-
-    @transaction.atomic  # ✅ Ensures atomicity
-    def create(self, validated_data):
-        items_data = validated_data.pop('items', [])
-        order = Order.objects.create(user=self.context['request'].user, **validated_data)
-        total = 0
-        stock_rollback = []  # ✅ Track stock rollback
-        
-        try:
-            for item_data in items_data:
-                product = Product.objects.select_for_update().get(id=item_data['product'].id)
-
-                # ✅ Check stock
-                if item_data['quantity'] > product.stock:
-                    raise serializers.ValidationError(
-                        f"Insufficient stock for {product.name}. Available: {product.stock}"
-                    )
-
-                order_item = OrderItem.objects.create(
-                    order=order,
-                    product=product,
-                    quantity=item_data['quantity'],
-                    price=item_data.get('price', product.price)
-                )
-
-                total += float(order_item.price) * order_item.quantity
-                stock_rollback.append((product, item_data['quantity']))
-                product.stock -= item_data['quantity']
-                product.save()
-
-            order.total_price = total
-            order.save()
-            return order
-
-        except Exception as e:
-            # ✅ Rollback stock on failure
-            for product, quantity in stock_rollback:
-                product.stock += quantity
-                product.save()
-            raise e  # Re-raise the exception after rollback
-
-    def to_representation(self, instance):
-        response = super().to_representation(instance)
-        response['items'] = OrderItemSerializer(instance.items.all(), many=True).data
-        return response
-
-class PaymentSerializer(serializers.Serializer):
-    order_id = serializers.IntegerField()
-    token = serializers.CharField(max_length=100)  # Stripe payment token
-
-    def validate(self, data):
-        try:
-            order = Order.objects.get(id=data['order_id'], is_paid=False)
-        except Order.DoesNotExist:
-            raise serializers.ValidationError("Order not found or already paid.")
-        return data
-        
-    class Meta:
-        model = Order
-        fields = ['payment_id', 'payment_status', 'is_paid']
-
-    def validate_payment_status(self, value):
-        if value not in ['success', 'failure', 'pending']:
-            raise serializers.ValidationError("Invalid payment status.")
-        return value
-
-class CancellationSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Order
-        fields = ['status', 'is_refunded', 'refund_id']
-
-    def validate_status(self, value):
-        if value != 'cancelled':
-            raise serializers.ValidationError("Status must be 'cancelled' to initiate a refund.")
-        return value
-
-    def update(self, instance, validated_data):
-        # Simulate refund process if paid
-        if instance.is_paid:
-            validated_data['is_refunded'] = True
-            validated_data['refund_id'] = f"REF-{instance.id}"
-        return super().update(instance, validated_data)
\ No newline at end of file
+from rest_framework import serializers
+from django.core.exceptions import ValidationError as DjangoValidationError
+from products import cache as product_cache
+from .models import ArchivedOrder, ArchivedOrderItem, Cart, Order, OrderItem
+from .services import create_order
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    product_name = serializers.ReadOnlyField(source='product.name')
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'product', 'product_name', 'quantity', 'price']
+
+def ship_to_destination(attrs):
+    """Pop the optional ship_to_* coordinates off validated data as a ``(latitude, longitude)`` pair."""
+    latitude, longitude = attrs.pop('ship_to_latitude', None), attrs.pop('ship_to_longitude', None)
+    if (latitude is None) != (longitude is None):
+        raise serializers.ValidationError("Give both ship_to_latitude and ship_to_longitude, or neither.")
+    return None if latitude is None else (latitude, longitude)
+
+class OrderSerializer(serializers.ModelSerializer):
+    items = OrderItemSerializer(many=True)  # ✅ Nested Serializer
+    # ✅ Optional delivery point; stock ships from the nearest warehouses
+    ship_to_latitude = serializers.FloatField(write_only=True, required=False, min_value=-90, max_value=90)
+    ship_to_longitude = serializers.FloatField(write_only=True, required=False, min_value=-180, max_value=180)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'created_at', 'total_price', 'is_paid', 'status', 'items',
+                  'ship_to_latitude', 'ship_to_longitude']
+
+    def validate_items(self, value):
+        if not value:
+            raise serializers.ValidationError("Order must contain at least one item.")
+        return value
+
+    def validate(self, attrs):
+        destination = ship_to_destination(attrs)
+        if self.instance is None:
+            attrs['destination'] = destination
+        return attrs
+
+    def create(self, validated_data):
+        items_data = validated_data.pop('items', [])
+        lines = [(item['product'].id, item['quantity'], item.get('price')) for item in items_data]
+        try:
+            # ✅ One transaction
+            return create_order(self.context['request'].user, lines, validated_data.pop('destination', None))
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+
+    def to_representation(self, instance):
+        response = super().to_representation(instance)
+        response['items'] = OrderItemSerializer(instance.items.all(), many=True).data
+        return response
+
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ['id', 'product', 'product_name', 'quantity', 'price']
+
+# ✅ Same shape as OrderSerializer, so archived orders read like live ones
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = ['id', 'created_at', 'total_price', 'is_paid', 'status', 'items']
+
+def serialize_orders(orders):
+    """Serialize a mix of Order and ArchivedOrder instances, keeping their order."""
+    return [
+        (ArchivedOrderSerializer if isinstance(order, ArchivedOrder) else OrderSerializer)(order).data
+        for order in orders
+    ]
+
+class PaymentSerializer(serializers.Serializer):
+    order_id = serializers.IntegerField()
+    token = serializers.CharField(max_length=100)  # Stripe payment token
+
+    def validate(self, data):
+        try:
+            order = Order.objects.get(id=data['order_id'], is_paid=False)
+        except Order.DoesNotExist:
+            raise serializers.ValidationError("Order not found or already paid.")
+        return data
+        
+    class Meta:
+        model = Order
+        fields = ['payment_id', 'payment_status', 'is_paid']
+
+    def validate_payment_status(self, value):
+        if value not in ['success', 'failure', 'pending']:
+            raise serializers.ValidationError("Invalid payment status.")
+        return value
+
+class CancellationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Order
+        fields = ['status', 'is_refunded', 'refund_id']
+
+    def validate_status(self, value):
+        if value != 'cancelled':
+            raise serializers.ValidationError("Status must be 'cancelled' to initiate a refund.")
+        return value
+
+    def update(self, instance, validated_data):
+        # Simulate refund process if paid
+        if instance.is_paid:
+            validated_data['is_refunded'] = True
+            validated_data['refund_id'] = f"REF-{instance.id}"
+        return super().update(instance, validated_data)
+
+class CartSerializer(serializers.ModelSerializer):
+    items = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Cart
+        fields = ['item_count', 'total_price', 'updated_at', 'items']
+
+    def get_items(self, cart):
+        items = list(cart.items.order_by('id'))
+        products = product_cache.get_products(item.product_id for item in items)
+        results = []
+        for item in items:
+            product = products.get(item.product_id, {})
+            stock = product.get('stock', 0)
+            results.append({
+                'product': item.product_id,
+                'product_name': product.get('name'),
+                'quantity': item.quantity,
+                'unit_price': str(item.unit_price),
+                'line_total': str(item.unit_price * item.quantity),
+                'stock': stock,  # ✅ Cached hint; checkout re-checks
+                'in_stock': stock >= item.quantity,
+            })
+        return results
+
+class CartItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, default=1)
+
+class CheckoutSerializer(serializers.Serializer):
+    ship_to_latitude = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    ship_to_longitude = serializers.FloatField(required=False, min_value=-180, max_value=180)
+
+    def validate(self, attrs):
+        return {'destination': ship_to_destination(attrs)}
@@ -0,0 +1,51 @@
+"""
+Order placement shared by OrderCreateView (through OrderSerializer) and cart checkout.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from products import inventory
+from .models import Order, OrderAllocation, OrderItem
+from .signals import order_placed
+
+
+def create_order(user, lines, destination=None):
+    """
+    Place an order for ``lines`` = ``[(product_id, quantity, price or None), ...]``
+    in one transaction and a fixed number of queries. The order, its items and
+    allocations are inserted in bulk. The product rows are locked as they are read
+    unless ORDER_STOCK_DECREMENT is 'conditional'; either way the stock is taken last,
+    by one conditional UPDATE (see products/inventory.py), and the allocation
+    engine then picks warehouses for products stocked per warehouse, nearest to
+    ``destination`` (a ``(latitude, longitude)`` pair). Lines without a price are
+    charged the current product price.
+
+    Raises ValidationError, with nothing written, when a product is missing or short.
+    """
+    quantities = {}
+    for product_id, quantity, _ in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    with transaction.atomic():
+        products = inventory.read_products(list(quantities))
+        if len(products) != len(quantities):
+            raise ValidationError(inventory.shortage_message(quantities))
+
+        items = [
+            OrderItem(product_id=product_id, quantity=quantity,
+                      price=products[product_id].price if price is None else price)
+            for product_id, quantity, price in lines
+        ]
+        order = Order.objects.create(user=user, total_price=sum(item.price * item.quantity for item in items))
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+
+        inventory.decrement_stock(quantities)
+        allocations = inventory.allocate(quantities, destination)
+        OrderAllocation.objects.bulk_create(
+            OrderAllocation(order=order, product_id=product_id, warehouse_id=warehouse_id, quantity=quantity)
+            for product_id, warehouse_id, quantity in allocations
+        )
+
+    order_placed.send(sender=Order, order=order, items=items)
+    return order
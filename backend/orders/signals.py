@@ -1,9 +1,76 @@
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
-from .models import OrderItem
-
-@receiver(post_save, sender=OrderItem)
-@receiver(post_delete, sender=OrderItem)
-def update_order_total(sender, instance, **kwargs):
-    """Automatically update order total whenever OrderItem is modified."""
-    instance.order.update_total_price()
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.db.models import F
+from django.dispatch import Signal, receiver
+from products import leaderboard
+from products.models import Product
+from shoply import metrics
+
+# Sent by Order.save() when an order becomes paid / cancelled / refunded; receivers get ``order``.
+# Senders are given as "app_label.Model" strings so models.py can import this module.
+order_paid = Signal()
+order_cancelled = Signal()
+order_refunded = Signal()
+# Sent by Order.save() after every save of an existing order, with ``order``, ``previous``
+# (the row as it was before) and the save's ``update_fields``
+order_updated = Signal()
+# Sent by services.create_order() with ``order`` and its bulk-created ``items``,
+# which never fire post_save
+order_placed = Signal()
+
+@receiver(post_save, sender='orders.OrderItem')
+@receiver(post_delete, sender='orders.OrderItem')
+def update_order_total(sender, instance, **kwargs):
+    """Automatically update order total whenever OrderItem is modified."""
+    instance.order.update_total_price()
+
+@receiver(post_save, sender='orders.Order')
+def count_created_order(sender, instance, created, **kwargs):
+    if created:
+        metrics.ORDERS_CREATED.inc()
+
+@receiver(order_paid)
+def count_paid_order(sender, order, **kwargs):
+    metrics.ORDERS_PAID.inc()
+
+@receiver(order_paid)
+def update_recommendations(sender, order, **kwargs):
+    """Queued once the payment has committed; a failure (inline with TASKS_EAGER) is only logged."""
+    from .tasks import record_co_purchases  # tasks.py imports the models, which import this module
+    transaction.on_commit(lambda: record_co_purchases.delay(order.pk), robust=True)
+
+@receiver(post_save, sender='orders.OrderItem')
+def count_item_sale(sender, instance, created, **kwargs):
+    """Best-sellers count units when the item is ordered."""
+    if created and instance.order.status != 'cancelled':
+        leaderboard.record_sales([(instance.product_id, instance.quantity)], instance.order.created_at)
+
+@receiver(order_placed)
+def count_placed_sales(sender, order, items, **kwargs):
+    leaderboard.record_sales([(item.product_id, item.quantity) for item in items], order.created_at)
+
+@receiver(order_cancelled)
+def uncount_cancelled_sales(sender, order, **kwargs):
+    lines = order.items.values_list('product_id', 'quantity')
+    leaderboard.record_sales(lines, order.created_at, sign=-1)
+
+@receiver(post_delete, sender='orders.CartItem')
+def drop_deleted_product_from_cart(sender, instance, origin=None, **kwargs):
+    """orders/cart.py keeps cart totals itself, except when a product delete cascades."""
+    if isinstance(origin, Product):
+        from .models import Cart  # models.py imports this module
+        Cart.objects.filter(pk=instance.cart_id).update(
+            item_count=F('item_count') - instance.quantity,
+            total_price=F('total_price') - instance.quantity * instance.unit_price,
+        )
+
+@receiver(post_save, sender='orders.Order')
+def count_user_order(sender, instance, created, **kwargs):
+    if created:
+        from . import user_stats  # imports the models, which import this module
+        user_stats.order_created(instance)
+
+@receiver(order_updated)
+def count_user_order_change(sender, order, previous, update_fields, **kwargs):
+    from . import user_stats
+    user_stats.order_updated(previous, order, update_fields)
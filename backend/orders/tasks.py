@@ -0,0 +1,8 @@
+from products.recommendations import record_basket
+from tasks.queue import task
+from .models import OrderItem
+
+@task
+def record_co_purchases(order_id):
+    """Fold a newly paid order into the "frequently bought together" matrix."""
+    record_basket(OrderItem.objects.filter(order_id=order_id).values_list('product_id', flat=True))
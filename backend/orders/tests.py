@@ -1,267 +1,937 @@
-from django.urls import reverse
-from rest_framework import status
-from rest_framework.test import APITestCase
-from django.contrib.auth import get_user_model
-from products.models import Product
-from .models import Order, OrderItem, OrderStatusHistory
-from unittest import mock
-from django.test import TestCase
-import stripe
-
-User = get_user_model()
-
-class OrderModelTests(TestCase):
-
-    def setUp(self):
-        self.user = User.objects.create_user(username='testuser', password='testpass')
-        self.product = Product.objects.create(name='Test Product', price=100.00, stock=10)
-        self.order = Order.objects.create(user=self.user)
-
-    def test_order_item_stock_reduction(self):
-        """Ensure stock is reduced when an OrderItem is created."""
-        OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price=100.00)
-        self.product.refresh_from_db()
-        self.assertEqual(self.product.stock, 8)
-
-    def test_order_total_price_auto_update(self):
-        """Ensure total price updates automatically on item addition."""
-        OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price=100.00)
-        self.order.refresh_from_db()
-        self.assertEqual(float(self.order.total_price), 200.00)
-
-    def test_stock_rollback_on_failure(self):
-        """Ensure stock is rolled back if transaction fails."""
-        try:
-            with transaction.atomic():
-                OrderItem.objects.create(order=self.order, product=self.product, quantity=20, price=100.00)
-        except Exception:
-            pass
-
-        self.product.refresh_from_db()
-        self.assertEqual(self.product.stock, 10)
-
-    def test_order_status_history_tracking(self):
-        """Ensure status changes are tracked in OrderStatusHistory."""
-        self.order.status = 'shipped'
-        self.order.save()
-
-        history = OrderStatusHistory.objects.filter(order=self.order).first()
-        self.assertIsNotNone(history)
-        self.assertEqual(history.previous_status, 'pending')
-        self.assertEqual(history.new_status, 'shipped')
-
-class OrderAPITests(APITestCase):
-
-    def setUp(self):
-        # ✅ Create a test user
-        self.user = User.objects.create_user(
-            username='testuser', 
-            email='testuser@example.com',
-            password='testpassword'
-        )
-        self.client.force_authenticate(user=self.user)
-
-        # ✅ Create sample products
-        self.product1 = Product.objects.create(
-            name="Product 1", description="Description 1", price=100.00, stock=10
-        )
-        self.product2 = Product.objects.create(
-            name="Product 2", description="Description 2", price=200.00, stock=5
-        )
-
-        # ✅ Define URLs
-        self.order_list_url = reverse('order-list')  # Ensure correct URL names
-        self.order_create_url = reverse('order-create')
-
-    # ✅ Test order creation with multiple items
-    def test_create_order(self):
-        data = {
-            "items": [
-                {"product": self.product1.id, "quantity": 2, "price": 100.00},
-                {"product": self.product2.id, "quantity": 1, "price": 200.00}
-            ]
-        }
-        response = self.client.post(self.order_create_url, data, format='json')
-        print("Create Order Response:", response.status_code, response.data)  # ✅ Debug output
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertEqual(len(response.data['items']), 2)
-
-    # ✅ Test insufficient stock scenario
-    def test_create_order_insufficient_stock(self):
-        data = {
-            "items": [{"product": self.product2.id, "quantity": 10, "price": "200.00"}]
-        }
-        response = self.client.post(self.order_create_url, data, format='json')
-        print("Insufficient Stock Response:", response.status_code, response.data)  # ✅ Debug output
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn('Insufficient stock for Product 2', str(response.data))
-
-    def test_create_order_invalid_data(self):
-        # No items provided
-        data = {}
-        response = self.client.post(self.order_create_url, data, format='json')
-        print("Invalid Data Response:", response.status_code, response.data)  # ✅ Debug output
-        # Check for the correct system-generated validation error
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn("This field is required.", str(response.data))
-
-    def test_update_order_status(self):
-        order = Order.objects.create(user=self.user, total_price=300.00)
-        order_detail_url = reverse('order-detail', kwargs={'pk': order.id})
-
-        response = self.client.patch(order_detail_url, {'status': 'shipped'}, format='json')
-        print("Update Status Response:", response.status_code, response.data)  # ✅ Debug output
-        # If 202 is expected, adjust the assertion
-        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
-        self.assertEqual(response.data['status'], 'shipped')
-
-    class PaymentTests(APITestCase):
-
-        def setUp(self):
-            self.user = User.objects.create_user(
-                username='testuser', 
-                password='testpassword'
-            )
-            self.client.force_authenticate(user=self.user)
-            self.order = Order.objects.create(user=self.user, total_price=500.00)
-
-        def test_successful_payment(self):
-            url = reverse('order-payment', kwargs={'pk': self.order.id})
-            data = {
-                "payment_id": "PAY123456",
-                "payment_status": "success"
-            }
-            response = self.client.patch(url, data, format='json')
-            self.assertEqual(response.status_code, status.HTTP_200_OK)
-            self.assertTrue(response.data['is_paid'])
-            self.assertEqual(response.data['payment_status'], "success")
-
-        def test_failed_payment(self):
-            url = reverse('order-payment', kwargs={'pk': self.order.id})
-            data = {
-                "payment_id": "PAY654321",
-                "payment_status": "failure"
-            }
-            response = self.client.patch(url, data, format='json')
-            self.assertEqual(response.status_code, status.HTTP_200_OK)
-            self.assertFalse(response.data['is_paid'])
-            self.assertEqual(response.data['payment_status'], "failure")
-
-class CancellationTests(APITestCase):
-
-    def setUp(self):
-        self.user = User.objects.create_user(
-            username='testuser',
-            password='testpassword'
-        )
-        self.client.force_authenticate(user=self.user)
-        self.order = Order.objects.create(
-            user=self.user,
-            total_price=300.00,
-            status='pending',
-            is_paid=True,
-            payment_id='PAY123456',
-            payment_status='success'
-        )
-        self.cancel_url = reverse('order-cancellation', kwargs={'pk': self.order.id})
-
-    def test_cancel_order_success(self):
-        data = {"status": "cancelled"}
-        response = self.client.patch(self.cancel_url, data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(response.data['is_refunded'])
-        self.assertEqual(response.data['refund_id'], f"REF-{self.order.id}")
-
-    def test_cancel_already_delivered_order(self):
-        self.order.status = 'delivered'
-        self.order.save()
-        data = {"status": "cancelled"}
-        response = self.client.patch(self.cancel_url, data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn("Delivered orders cannot be cancelled.", str(response.data))
-
-class PaymentAPITests(APITestCase):
-
-    def setUp(self):
-        # Create a test user
-        self.user = User.objects.create_user(
-            username='testuser',
-            email='testuser@example.com',
-            password='testpassword'
-        )
-        self.client.force_authenticate(user=self.user)
-
-        # Create sample product
-        self.product = Product.objects.create(
-            name="Test Product", description="Test Description", price=100.00, stock=10
-        )
-
-        # Create an unpaid order
-        self.order = Order.objects.create(
-            user=self.user,
-            total_price=300.00,
-            is_paid=False,
-            status='pending'
-        )
-
-        # Define payment URL
-        self.payment_url = reverse('order-payment')
-
-    @mock.patch('stripe.Charge.create')
-    def test_successful_payment(self, mock_charge):
-        mock_charge.return_value = {
-            "id": "ch_12345",
-            "amount": 30000,
-            "currency": "usd",
-            "status": "succeeded"
-        }
-
-        data = {"order_id": self.order.id, "token": "tok_visa"}
-        response = self.client.post(self.payment_url, data, format='json')
-
-        self.order.refresh_from_db()
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(self.order.is_paid)
-        self.assertEqual(self.order.payment_id, "ch_12345")
-
-    @mock.patch('stripe.Charge.create')
-    def test_failed_payment_due_to_stripe_error(self, mock_charge):
-        mock_charge.side_effect = stripe.error.StripeError("Payment failed")
-        
-        data = {"order_id": self.order.id, "token": "tok_visa"}
-        response = self.client.post(self.payment_url, data, format='json')
-        
-        self.order.refresh_from_db()
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertFalse(self.order.is_paid)
-        self.assertIn("Payment failed", str(response.data))
-
-    def test_payment_with_invalid_order(self):
-        # Invalid order ID
-        data = {
-            "order_id": 9999,
-            "token": "tok_visa"
-        }
-        response = self.client.post(self.payment_url, data, format='json')
-        
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn("Order not found or already paid.", str(response.data))
-
-    def test_payment_already_paid_order(self):
-        # Mark order as paid
-        self.order.is_paid = True
-        self.order.payment_status = 'paid'
-        self.order.save()
-
-        data = {
-            "order_id": self.order.id,
-            "token": "tok_visa"
-        }
-        response = self.client.post(self.payment_url, data, format='json')
-
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn("Order not found or already paid.", str(response.data))
-
-if __name__ == "__main__":
-    import unittest
+import csv
+import io
+import json
+import threading
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from datetime import timedelta
+from django.core.cache import cache
+from django.utils import timezone
+from products import leaderboard
+from products import inventory
+from products.recommendations import record_basket
+from products.models import Product, ProductSalesBucket, RelatedProduct, StockLevel, Warehouse
+from products.tasks import refresh_leaderboards
+from .models import (
+    ArchivedOrder, Order, OrderAllocation, OrderItem, OrderStatusHistory, UserOrderStats,
+)
+from . import user_stats
+from .services import create_order
+from unittest import mock
+from unittest import skipUnless
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured, ValidationError as DjangoValidationError
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+import stripe
+
+User = get_user_model()
+
+class OrderModelTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.product = Product.objects.create(name='Test Product', price=100.00, stock=10)
+        self.order = Order.objects.create(user=self.user)
+
+    def test_order_item_stock_reduction(self):
+        """Ensure stock is reduced when an OrderItem is created."""
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price=100.00)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 8)
+
+    def test_order_total_price_auto_update(self):
+        """Ensure total price updates automatically on item addition."""
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price=100.00)
+        self.order.refresh_from_db()
+        self.assertEqual(float(self.order.total_price), 200.00)
+
+    def test_stock_rollback_on_failure(self):
+        """Ensure stock is rolled back if transaction fails."""
+        try:
+            with transaction.atomic():
+                OrderItem.objects.create(order=self.order, product=self.product, quantity=20, price=100.00)
+        except Exception:
+            pass
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
+
+    def test_order_status_history_tracking(self):
+        """Ensure status changes are tracked in OrderStatusHistory."""
+        self.order.status = 'shipped'
+        self.order.save()
+
+        history = OrderStatusHistory.objects.filter(order=self.order).first()
+        self.assertIsNotNone(history)
+        self.assertEqual(history.previous_status, 'pending')
+        self.assertEqual(history.new_status, 'shipped')
+
+class OrderAPITests(APITestCase):
+
+    def setUp(self):
+        # ✅ Create a test user
+        self.user = User.objects.create_user(
+            username='testuser', 
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        # ✅ Create sample products
+        self.product1 = Product.objects.create(
+            name="Product 1", description="Description 1", price=100.00, stock=10
+        )
+        self.product2 = Product.objects.create(
+            name="Product 2", description="Description 2", price=200.00, stock=5
+        )
+
+        # ✅ Define URLs
+        self.order_list_url = reverse('order-list')  # Ensure correct URL names
+        self.order_create_url = reverse('order-create')
+
+    # ✅ Test order creation with multiple items
+    def test_create_order(self):
+        data = {
+            "items": [
+                {"product": self.product1.id, "quantity": 2, "price": 100.00},
+                {"product": self.product2.id, "quantity": 1, "price": 200.00}
+            ]
+        }
+        response = self.client.post(self.order_create_url, data, format='json')
+        print("Create Order Response:", response.status_code, response.data)  # ✅ Debug output
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['items']), 2)
+
+    # ✅ Test insufficient stock scenario
+    def test_create_order_insufficient_stock(self):
+        data = {
+            "items": [{"product": self.product2.id, "quantity": 10, "price": "200.00"}]
+        }
+        response = self.client.post(self.order_create_url, data, format='json')
+        print("Insufficient Stock Response:", response.status_code, response.data)  # ✅ Debug output
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Insufficient stock for Product 2', str(response.data))
+
+    def test_create_order_invalid_data(self):
+        # No items provided
+        data = {}
+        response = self.client.post(self.order_create_url, data, format='json')
+        print("Invalid Data Response:", response.status_code, response.data)  # ✅ Debug output
+        # Check for the correct system-generated validation error
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("This field is required.", str(response.data))
+
+    def test_update_order_status(self):
+        order = Order.objects.create(user=self.user, total_price=300.00)
+        order_detail_url = reverse('order-detail', kwargs={'pk': order.id})
+
+        response = self.client.patch(order_detail_url, {'status': 'shipped'}, format='json')
+        print("Update Status Response:", response.status_code, response.data)  # ✅ Debug output
+        # If 202 is expected, adjust the assertion
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'shipped')
+
+    class PaymentTests(APITestCase):
+
+        def setUp(self):
+            self.user = User.objects.create_user(
+                username='testuser', 
+                password='testpassword'
+            )
+            self.client.force_authenticate(user=self.user)
+            self.order = Order.objects.create(user=self.user, total_price=500.00)
+
+        def test_successful_payment(self):
+            url = reverse('order-payment', kwargs={'pk': self.order.id})
+            data = {
+                "payment_id": "PAY123456",
+                "payment_status": "success"
+            }
+            response = self.client.patch(url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.data['is_paid'])
+            self.assertEqual(response.data['payment_status'], "success")
+
+        def test_failed_payment(self):
+            url = reverse('order-payment', kwargs={'pk': self.order.id})
+            data = {
+                "payment_id": "PAY654321",
+                "payment_status": "failure"
+            }
+            response = self.client.patch(url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse(response.data['is_paid'])
+            self.assertEqual(response.data['payment_status'], "failure")
+
+class CancellationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpassword'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.order = Order.objects.create(
+            user=self.user,
+            total_price=300.00,
+            status='pending',
+            is_paid=True,
+            payment_id='PAY123456',
+            payment_status='success'
+        )
+        self.cancel_url = reverse('order-cancellation', kwargs={'pk': self.order.id})
+
+    def test_cancel_order_success(self):
+        data = {"status": "cancelled"}
+        response = self.client.patch(self.cancel_url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_refunded'])
+        self.assertEqual(response.data['refund_id'], f"REF-{self.order.id}")
+
+    def test_cancel_already_delivered_order(self):
+        self.order.status = 'delivered'
+        self.order.save()
+        data = {"status": "cancelled"}
+        response = self.client.patch(self.cancel_url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Delivered orders cannot be cancelled.", str(response.data))
+
+class PaymentAPITests(APITestCase):
+
+    def setUp(self):
+        # Create a test user
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        # Create sample product
+        self.product = Product.objects.create(
+            name="Test Product", description="Test Description", price=100.00, stock=10
+        )
+
+        # Create an unpaid order
+        self.order = Order.objects.create(
+            user=self.user,
+            total_price=300.00,
+            is_paid=False,
+            status='pending'
+        )
+
+        # Define payment URL
+        self.payment_url = reverse('order-payment')
+
+    @mock.patch('stripe.Charge.create')
+    def test_successful_payment(self, mock_charge):
+        mock_charge.return_value = {
+            "id": "ch_12345",
+            "amount": 30000,
+            "currency": "usd",
+            "status": "succeeded"
+        }
+
+        data = {"order_id": self.order.id, "token": "tok_visa"}
+        response = self.client.post(self.payment_url, data, format='json')
+
+        self.order.refresh_from_db()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.order.is_paid)
+        self.assertEqual(self.order.payment_id, "ch_12345")
+
+    @mock.patch('stripe.Charge.create')
+    def test_failed_payment_due_to_stripe_error(self, mock_charge):
+        mock_charge.side_effect = stripe.error.StripeError("Payment failed")
+        
+        data = {"order_id": self.order.id, "token": "tok_visa"}
+        response = self.client.post(self.payment_url, data, format='json')
+        
+        self.order.refresh_from_db()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.order.is_paid)
+        self.assertIn("Payment failed", str(response.data))
+
+    def test_payment_with_invalid_order(self):
+        # Invalid order ID
+        data = {
+            "order_id": 9999,
+            "token": "tok_visa"
+        }
+        response = self.client.post(self.payment_url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Order not found or already paid.", str(response.data))
+
+    def test_payment_already_paid_order(self):
+        # Mark order as paid
+        self.order.is_paid = True
+        self.order.payment_status = 'paid'
+        self.order.save()
+
+        data = {
+            "order_id": self.order.id,
+            "token": "tok_visa"
+        }
+        response = self.client.post(self.payment_url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Order not found or already paid.", str(response.data))
+
+class OrderConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(name="Test Product", price=100.00, stock=10)
+        self.order = Order.objects.create(user=self.user)
+        self.url = reverse('order-detail', kwargs={'pk': self.order.id})
+
+    def test_order_detail_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_adding_item_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=1, price=100.00)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['items']), 1)
+
+    def test_other_users_order_is_404(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class OrderExportTests(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='adminpass', is_staff=True
+        )
+        self.client.force_authenticate(user=self.admin)
+        product = Product.objects.create(name="Test Product", price=100.00, stock=10)
+        self.order = Order.objects.create(user=self.admin)
+        OrderItem.objects.create(order=self.order, product=product, quantity=2, price=100.00)
+        OrderItem.objects.create(order=self.order, product=product, quantity=1, price=100.00)
+        self.empty_order = Order.objects.create(user=self.admin)
+        self.url = reverse('order-export')
+
+    def test_export_ndjson_groups_items_per_order(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([r['id'] for r in records], [self.order.id, self.empty_order.id])
+        self.assertEqual([i['quantity'] for i in records[0]['items']], [2, 1])
+        self.assertEqual(records[1]['items'], [])
+
+    def test_export_csv_has_one_row_per_item(self):
+        response = self.client.get(self.url, {'fmt': 'csv'})
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][-4:], ['item_id', 'product_id', 'quantity', 'price'])
+        # two item rows for the first order, one blank-item row for the empty order
+        self.assertEqual(len(rows), 4)
+
+    # ✅ Archived orders are only exported on request, merged in id order
+    def test_export_can_include_archived_orders(self):
+        self.order.status = 'delivered'
+        self.order.save()
+        Order.objects.filter(pk=self.order.pk).update(created_at=timezone.now() - timedelta(days=800))
+        call_command('archive_orders', sleep=0, stdout=io.StringIO())
+
+        records = [json.loads(line) for line in b''.join(self.client.get(self.url).streaming_content).splitlines()]
+        self.assertEqual([r['id'] for r in records], [self.empty_order.id])
+        response = self.client.get(self.url, {'include_archived': 'true'})
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([r['id'] for r in records], [self.order.id, self.empty_order.id])
+        self.assertEqual([i['quantity'] for i in records[0]['items']], [2, 1])
+
+class GenerateSyntheticDataTests(TestCase):
+
+    def generate(self):
+        call_command('generate_synthetic_data', products=30, users=5, orders=40, items_per_order=3,
+                     batch_size=16, seed=7, stdout=io.StringIO())
+        return list(OrderItem.objects.order_by('id').values_list('order_id', 'product_id', 'quantity', 'price'))
+
+    # ✅ Orders, items and histories are consistent and the same seed gives the same data
+    def test_deterministic_and_consistent(self):
+        first_run = self.generate()
+        self.assertEqual(Order.objects.count(), 40)
+        self.assertEqual(User.objects.count(), 5)
+        for order in Order.objects.prefetch_related('items', 'status_history'):
+            self.assertEqual(order.total_price, sum(item.price * item.quantity for item in order.items.all()))
+            self.assertEqual(order.is_paid, order.status not in ('pending', 'cancelled'))
+            if order.status != 'pending':
+                self.assertEqual(order.status_history.latest('changed_at').new_status, order.status)
+
+        OrderStatusHistory.objects.all().delete()
+        OrderItem.objects.all().delete()
+        Order.objects.all().delete()
+        Product.objects.all().delete()
+        User.objects.all().delete()
+        self.assertEqual(
+            [row[2:] for row in self.generate()], [row[2:] for row in first_run]
+        )
+
+class OrderAdminTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(self.admin)
+        product = Product.objects.create(name='Admin Product', price=10, stock=100)
+        self.orders = []
+        for n in range(3):
+            order = Order.objects.create(user=User.objects.create_user(username=f'buyer{n}', email=f'b{n}@example.com'))
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=10)
+            self.orders.append(order)
+
+    # ✅ Users come from one join, not a query per row
+    def test_changelist_query_count_is_constant(self):
+        url = reverse('admin:orders_order_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get(url)
+        Order.objects.create(user=User.objects.create_user(username='late', email='late@example.com'))
+        with CaptureQueriesContext(connection) as more_rows:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(more_rows), len(baseline))
+
+    def test_change_page_renders_inlines(self):
+        response = self.client.get(reverse('admin:orders_order_change', args=[self.orders[0].pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Admin Product')
+        self.assertContains(response, 'status_history')
+
+class RecommendationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass')
+        self.a, self.b, self.c = (Product.objects.create(name=name, price=10, stock=100) for name in 'ABC')
+
+    def place_order(self, products, paid=True):
+        order = Order.objects.create(user=self.user)
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=10)
+        if paid:
+            order.is_paid = True
+            with self.captureOnCommitCallbacks(execute=True):
+                order.save()
+        return order
+
+    def related_names(self, product):
+        response = self.client.get(reverse('product-related', args=[product.pk]), {'fields': 'id,name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['name'] for row in response.data]
+
+    # ✅ Paying an order folds it into the matrix; unpaid orders do not count
+    def test_incremental_updates_on_payment(self):
+        self.place_order([self.a, self.b])
+        self.place_order([self.a, self.b, self.c])
+        self.place_order([self.a, self.c], paid=False)
+        self.place_order([self.a, self.c], paid=False)
+        self.assertEqual(self.related_names(self.a), ['B', 'C'])
+        self.assertEqual(self.related_names(self.c), ['A', 'B'])
+        self.assertEqual(RelatedProduct.objects.get(product=self.a, rank=1).orders, 2)
+
+    def test_rebuild_matches_incremental(self):
+        self.place_order([self.a, self.b])
+        self.place_order([self.b, self.c])
+        self.place_order([self.b, self.c, self.a])
+        incremental = list(RelatedProduct.objects.order_by('product_id', 'rank')
+                           .values_list('product_id', 'related_id', 'orders'))
+        call_command('build_recommendations', chunk_size=1, stdout=io.StringIO())
+        rebuilt = list(RelatedProduct.objects.order_by('product_id', 'rank')
+                       .values_list('product_id', 'related_id', 'orders'))
+        self.assertEqual(rebuilt, incremental)
+
+    # ✅ Archived orders still count when the matrix is rebuilt
+    def test_rebuild_includes_archived_orders(self):
+        archived = [self.place_order([self.a, self.b]), self.place_order([self.a, self.b, self.c])]
+        self.place_order([self.a, self.c])
+        Order.objects.filter(pk__in=[order.pk for order in archived])\
+            .update(status='delivered', created_at=timezone.now() - timedelta(days=800))
+        call_command('archive_orders', sleep=0, stdout=io.StringIO())
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+
+        call_command('build_recommendations', chunk_size=1, stdout=io.StringIO())
+        self.assertEqual(self.related_names(self.a), ['B', 'C'])
+        self.assertEqual(RelatedProduct.objects.get(product=self.a, related=self.c).orders, 2)
+        self.assertEqual(RelatedProduct.objects.get(product=self.b, related=self.a).orders, 2)
+
+    # ✅ A recommendation failure never fails the payment that triggered it
+    def test_failure_is_kept_out_of_payment(self):
+        with mock.patch('orders.tasks.record_basket', side_effect=RuntimeError("boom")), \
+                self.assertLogs('django', 'ERROR'):
+            order = self.place_order([self.a, self.b])
+        self.assertTrue(Order.objects.get(pk=order.pk).is_paid)
+
+    @override_settings(RECOMMENDATIONS_TOP_K=1)
+    def test_top_k_is_respected(self):
+        self.place_order([self.a, self.b, self.c])
+        self.assertEqual(len(self.related_names(self.a)), 1)
+
+class RecommendationLockTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass')
+        self.a, self.b = (Product.objects.create(name=name, price=10, stock=100) for name in 'AB')
+
+    # ✅ Refreshing a basket's lists never touches the product rows checkout locks
+    def test_refresh_does_not_read_products(self):
+        with CaptureQueriesContext(connection) as queries:
+            record_basket([self.a.pk, self.b.pk])
+        self.assertFalse([query for query in queries.captured_queries if 'products_product"' in query['sql']])
+        self.assertEqual(RelatedProduct.objects.count(), 2)
+
+    @skipUnless(connection.vendor == 'postgresql', "needs row and advisory locks")
+    @override_settings(ORDER_STOCK_DECREMENT='lock')
+    def test_checkout_is_not_blocked_by_a_basket_refresh(self):
+        refreshing, release = threading.Event(), threading.Event()
+
+        def basket():
+            try:
+                with transaction.atomic():
+                    record_basket([self.a.pk, self.b.pk])
+                    refreshing.set()
+                    release.wait(10)  # hold the refresh's locks open
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=basket)
+        thread.start()
+        try:
+            self.assertTrue(refreshing.wait(10))
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = '2s'")  # fails instead of waiting
+                create_order(self.user, [(self.a.pk, 1, None), (self.b.pk, 1, None)])
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(Product.objects.get(pk=self.a.pk).stock, 99)
+
+class LeaderboardTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass')
+        self.a, self.b, self.c = (Product.objects.create(name=name, price=10, stock=100) for name in 'ABC')
+
+    def place_order(self, lines):
+        order = Order.objects.create(user=self.user)
+        for product, quantity in lines:
+            OrderItem.objects.create(order=order, product=product, quantity=quantity, price=10)
+        return order
+
+    def best_sellers(self, **params):
+        response = self.client.get(reverse('product-best-sellers'), {'fields': 'id,name', **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(row['name'], row['units_sold']) for row in response.data['results']]
+
+    # ✅ Orders add units, cancellations take them back out at the next refresh
+    def test_orders_and_cancellations(self):
+        self.place_order([(self.a, 2), (self.b, 5)])
+        cancelled = self.place_order([(self.c, 9), (self.a, 1)])
+        leaderboard.refresh()
+        self.assertEqual(self.best_sellers(), [('C', 9), ('B', 5), ('A', 3)])
+
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        leaderboard.refresh()
+        self.assertEqual(self.best_sellers(), [('B', 5), ('A', 2)])
+        self.assertEqual(self.best_sellers(limit=1), [('B', 5)])
+
+    def test_windows_and_compaction(self):
+        now = timezone.now().replace(minute=40, second=0, microsecond=0)
+        leaderboard.record_sales([(self.a.pk, 1)], now - timedelta(minutes=10))
+        leaderboard.record_sales([(self.b.pk, 4)], now - timedelta(hours=3))
+        leaderboard.record_sales([(self.b.pk, 3)], now - timedelta(hours=3, minutes=20))
+        leaderboard.record_sales([(self.c.pk, 8)], now - timedelta(days=2))
+        leaderboard.compact(now)
+        self.assertEqual(ProductSalesBucket.objects.filter(product=self.b).count(), 1)
+        leaderboard.refresh(now)
+        self.assertEqual(self.best_sellers(window='1h'), [('A', 1)])
+        self.assertEqual(self.best_sellers(window='24h'), [('B', 7), ('A', 1)])
+        self.assertEqual(self.best_sellers(window='7d'), [('C', 8), ('B', 7), ('A', 1)])
+
+        leaderboard.compact(now + timedelta(days=8))
+        self.assertFalse(ProductSalesBucket.objects.exists())
+
+    # ✅ Requests read the cached list: no queries once it is warm
+    def test_served_from_cache(self):
+        self.place_order([(self.a, 1)])
+        refresh_leaderboards()
+        self.best_sellers()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.best_sellers(), [('A', 1)])
+
+    # ✅ Without a worker, a read refreshes missing or stale lists, once per interval
+    def test_refreshed_on_read(self):
+        self.place_order([(self.a, 2)])
+        self.assertEqual(self.best_sellers(), [('A', 2)])
+
+        self.place_order([(self.b, 3)])
+        with mock.patch.object(leaderboard, 'update') as update:
+            self.assertEqual(self.best_sellers(), [('A', 2)])
+        update.assert_not_called()
+
+        stale = timezone.now() - timedelta(seconds=120)
+        cache.set(leaderboard.CACHE_KEY.format('24h'), (stale, []), 300)
+        cache.delete(leaderboard.REFRESH_KEY)
+        self.assertEqual(self.best_sellers(), [('B', 3), ('A', 2)])
+
+    def test_invalid_window(self):
+        response = self.client.get(reverse('product-best-sellers'), {'window': '30d'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class CartTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='shopper', email='shopper@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        self.a = Product.objects.create(name='A', price='10.00', stock=5)
+        self.b = Product.objects.create(name='B', price='2.50', stock=3)
+
+    def add(self, product, quantity=1):
+        return self.client.post(reverse('cart-items'), {'product': product.pk, 'quantity': quantity})
+
+    # ✅ Totals follow every add, update and remove
+    def test_running_totals(self):
+        self.add(self.a, 2)
+        self.add(self.b)
+        response = self.add(self.a)
+        self.assertEqual((response.data['item_count'], response.data['total_price']), (4, '32.50'))
+
+        response = self.client.patch(reverse('cart-item', args=[self.a.pk]), {'quantity': 1})
+        self.assertEqual((response.data['item_count'], response.data['total_price']), (2, '12.50'))
+
+        response = self.client.delete(reverse('cart-item', args=[self.b.pk]))
+        self.assertEqual((response.data['item_count'], response.data['total_price']), (1, '10.00'))
+        self.assertEqual([item['product'] for item in response.data['items']], [self.a.pk])
+
+    def test_stock_hint_from_cache(self):
+        self.add(self.a)
+        with self.assertNumQueries(2):  # cart + items; the product comes from the cache
+            response = self.client.get(reverse('cart'))
+        self.assertEqual(response.data['items'][0]['stock'], 5)
+        self.assertEqual(self.add(self.a, 9).status_code, status.HTTP_400_BAD_REQUEST)
+
+    # ✅ Checkout places one order, takes the stock and empties the cart
+    def test_checkout(self):
+        self.add(self.a, 2)
+        self.add(self.b, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('cart-checkout'))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['total_price'], '27.50')
+        self.assertEqual(len(response.data['items']), 2)
+        self.a.refresh_from_db()
+        self.b.refresh_from_db()
+        self.assertEqual((self.a.stock, self.b.stock), (3, 0))
+        self.assertEqual(self.client.get(reverse('cart')).data['item_count'], 0)
+        # ✅ The cached stock hint was dropped once the order committed
+        self.assertEqual(self.add(self.b).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_checkout_is_all_or_nothing(self):
+        self.add(self.a, 2)
+        self.add(self.b, 3)
+        Product.objects.filter(pk=self.b.pk).update(stock=1)
+        response = self.client.post(reverse('cart-checkout'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Insufficient stock for B', response.data['error'])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(pk=self.a.pk).stock, 5)
+        self.assertEqual(self.client.get(reverse('cart')).data['item_count'], 5)
+
+    def test_empty_cart_checkout(self):
+        self.assertEqual(self.client.post(reverse('cart-checkout')).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deleted_product_leaves_cart(self):
+        self.add(self.a, 2)
+        self.add(self.b)
+        self.b.delete()
+        response = self.client.get(reverse('cart'))
+        self.assertEqual((response.data['item_count'], response.data['total_price']), (2, '20.00'))
+
+class AllocationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='shipper', email='shipper@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        self.north = Warehouse.objects.create(code='N', name='North', latitude=60, longitude=10)
+        self.south = Warehouse.objects.create(code='S', name='South', latitude=40, longitude=10)
+        self.west = Warehouse.objects.create(code='W', name='West', latitude=50, longitude=-30)
+        self.a = Product.objects.create(name='A', price=10)
+        self.b = Product.objects.create(name='B', price=10)
+        for product, warehouse, quantity in [(self.a, self.north, 5), (self.a, self.south, 5),
+                                             (self.b, self.south, 2), (self.b, self.west, 10)]:
+            StockLevel.objects.create(product=product, warehouse=warehouse, quantity=quantity)
+
+    def order(self, lines, ship_to=None):
+        data = {'items': [{'product': product.pk, 'quantity': quantity, 'price': 10} for product, quantity in lines]}
+        if ship_to:
+            data.update(ship_to_latitude=ship_to[0], ship_to_longitude=ship_to[1])
+        return self.client.post(reverse('order-create'), data, format='json')
+
+    def allocations(self, response):
+        return sorted(OrderAllocation.objects.filter(order_id=response.data['id'])
+                      .values_list('product__name', 'warehouse__code', 'quantity'))
+
+    def test_product_stock_is_the_warehouse_total(self):
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.stock, 10)
+
+    # ✅ One warehouse beats a nearer split; among single warehouses the nearest wins
+    def test_fewest_splits_then_nearest(self):
+        response = self.order([(self.a, 2), (self.b, 2)], ship_to=(61, 10))
+        self.assertEqual(self.allocations(response), [('A', 'S', 2), ('B', 'S', 2)])
+        response = self.order([(self.a, 1)], ship_to=(61, 10))
+        self.assertEqual(self.allocations(response), [('A', 'N', 1)])
+
+    def test_split_when_no_warehouse_has_enough(self):
+        response = self.order([(self.a, 8)], ship_to=(41, 10))
+        self.assertEqual(self.allocations(response), [('A', 'N', 3), ('A', 'S', 5)])
+        self.assertEqual(StockLevel.objects.filter(product=self.a).aggregate(total=Sum('quantity'))['total'], 2)
+
+    def test_shortage_writes_nothing(self):
+        StockLevel.objects.filter(product=self.a).update(quantity=0)  # Product.stock still says 10
+        response = self.order([(self.a, 1)])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(pk=self.a.pk).stock, 10)
+
+    def test_plan_in_memory(self):
+        levels = {1: {10: 4, 11: 1}, 2: {10: 4}, 3: {11: 5}}
+        self.assertEqual(inventory.plan({10: 4, 11: 5}, levels, {1: 0, 2: 0, 3: 0}), [(10, 1, 4), (11, 3, 5)])
+
+    # ✅ Stock follows demand; inactive warehouses are emptied
+    def test_rebalance_stock(self):
+        self.order([(self.b, 1)], ship_to=(50, -31))
+        self.west.is_active = False
+        self.west.save()
+        call_command('rebalance_stock', stdout=io.StringIO())
+        self.assertEqual(dict(StockLevel.objects.filter(product=self.b).values_list('warehouse__code', 'quantity')),
+                         {'S': 11, 'W': 0})
+        self.assertEqual(dict(StockLevel.objects.filter(product=self.a).values_list('warehouse__code', 'quantity')),
+                         {'N': 5, 'S': 5})
+        self.assertEqual(Product.objects.get(pk=self.b.pk).stock, 11)
+
+class StockDecrementTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='racer', email='racer@example.com', password='pass')
+        self.product = Product.objects.create(name='Hot', price=5, stock=3)
+
+    def test_lock_mode_is_the_default(self):
+        self.assertTrue(inventory.locks_stock())
+
+    # ✅ Conditional mode: the stock UPDATE is the transaction's last product write
+    @override_settings(ORDER_STOCK_DECREMENT='conditional')
+    def test_conditional_update_runs_after_the_inserts(self):
+        with CaptureQueriesContext(connection) as queries:
+            create_order(self.user, [(self.product.pk, 2, None)])
+        statements = [query['sql'] for query in queries.captured_queries]
+        stock_update = next(i for i, sql in enumerate(statements) if sql.startswith('UPDATE "products_product"'))
+        item_insert = next(i for i, sql in enumerate(statements) if sql.startswith('INSERT INTO "orders_orderitem"'))
+        self.assertGreater(stock_update, item_insert)
+        self.assertFalse(any('FOR UPDATE' in sql for sql in statements))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+
+    @override_settings(ORDER_STOCK_DECREMENT='conditional')
+    def test_conditional_update_rolls_back_when_short(self):
+        with self.assertRaisesMessage(DjangoValidationError, 'Insufficient stock for Hot. Available: 3'):
+            create_order(self.user, [(self.product.pk, 4, None)])
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+    @override_settings(ORDER_STOCK_DECREMENT='lock')
+    def test_lock_mode(self):
+        order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=order, product=self.product, quantity=3)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+        with self.assertRaises(DjangoValidationError):
+            OrderItem.objects.create(order=order, product=self.product, quantity=1)
+        self.assertEqual(order.items.count(), 1)
+
+    @override_settings(ORDER_STOCK_DECREMENT='optimistic')
+    def test_unknown_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            create_order(self.user, [(self.product.pk, 1, None)])
+
+class UserOrderStatsTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='regular', email='regular@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(name='Widget', price='12.50', stock=100)
+
+    def place(self, quantity=1):
+        return create_order(self.user, [(self.product.pk, quantity, None)])
+
+    def stats(self):
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))  # as loaded per request
+        response = self.client.get(reverse('user-profile'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['order_stats']
+
+    # ✅ Placing, paying, refunding and cancelling each adjust the stored row
+    def test_incremental_updates(self):
+        self.assertEqual(self.stats()['order_count'], 0)
+        first, second, third = self.place(2), self.place(1), self.place(4)
+        for order in (first, second):
+            order.is_paid = True
+            order.save()
+        third.status = 'cancelled'
+        third.save()
+        stats = self.stats()
+        self.assertEqual((stats['order_count'], stats['paid_order_count'], stats['cancelled_order_count']), (2, 2, 1))
+        self.assertEqual(stats['lifetime_spend'], '37.50')
+
+        response = self.client.patch(reverse('order-cancellation', args=[second.pk]), {'status': 'cancelled'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = self.stats()
+        self.assertEqual((stats['order_count'], stats['paid_order_count'], stats['lifetime_spend']), (1, 1, '25.00'))
+        self.assertIsNotNone(stats['last_order_at'])
+
+    # ✅ Reopening a cancelled order or taking a payment back undoes what was counted
+    def test_reverse_transitions(self):
+        order = self.place(2)
+        order.is_paid = True
+        order.save()
+        order.is_paid = False
+        order.save()
+        stats = self.stats()
+        self.assertEqual((stats['order_count'], stats['paid_order_count'], stats['lifetime_spend']), (1, 0, '0.00'))
+
+        order.status = 'cancelled'
+        order.save()
+        order.status = 'pending'
+        order.save()
+        stats = self.stats()
+        self.assertEqual((stats['order_count'], stats['cancelled_order_count']), (1, 0))
+
+        order.is_paid = True
+        order.save()
+        stale = Order.objects.get(pk=order.pk)
+        stale.is_paid = False  # not written: update_total_price() only saves the total
+        OrderItem.objects.filter(order=order).update(quantity=4)
+        stale.update_total_price()
+        stats = self.stats()
+        self.assertEqual((stats['paid_order_count'], stats['lifetime_spend']), (1, '50.00'))
+        [recomputed] = user_stats.compute([self.user.pk])
+        self.assertEqual(UserOrderStats.objects.values(*user_stats.STATS_FIELDS).get(),
+                         {field: getattr(recomputed, field) for field in user_stats.STATS_FIELDS})
+
+    def test_profile_reads_one_row(self):
+        self.place()
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        with self.assertNumQueries(1):
+            self.client.get(reverse('user-profile'))
+
+    def test_backfill_matches_incremental(self):
+        order = self.place(3)
+        order.is_paid = True
+        order.save()
+        self.place(1)
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass')
+        expected = list(UserOrderStats.objects.order_by('user_id').values())
+        UserOrderStats.objects.all().delete()
+        call_command('backfill_user_order_stats', chunk_size=1, stdout=io.StringIO())
+        rebuilt = list(UserOrderStats.objects.order_by('user_id').values())
+        for row in expected + rebuilt:
+            row.pop('updated_at')
+        self.assertEqual(rebuilt[0], expected[0])
+        self.assertEqual(rebuilt[1]['user_id'], other.pk)
+        self.assertEqual(rebuilt[1]['order_count'], 0)
+
+class OrderArchiveTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='veteran', email='veteran@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(name='Kettle', price='20.00', stock=100)
+        long_ago = timezone.now() - timedelta(days=800)
+        self.old_delivered = self.place(2, status='delivered', created_at=long_ago)
+        self.old_pending = self.place(1, created_at=long_ago + timedelta(days=1))
+        self.recent_delivered = self.place(3, status='delivered')
+
+    def place(self, quantity, status=None, created_at=None):
+        order = create_order(self.user, [(self.product.pk, quantity, None)])
+        if status:
+            order.status = status
+            order.save()
+        if created_at:
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        return order
+
+    # ✅ Only old closed orders move, with their items and history
+    def test_archive_moves_old_closed_orders(self):
+        call_command('archive_orders', batch_size=1, sleep=0, stdout=io.StringIO())
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)),
+                         {self.old_pending.pk, self.recent_delivered.pk})
+        archived = ArchivedOrder.objects.get()
+        self.assertEqual((archived.pk, archived.status, archived.total_price), (self.old_delivered.pk, 'delivered', 40))
+        self.assertEqual(list(archived.items.values_list('product_name', 'quantity')), [('Kettle', 2)])
+        self.assertEqual(archived.status_history.get().new_status, 'delivered')
+        self.assertFalse(OrderItem.objects.filter(order_id=self.old_delivered.pk).exists())
+
+    # ✅ History endpoints read live and archived orders as one list
+    def test_history_spans_live_and_archive(self):
+        before = self.client.get(reverse('order-list')).data
+        call_command('archive_orders', sleep=0, stdout=io.StringIO())
+        response = self.client.get(reverse('order-list'))
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([order['id'] for order in response.data['results']],
+                         [self.recent_delivered.pk, self.old_pending.pk, self.old_delivered.pk])
+        self.assertEqual(response.data['results'][2]['items'][0]['product_name'], 'Kettle')
+        self.assertEqual(response.data['results'], before['results'])
+
+        page = self.client.get(reverse('order-list'), {'page_size': 2, 'page': 2}).data
+        self.assertEqual([order['id'] for order in page['results']], [self.old_delivered.pk])
+
+        detail = self.client.get(reverse('order-detail', args=[self.old_delivered.pk]))
+        self.assertEqual(detail.status_code, status.HTTP_200_OK)
+        self.assertEqual(detail.data['total_price'], '40.00')
+
+        stranger = User.objects.create_user(username='stranger', email='stranger@example.com', password='pass')
+        self.client.force_authenticate(stranger)
+        detail = self.client.get(reverse('order-detail', args=[self.old_delivered.pk]))
+        self.assertEqual(detail.status_code, status.HTTP_404_NOT_FOUND)
+
+    # ✅ Lifetime stats recomputed after archiving still count archived orders
+    def test_backfill_counts_archived_orders(self):
+        self.old_delivered.is_paid = True
+        self.old_delivered.save()
+        expected = UserOrderStats.objects.values(
+            'order_count', 'paid_order_count', 'lifetime_spend').get(user=self.user)
+        call_command('archive_orders', sleep=0, stdout=io.StringIO())
+        UserOrderStats.objects.all().delete()
+        call_command('backfill_user_order_stats', stdout=io.StringIO())
+        stats = UserOrderStats.objects.get(user=self.user)
+        self.assertEqual(stats.order_count, 3)
+        self.assertEqual({'order_count': stats.order_count, 'paid_order_count': stats.paid_order_count,
+                          'lifetime_spend': stats.lifetime_spend}, expected)
+        self.assertEqual(stats.last_order_at, Order.objects.get(pk=self.recent_delivered.pk).created_at)
+
+    def test_dry_run(self):
+        out = io.StringIO()
+        call_command('archive_orders', dry_run=True, stdout=out)
+        self.assertIn('1 orders', out.getvalue())
+        self.assertFalse(ArchivedOrder.objects.exists())
+
+if __name__ == "__main__":
+    import unittest
     unittest.main()
\ No newline at end of file
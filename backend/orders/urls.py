@@ -1,12 +1,18 @@
-from django.urls import path
-from .views import OrderListView, OrderCreateView, \
-    OrderDetailView, PaymentView, CancellationView
-
-urlpatterns = [
-    path('', OrderListView.as_view(), name='order-list'),
-    path('create/', OrderCreateView.as_view(), name='order-create'),
-    path('<int:pk>/', OrderDetailView.as_view(), name='order-detail'),
-    path('orders/<int:pk>/payment/', PaymentView.as_view(), name='order-payment'),
-    path('orders/<int:pk>/cancel/', CancellationView.as_view(), name='order-cancellation'),
-    path('payments/', PaymentView.as_view(), name='order-payment'),
-]
+from django.urls import path
+from .views import OrderListView, OrderCreateView, \
+    OrderDetailView, PaymentView, CancellationView, OrderExportView, \
+    CartView, CartItemListView, CartItemView, CheckoutView
+
+urlpatterns = [
+    path('', OrderListView.as_view(), name='order-list'),
+    path('create/', OrderCreateView.as_view(), name='order-create'),
+    path('<int:pk>/', OrderDetailView.as_view(), name='order-detail'),
+    path('orders/<int:pk>/payment/', PaymentView.as_view(), name='order-payment'),
+    path('orders/<int:pk>/cancel/', CancellationView.as_view(), name='order-cancellation'),
+    path('payments/', PaymentView.as_view(), name='order-payment'),
+    path('export/', OrderExportView.as_view(), name='order-export'),
+    path('cart/', CartView.as_view(), name='cart'),
+    path('cart/items/', CartItemListView.as_view(), name='cart-items'),
+    path('cart/items/<int:product_id>/', CartItemView.as_view(), name='cart-item'),
+    path('cart/checkout/', CheckoutView.as_view(), name='cart-checkout'),
+]
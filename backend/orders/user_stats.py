@@ -0,0 +1,90 @@
+"""
+Incremental maintenance of UserOrderStats. Every change is a single UPDATE with
+F() arithmetic on the customer's row (created on first use), so concurrent
+orders from one customer never lose counts and account pages read one row.
+
+An order adds what it counts for in its current state (see contribution(), the
+same rules as compute()); a save applies the difference between its states
+before and after, so a change in either direction (payment, refund, cancelling,
+reopening, a new total) keeps the row right.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import Coalesce, Greatest
+from .models import ArchivedOrder, Order, UserOrderStats
+
+STATS_FIELDS = ['order_count', 'paid_order_count', 'cancelled_order_count', 'lifetime_spend', 'last_order_at']
+# Order fields the counts depend on
+TRACKED_FIELDS = ['status', 'is_paid', 'is_refunded', 'total_price']
+
+
+def _apply(user_id, **changes):
+    UserOrderStats.objects.bulk_create([UserOrderStats(user_id=user_id)], ignore_conflicts=True)
+    UserOrderStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def contribution(status, is_paid, is_refunded, total_price):
+    """What one order in this state adds to its customer's counters."""
+    paid = is_paid and not is_refunded
+    return {
+        'order_count': int(status != 'cancelled'),
+        'paid_order_count': int(paid),
+        'cancelled_order_count': int(status == 'cancelled'),
+        'lifetime_spend': Decimal(str(total_price)) if paid else Decimal(0),
+    }
+
+
+def order_created(order):
+    counts = contribution(*(getattr(order, field) for field in TRACKED_FIELDS))
+    _apply(order.user_id, **{field: F(field) + delta for field, delta in counts.items() if delta},
+           last_order_at=Greatest(Coalesce('last_order_at', order.created_at), order.created_at))
+
+
+def order_updated(previous, order, update_fields=None):
+    """
+    Move the counters from ``previous`` (the row before the save) to ``order``.
+    With ``update_fields``, only those fields were written; the rest keep their old values.
+    """
+    before = contribution(*(getattr(previous, field) for field in TRACKED_FIELDS))
+    after = contribution(*(
+        getattr(order if update_fields is None or field in update_fields else previous, field)
+        for field in TRACKED_FIELDS
+    ))
+    changes = {field: F(field) + (after[field] - before[field]) for field in after if after[field] != before[field]}
+    if changes:
+        _apply(order.user_id, **changes)
+
+
+def compute(user_ids):
+    """
+    Stats recomputed for ``user_ids`` from Order and ArchivedOrder together, as
+    unsaved rows (users without orders included).
+    """
+    paid = Q(is_paid=True, is_refunded=False)
+    stats = {user_id: UserOrderStats(user_id=user_id) for user_id in user_ids}
+    for model in (Order, ArchivedOrder):
+        rows = model.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+            order_count=Count('id', filter=~Q(status='cancelled')),
+            paid_order_count=Count('id', filter=paid),
+            cancelled_order_count=Count('id', filter=Q(status='cancelled')),
+            lifetime_spend=Sum('total_price', filter=paid),
+            last_order_at=Max('created_at'),
+        ).order_by()
+        for row in rows:
+            row_stats = stats[row['user_id']]
+            row_stats.order_count += row['order_count']
+            row_stats.paid_order_count += row['paid_order_count']
+            row_stats.cancelled_order_count += row['cancelled_order_count']
+            row_stats.lifetime_spend += row['lifetime_spend'] or 0
+            if row_stats.last_order_at is None or row['last_order_at'] > row_stats.last_order_at:
+                row_stats.last_order_at = row['last_order_at']
+    return list(stats.values())
+
+
+def backfill(user_ids):
+    """Overwrite the stats of ``user_ids`` with recomputed ones in one upsert."""
+    rows = compute(user_ids)
+    UserOrderStats.objects.bulk_create(rows, update_conflicts=True, unique_fields=['user'],
+                                       update_fields=STATS_FIELDS + ['updated_at'])
+    return len(rows)
@@ -1,113 +1,253 @@
-from django.db import transaction
-from django.urls import reverse
-from rest_framework import generics, permissions, status
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.response import Response
-from .models import Order
-from .serializers import OrderSerializer, PaymentSerializer,\
-     CancellationSerializer, PaymentSerializer
-import stripe
-from rest_framework.views import APIView
-from django.conf import settings
-
-# Set your Stripe secret key
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
-# ✅ Pagination for orders
-class OrderPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-# ✅ List all orders for the authenticated user
-class OrderListView(generics.ListAPIView):
-    serializer_class = OrderSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    pagination_class = OrderPagination
-
-    def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).order_by('-created_at')
-
-# ✅ Create a new order with transaction management
-class OrderCreateView(generics.CreateAPIView):
-    serializer_class = OrderSerializer
-    permission_classes = [permissions.IsAuthenticated]
-
-    def perform_create(self, serializer):
-        serializer.save()  # ✅ No need to pass user explicitly
-
-# ✅ Retrieve and update order details
-class OrderDetailView(generics.RetrieveUpdateAPIView):
-    serializer_class = OrderSerializer
-    permission_classes = [permissions.IsAuthenticated]
-
-    def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
-
-    def partial_update(self, request, *args, **kwargs):
-        allowed_fields = {'status', 'is_paid'}
-        if set(request.data.keys()) - allowed_fields:
-            return Response({"detail": "Only status and is_paid can be updated."}, status=400)
-        response = super().partial_update(request, *args, **kwargs)
-        return Response(response.data, status=202)
-
-class PaymentView(APIView):
-    def post(self, request):
-        serializer = PaymentSerializer(data=request.data)
-        if serializer.is_valid():
-            order_id = serializer.validated_data['order_id']
-            token = serializer.validated_data['token']
-            order = Order.objects.get(id=order_id)
-
-            try:
-                # Create Stripe charge
-                charge = stripe.Charge.create(
-                    amount=int(order.total_price * 100),  # Convert to cents
-                    currency='usd',
-                    description=f'Order #{order.id}',
-                    source=token,
-                )
-
-                # Update order on success
-                order.payment_id = charge["id"]
-                order.payment_status = 'paid'
-                order.is_paid = True
-                order.status = 'processing'  # Auto-move to processing
-                order.save()
-
-                return Response({'message': 'Payment successful', 'payment_id': charge["id"]}, status=status.HTTP_200_OK)
-
-            except stripe.error.StripeError as e:
-                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-    def update(self, request, *args, **kwargs):
-        order = self.get_object()
-        serializer = self.get_serializer(order, data=request.data, partial=True)
-        serializer.is_valid(raise_exception=True)
-        
-        if serializer.validated_data.get('payment_status') == 'success':
-            serializer.save(is_paid=True)
-        else:
-            serializer.save(is_paid=False)
-        
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-class CancellationView(generics.UpdateAPIView):
-    queryset = Order.objects.all()
-    serializer_class = CancellationSerializer
-    permission_classes = [permissions.IsAuthenticated]
-
-    def update(self, request, *args, **kwargs):
-        order = self.get_object()
-
-        if order.status == 'delivered':
-            return Response({"error": "Delivered orders cannot be cancelled."},
-                            status=status.HTTP_400_BAD_REQUEST)
-        
-        serializer = self.get_serializer(order, data=request.data, partial=True)
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+import heapq
+import time
+from itertools import groupby
+from operator import itemgetter
+from django.db import transaction
+from django.urls import reverse
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from . import archive, cart
+from .models import ArchivedOrder, Order
+from .serializers import OrderSerializer, PaymentSerializer,\
+     CancellationSerializer, PaymentSerializer, CartSerializer, CartItemSerializer, CheckoutSerializer, \
+     ArchivedOrderSerializer, serialize_orders
+import stripe
+from rest_framework.views import APIView
+from django.conf import settings
+from shoply import metrics
+from shoply.conditional import conditional_get
+from shoply.pagination import EstimatedCountPagination
+from shoply.streaming import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, streaming_export
+from products.filters import TRUE_VALUES
+
+# Set your Stripe secret key
+stripe.api_key = settings.STRIPE_SECRET_KEY
+
+# ✅ Pagination for orders (estimated count for very large results)
+class OrderPagination(EstimatedCountPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+# ✅ List all orders for the authenticated user, live and archived
+class OrderListView(generics.ListAPIView):
+    serializer_class = OrderSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OrderPagination
+
+    def get_queryset(self):
+        return archive.order_history(self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        # Page over (id, created_at) across both tables, then load only that page's orders
+        page = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(serialize_orders(archive.load_orders(page)))
+
+# ✅ Create a new order with transaction management
+class OrderCreateView(generics.CreateAPIView):
+    serializer_class = OrderSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def perform_create(self, serializer):
+        serializer.save()  # ✅ No need to pass user explicitly
+
+def order_freshness(request, pk, *args, **kwargs):
+    updated_at = Order.objects.filter(pk=pk, user=request.user)\
+        .values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        updated_at = ArchivedOrder.objects.filter(pk=pk, user=request.user)\
+            .values_list('updated_at', flat=True).first()
+    return (updated_at.isoformat(), updated_at) if updated_at else None
+
+# ✅ Retrieve and update order details
+class OrderDetailView(generics.RetrieveUpdateAPIView):
+    serializer_class = OrderSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Order.objects.filter(user=self.request.user)
+
+    @conditional_get(order_freshness)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # ✅ Archived orders are read-only but still retrievable
+            archived = get_object_or_404(ArchivedOrder.objects.prefetch_related('items'),
+                                         pk=kwargs['pk'], user=request.user)
+            return Response(ArchivedOrderSerializer(archived).data)
+
+    def partial_update(self, request, *args, **kwargs):
+        allowed_fields = {'status', 'is_paid'}
+        if set(request.data.keys()) - allowed_fields:
+            return Response({"detail": "Only status and is_paid can be updated."}, status=400)
+        response = super().partial_update(request, *args, **kwargs)
+        return Response(response.data, status=202)
+
+class PaymentView(APIView):
+    def post(self, request):
+        serializer = PaymentSerializer(data=request.data)
+        if serializer.is_valid():
+            order_id = serializer.validated_data['order_id']
+            token = serializer.validated_data['token']
+            order = Order.objects.get(id=order_id)
+
+            try:
+                # Create Stripe charge
+                started = time.perf_counter()
+                outcome = 'error'
+                try:
+                    charge = stripe.Charge.create(
+                        amount=int(order.total_price * 100),  # Convert to cents
+                        currency='usd',
+                        description=f'Order #{order.id}',
+                        source=token,
+                    )
+                    outcome = 'success'
+                finally:
+                    metrics.PAYMENT_PROVIDER_DURATION.observe(time.perf_counter() - started, 'stripe', outcome)
+
+                # Update order on success
+                order.payment_id = charge["id"]
+                order.payment_status = 'paid'
+                order.is_paid = True
+                order.status = 'processing'  # Auto-move to processing
+                order.save()
+
+                return Response({'message': 'Payment successful', 'payment_id': charge["id"]}, status=status.HTTP_200_OK)
+
+            except stripe.error.StripeError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def update(self, request, *args, **kwargs):
+        order = self.get_object()
+        serializer = self.get_serializer(order, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        
+        if serializer.validated_data.get('payment_status') == 'success':
+            serializer.save(is_paid=True)
+        else:
+            serializer.save(is_paid=False)
+        
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+class CancellationView(generics.UpdateAPIView):
+    queryset = Order.objects.all()
+    serializer_class = CancellationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def update(self, request, *args, **kwargs):
+        order = self.get_object()
+
+        if order.status == 'delivered':
+            return Response({"error": "Delivered orders cannot be cancelled."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = self.get_serializer(order, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+# ✅ Stream all orders with their items as NDJSON or CSV (Admin only)
+class OrderExportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    order_fields = ['id', 'user_id', 'created_at', 'total_price', 'is_paid',
+                    'payment_status', 'status', 'is_refunded']
+    item_fields = ['items__id', 'items__product_id', 'items__quantity', 'items__price']
+
+    def get(self, request):
+        export_format = request.query_params.get('fmt', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # One LEFT JOIN over a server-side cursor: an order's items arrive as
+        # consecutive rows, so nothing beyond the current order is held in memory.
+        # ?include_archived=true merges in ArchivedOrder (same columns, disjoint ids) in id order.
+        querysets = [Order.objects.order_by('id', 'items__id')]
+        if request.query_params.get('include_archived', '').lower() in TRUE_VALUES:
+            querysets.append(ArchivedOrder.objects.order_by('id', 'items__id'))
+
+        def rows():
+            return heapq.merge(*(
+                queryset.values_list(*self.order_fields, *self.item_fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+                for queryset in querysets
+            ), key=itemgetter(0))
+
+        def records():
+            width = len(self.order_fields)
+            for _, order_rows in groupby(rows(), key=itemgetter(0)):
+                order_rows = list(order_rows)
+                record = dict(zip(self.order_fields, order_rows[0][:width]))
+                record['items'] = [
+                    {'id': row[width], 'product_id': row[width + 1],
+                     'quantity': row[width + 2], 'price': row[width + 3]}
+                    for row in order_rows if row[width] is not None
+                ]
+                yield record
+
+        header = self.order_fields + ['item_id', 'product_id', 'quantity', 'price']
+        return streaming_export('orders', export_format, records, header, rows)
+
+# ✅ The authenticated user's cart with running totals and cached stock hints
+class CartView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response(CartSerializer(cart.get_cart(request.user)).data)
+
+# ✅ Add a product to the cart (adds to the quantity if it is already there)
+class CartItemListView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = CartItemSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            updated = cart.set_quantity(request.user, serializer.validated_data['product'],
+                                        serializer.validated_data['quantity'], add=True)
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(CartSerializer(updated).data)
+
+# ✅ Change the quantity of one cart line, or remove it
+class CartItemView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def patch(self, request, product_id):
+        serializer = CartItemSerializer(data={'product': product_id, 'quantity': request.data.get('quantity')})
+        serializer.is_valid(raise_exception=True)
+        try:
+            updated = cart.set_quantity(request.user, product_id, serializer.validated_data['quantity'])
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(CartSerializer(updated).data)
+
+    def delete(self, request, product_id):
+        try:
+            updated = cart.remove_item(request.user, product_id)
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_404_NOT_FOUND)
+        return Response(CartSerializer(updated).data)
+
+# ✅ Place an order for everything in the cart
+class CheckoutView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = CheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            order = cart.checkout(request.user, serializer.validated_data['destination'])
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
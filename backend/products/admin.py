@@ -1,7 +1,22 @@
-from django.contrib import admin
-from .models import Product
-
-@admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'price', 'stock', 'created_at')
-    search_fields = ('name',)
+from django.contrib import admin
+from shoply.pagination import EstimatedCountPaginator
+from .models import Product, StockLevel, Warehouse
+
+class StockLevelInline(admin.TabularInline):
+    model = StockLevel
+    extra = 0
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ('name', 'price', 'stock', 'created_at')
+    search_fields = ('name',)  # also backs the product autocomplete on order items
+    ordering = ('-id',)
+    inlines = (StockLevelInline,)
+    # ✅ Planner estimate instead of COUNT(*) on large tables
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+@admin.register(Warehouse)
+class WarehouseAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'latitude', 'longitude', 'is_active')
+    list_filter = ('is_active',)
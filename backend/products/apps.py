@@ -1,6 +1,12 @@
-from django.apps import AppConfig
-
-
-class ProductsConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'products'
+from django.apps import AppConfig
+
+
+class ProductsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'products'
+
+    def ready(self):
+        import products.signals  # ✅ Register signals
+        import products.checks  # ✅ Register system checks
+        from .autocomplete import register_metrics
+        register_metrics()
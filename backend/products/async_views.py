@@ -0,0 +1,49 @@
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import serializers
+from shoply.renderers import FastJSONRenderer
+from .filters import filter_products, parse_product_fields, parse_product_filters
+from .models import Product
+from .serializers import PRODUCT_FIELDS, serialize_product_rows
+
+# Async-native catalog reads. Served under ASGI (shoply/asgi.py) a slow client only
+# holds a coroutine, not a worker thread. The query parameters and response bodies
+# are the same as ProductListView / ProductDetailView.
+
+_renderer = FastJSONRenderer()
+
+
+def json_response(data, status=200):
+    return HttpResponse(_renderer.render(data), content_type='application/json', status=status)
+
+
+# ✅ List all products, async (Public)
+class AsyncProductListView(View):
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request):
+        try:
+            fields = parse_product_fields(request.GET, PRODUCT_FIELDS)
+            filters = parse_product_filters(request.GET)
+        except serializers.ValidationError as exc:
+            return json_response(exc.detail, status=400)
+
+        rows = filter_products(Product.objects.all(), filters).values(*fields)
+        return json_response(serialize_product_rows([row async for row in rows], fields, request))
+
+
+# ✅ Retrieve a single product, async (Public)
+class AsyncProductDetailView(View):
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request, pk):
+        try:
+            fields = parse_product_fields(request.GET, PRODUCT_FIELDS)
+        except serializers.ValidationError as exc:
+            return json_response(exc.detail, status=400)
+
+        try:
+            row = await Product.objects.values(*fields).aget(pk=pk)
+        except Product.DoesNotExist:
+            return json_response({"detail": "No Product matches the given query."}, status=404)
+        return json_response(serialize_product_rows([row], fields, request)[0])
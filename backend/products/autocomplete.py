@@ -0,0 +1,245 @@
+"""
+In-memory prefix index for search-box suggestions.
+
+Each process keeps every product name (case- and accent-folded) once, plus one
+sorted ``array('q')`` of (product id, word offset) pairs ordered by the name
+suffix each pair starts, so "lap" finds "Gaming Laptop". A lookup is two
+bisections plus a popularity top-N over the matching range, with no SQL and no
+per-entry string copies. The top results of broad prefixes (wide ranges) are
+memoised until the next change.
+
+The index is built on first use. The local process applies product changes
+through products/signals.py; other processes pick them up from the ProductChange
+log (once settled, see products/changes.py) at most every AUTOCOMPLETE_SYNC_SECONDS,
+or rebuild when the log no longer goes back to their watermark.
+Popularity is units sold over the last 7 days from the best-sellers buckets,
+refreshed every AUTOCOMPLETE_POPULARITY_SECONDS.
+"""
+import heapq
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from shoply import metrics
+from .changes import cursor_expired, settled_changes, settled_watermark
+from .models import Product, ProductSalesBucket
+
+OFFSET_BITS = 16
+OFFSET_MASK = (1 << OFFSET_BITS) - 1
+MEMO_MIN_RANGE = 256  # ranges at least this wide get their top results memoised
+MEMO_MAX_ENTRIES = 10_000
+SYNC_BATCH = 5_000
+
+
+def normalize(text):
+    """Casefold, strip accents and collapse whitespace."""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return ' '.join(''.join(c for c in text if not unicodedata.combining(c)).split())
+
+
+def word_offsets(name):
+    """Offsets of the first character of every word in a normalized name."""
+    return [0] + [i + 1 for i, c in enumerate(name) if c == ' ']
+
+
+class PrefixIndex:
+    """Sorted suffix entries over normalized names; see the module docstring."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.entries = array('q')
+            self.names = {}    # id -> normalized name (what entries point into)
+            self.display = {}  # id -> name as shown
+            self.popularity = {}
+            self.memo = {}
+            self.watermark = None  # last ProductChange id applied; None until built
+            self.synced_at = self.popularity_at = 0.0
+            self.lookups = 0
+            self.lookup_seconds = 0.0
+
+    def suffix(self, entry):
+        return self.names[entry >> OFFSET_BITS][entry & OFFSET_MASK:]
+
+    # Building and incremental updates
+
+    def build(self):
+        """Load the whole catalog. Changes after the (settled) watermark are applied again by sync()."""
+        with self.lock:
+            watermark = settled_watermark()
+            self.reset()
+            for pk, name in Product.objects.values_list('id', 'name').iterator(chunk_size=5000):
+                self.display[pk], self.names[pk] = name, normalize(name)
+            self.entries = array('q', sorted(
+                (pk << OFFSET_BITS | offset for pk, name in self.names.items() for offset in word_offsets(name)),
+                key=self.suffix,
+            ))
+            self.watermark = watermark
+            self.synced_at = time.monotonic()
+            self.refresh_popularity()
+
+    def upsert(self, pk, name):
+        with self.lock:
+            normalized = normalize(name)
+            self.display[pk] = name
+            if self.names.get(pk) == normalized:
+                return
+            self._remove_entries(pk)
+            self.names[pk] = normalized
+            for offset in word_offsets(normalized):
+                entry = pk << OFFSET_BITS | offset
+                self.entries.insert(bisect_right(self.entries, normalized[offset:], key=self.suffix), entry)
+            self.memo.clear()
+
+    def remove(self, pk):
+        with self.lock:
+            self._remove_entries(pk)
+            self.names.pop(pk, None)
+            self.display.pop(pk, None)
+            self.memo.clear()
+
+    def _remove_entries(self, pk):
+        name = self.names.get(pk)
+        if name is None:
+            return
+        for offset in word_offsets(name):
+            entry = pk << OFFSET_BITS | offset
+            position = bisect_left(self.entries, name[offset:], key=self.suffix)
+            while self.entries[position] != entry:  # equal suffixes of other products come first
+                position += 1
+            del self.entries[position]
+
+    def sync(self, force=False):
+        """Build on first use; then apply other processes' changes and refresh popularity when due."""
+        with self.lock:
+            if self.watermark is None:
+                self.build()
+                return
+            now = time.monotonic()
+            if force or now - self.synced_at >= settings.AUTOCOMPLETE_SYNC_SECONDS:
+                if cursor_expired(self.watermark):  # idle past the change log's retention
+                    self.build()
+                    return
+                self.apply_changes()
+                self.synced_at = now
+            if force or now - self.popularity_at >= settings.AUTOCOMPLETE_POPULARITY_SECONDS:
+                self.refresh_popularity()
+
+    def apply_changes(self):
+        while True:
+            changes = list(settled_changes(self.watermark)
+                           .order_by('id').values_list('id', 'product_id')[:SYNC_BATCH])
+            if not changes:
+                return
+            product_ids = {product_id for _, product_id in changes}
+            current = dict(Product.objects.filter(pk__in=product_ids).values_list('id', 'name'))
+            for pk in product_ids:
+                if pk in current:
+                    self.upsert(pk, current[pk])
+                else:
+                    self.remove(pk)
+            self.watermark = changes[-1][0]
+
+    def refresh_popularity(self):
+        since = timezone.now() - timedelta(days=7)
+        self.popularity = dict(
+            ProductSalesBucket.objects.filter(bucket_start__gte=since)
+            .values('product_id').annotate(units=Sum('units')).values_list('product_id', 'units')
+        )
+        self.popularity_at = time.monotonic()
+        self.memo.clear()
+
+    # Lookups
+
+    def suggest(self, query, limit=10):
+        """``[(id, name), ...]`` of the most popular products with a word starting with ``query``."""
+        started = time.perf_counter()
+        prefix = normalize(query)
+        with self.lock:
+            if not prefix:
+                return []
+            memo_key = (prefix, limit)
+            ranked = self.memo.get(memo_key)
+            if ranked is None:
+                low = bisect_left(self.entries, prefix, key=self.suffix)
+                high = bisect_left(self.entries, prefix + '\U0010ffff', low, key=self.suffix)
+                candidates = {entry >> OFFSET_BITS for entry in self.entries[low:high]}
+                popularity, names = self.popularity, self.names
+                ranked = heapq.nlargest(limit, candidates, key=lambda pk: (
+                    popularity.get(pk, 0), names[pk].startswith(prefix), -pk))
+                if high - low >= MEMO_MIN_RANGE:
+                    if len(self.memo) >= MEMO_MAX_ENTRIES:
+                        self.memo.clear()
+                    self.memo[memo_key] = ranked
+            results = [(pk, self.display[pk]) for pk in ranked]
+            self.lookups += 1
+            self.lookup_seconds += time.perf_counter() - started
+        return results
+
+    def stats(self):
+        """Sizes and approximate memory use (container plus string objects) of this process's index."""
+        with self.lock:
+            entries_bytes = sys.getsizeof(self.entries)
+            names_bytes = sys.getsizeof(self.names) + sum(map(sys.getsizeof, self.names.values()))
+            display_bytes = sys.getsizeof(self.display) + sum(
+                sys.getsizeof(name) for name in self.display.values())
+            popularity_bytes = sys.getsizeof(self.popularity)
+            return {
+                'built': self.watermark is not None,
+                'products': len(self.names),
+                'entries': len(self.entries),
+                'memoised_prefixes': len(self.memo),
+                'watermark': self.watermark,
+                'memory_bytes': {
+                    'entries': entries_bytes,
+                    'names': names_bytes,
+                    'display_names': display_bytes,
+                    'popularity': popularity_bytes,
+                    'total': entries_bytes + names_bytes + display_bytes + popularity_bytes,
+                },
+                'lookups': self.lookups,
+                'avg_lookup_us': round(self.lookup_seconds / self.lookups * 1e6, 2) if self.lookups else None,
+            }
+
+
+index = PrefixIndex()
+
+
+def suggest(query, limit=10):
+    index.sync()
+    return index.suggest(query, limit)
+
+
+def product_saved(pk, name):
+    """Apply a local save once committed; an index that is not built yet will load it anyway."""
+    if index.watermark is not None:
+        transaction.on_commit(lambda: index.upsert(pk, name))
+
+
+def product_deleted(pk):
+    if index.watermark is not None:
+        transaction.on_commit(lambda: index.remove(pk))
+
+
+def register_metrics():
+    def memory():
+        return [((), index.stats()['memory_bytes']['total'])]
+
+    def entries():
+        return [((), len(index.entries))]
+
+    metrics.REGISTRY.register_gauge(
+        'autocomplete_index_bytes', "Approximate memory used by this process's autocomplete index.", (), memory)
+    metrics.REGISTRY.register_gauge(
+        'autocomplete_index_entries', "Word-start entries in this process's autocomplete index.", (), entries)
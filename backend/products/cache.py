@@ -0,0 +1,36 @@
+"""
+Read-through cache of product rows for hot paths that only need a hint
+(cart stock badges, batch lookups). Entries are ``values(*PRODUCT_FIELDS)``
+dicts keyed by id; products/signals.py drops them on save/delete and set-based
+stock updates call invalidate() themselves, both once the write has committed.
+Checkout always re-reads the database. Invalidation only reaches other processes
+through a shared cache (REDIS_URL); otherwise entries expire after a few seconds.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from .models import Product
+from .serializers import PRODUCT_FIELDS
+
+CACHE_KEY = 'product:{}'
+
+
+def get_products(ids):
+    """``{id: row}`` for the given ids; missing products are simply absent."""
+    keys = {CACHE_KEY.format(pk): pk for pk in set(ids)}
+    cached = cache.get_many(keys)
+    rows = {keys[key]: row for key, row in cached.items()}
+    missing = [pk for key, pk in keys.items() if key not in cached]
+    if missing:
+        fetched = {row['id']: row for row in Product.objects.filter(pk__in=missing).values(*PRODUCT_FIELDS)}
+        cache.set_many({CACHE_KEY.format(pk): row for pk, row in fetched.items()},
+                       settings.PRODUCT_CACHE_SECONDS)
+        rows.update(fetched)
+    return rows
+
+
+def get_product(pk):
+    return get_products([pk]).get(pk)
+
+
+def invalidate(ids):
+    cache.delete_many([CACHE_KEY.format(pk) for pk in ids])
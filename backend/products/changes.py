@@ -0,0 +1,63 @@
+"""
+Reading the ProductChange log safely.
+
+Change ids come from a sequence, so they are handed out when a row is inserted
+but become visible when its transaction commits, not necessarily in id order:
+a reader can see change N+1 while N is still uncommitted. A consumer that moved
+its watermark past N+1 would never see N. So readers only get changes below the
+oldest one written since the horizon: the start of the oldest transaction that
+is still open and has written anything (on PostgreSQL, from pg_stat_activity),
+or now, whichever is earlier, less PRODUCT_CHANGES_SETTLE_SECONDS. An
+uncommitted change was written after its transaction started, so it is never
+below that bound however long the transaction runs; the settle margin covers
+clock differences between application servers and the database.
+
+Changes older than RETENTION_PRODUCT_CHANGE_DAYS are deleted (tasks/retention.py).
+A watermark from before the oldest change kept may have missed some, so
+cursor_expired() tells readers to resync from a full listing instead.
+
+The database role must see the other sessions' pg_stat_activity rows: connect
+every process as the same role, or grant the reader pg_read_all_stats. Otherwise
+only the settle window protects readers, for writes that commit within it.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+from shoply.db import oldest_write_transaction
+from tasks.models import RetentionCheckpoint
+from .models import ProductChange
+
+
+def settled_bound():
+    """Id of the oldest change written since the horizon (exclusive upper bound), or None."""
+    horizon = timezone.now()
+    oldest = oldest_write_transaction(ProductChange.objects.db)
+    if oldest is not None:
+        horizon = min(horizon, oldest)
+    horizon -= timedelta(seconds=settings.PRODUCT_CHANGES_SETTLE_SECONDS)
+    return ProductChange.objects.filter(changed_at__gte=horizon).aggregate(first=Min('id'))['first']
+
+
+def settled_changes(since):
+    """Changes after watermark ``since`` that are certainly committed, unordered."""
+    changes = ProductChange.objects.filter(id__gt=since)
+    bound = settled_bound()
+    return changes if bound is None else changes.filter(id__lt=bound)
+
+
+def cursor_expired(since):
+    """Whether retention has deleted changes after watermark ``since``."""
+    oldest = ProductChange.objects.aggregate(first=Min('id'))['first']
+    if oldest is None or since >= oldest - 1:
+        return False
+    return RetentionCheckpoint.objects.filter(policy='product-changes', total_deleted__gt=0).exists()
+
+
+def settled_watermark():
+    """The highest id a consumer that has everything up to now may record."""
+    bound = settled_bound()
+    if bound is not None:
+        return bound - 1
+    return ProductChange.objects.aggregate(last=Max('id'))['last'] or 0
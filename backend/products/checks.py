@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Cached product rows are only invalidated in every process when the cache is shared."""
+    if isinstance(caches['default'], LocMemCache) and settings.PRODUCT_CACHE_SECONDS > 10:
+        return [Warning(
+            "The default cache is per-process, so other processes keep serving cached product "
+            f"rows for up to PRODUCT_CACHE_SECONDS={settings.PRODUCT_CACHE_SECONDS} after a change.",
+            hint="Set REDIS_URL for a shared cache, or lower PRODUCT_CACHE_SECONDS.",
+            id='products.W001',
+        )]
+    return []
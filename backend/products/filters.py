@@ -0,0 +1,132 @@
+from decimal import Decimal, InvalidOperation
+from django.db.models import Count, Q
+from rest_framework import serializers
+
+# Upper bounds are exclusive; None means unbounded
+PRICE_BUCKETS = [
+    (None, Decimal('25')),
+    (Decimal('25'), Decimal('50')),
+    (Decimal('50'), Decimal('100')),
+    (Decimal('100'), Decimal('250')),
+    (Decimal('250'), Decimal('500')),
+    (Decimal('500'), None),
+]
+
+# Every ordering ends on id so pages are stable; each one is backed by an index
+ORDERINGS = {
+    'newest': ('-created_at', '-id'),
+    'oldest': ('created_at', 'id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+}
+
+TRUE_VALUES = {'1', 'true', 'yes'}
+
+
+def parse_product_fields(params, allowed):
+    """The ?fields=a,b,... sparse fieldset, in ``allowed`` order; all fields by default."""
+    raw = params.get('fields')
+    if not raw:
+        return list(allowed)
+    requested = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise serializers.ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}."})
+    return [name for name in allowed if name in requested]
+
+
+def parse_product_ids(raw, limit):
+    """Requested ids, from "1,2,3" or a JSON list, de-duplicated in request order."""
+    if isinstance(raw, str):
+        raw = [part for part in raw.split(',') if part.strip()]
+    if not isinstance(raw, (list, tuple)) or not raw:
+        raise serializers.ValidationError({"ids": "Give one or more product ids."})
+    try:
+        ids = list(dict.fromkeys(int(value) for value in raw))
+    except (TypeError, ValueError):
+        raise serializers.ValidationError({"ids": "Product ids must be integers."})
+    if len(ids) > limit:
+        raise serializers.ValidationError({"ids": f"At most {limit} ids per request."})
+    return ids
+
+
+def _decimal_param(params, name):
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        raise serializers.ValidationError({name: "Must be a number."})
+    if not value.is_finite() or value < 0:
+        raise serializers.ValidationError({name: "Must be a non-negative number."})
+    return value
+
+
+def parse_product_filters(params):
+    """Validate the filtering/sorting query parameters shared by product listings."""
+    filters = {
+        'min_price': _decimal_param(params, 'min_price'),
+        'max_price': _decimal_param(params, 'max_price'),
+        'in_stock': params.get('in_stock', '').lower() in TRUE_VALUES,
+        'ordering': params.get('ordering') or None,
+    }
+    if filters['ordering'] and filters['ordering'] not in ORDERINGS:
+        raise serializers.ValidationError({"ordering": f"Use one of: {', '.join(ORDERINGS)}."})
+    return filters
+
+
+def price_q(filters):
+    q = Q()
+    if filters['min_price'] is not None:
+        q &= Q(price__gte=filters['min_price'])
+    if filters['max_price'] is not None:
+        q &= Q(price__lte=filters['max_price'])
+    return q
+
+
+def stock_q(filters):
+    return Q(stock__gt=0) if filters['in_stock'] else Q()
+
+
+def filter_products(queryset, filters):
+    queryset = queryset.filter(price_q(filters) & stock_q(filters))
+    # Without ?ordering=, id order keeps pages stable
+    return queryset.order_by(*ORDERINGS.get(filters['ordering'], ('id',)))
+
+
+def _bucket_q(low, high):
+    q = Q()
+    if low is not None:
+        q &= Q(price__gte=low)
+    if high is not None:
+        q &= Q(price__lt=high)
+    return q
+
+
+def product_facets(queryset, filters):
+    """
+    Facet counts in a single aggregate query. Each facet applies every active
+    filter except its own, so the counts show what selecting it would yield.
+    """
+    price, stock = price_q(filters), stock_q(filters)
+    aggregates = {
+        'total': Count('id', filter=price & stock),
+        'in_stock': Count('id', filter=price & Q(stock__gt=0)),
+    }
+    for index, (low, high) in enumerate(PRICE_BUCKETS):
+        aggregates[f'bucket_{index}'] = Count('id', filter=stock & _bucket_q(low, high))
+    counts = queryset.aggregate(**aggregates)
+
+    return {
+        'total': counts['total'],
+        'in_stock': counts['in_stock'],
+        'price_buckets': [
+            {
+                'min': None if low is None else str(low),
+                'max': None if high is None else str(high),
+                'count': counts[f'bucket_{index}'],
+            }
+            for index, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+    }
@@ -0,0 +1,219 @@
+"""
+Taking stock for orders, and warehouse stock allocation.
+
+read_products() and decrement_stock() take Product.stock in one of two
+ORDER_STOCK_DECREMENT modes. 'conditional' reads without locks and takes the
+stock with a single ``UPDATE ... SET stock = stock - n WHERE stock >= n`` as the
+transaction's last write, so a row is locked only from that UPDATE to the commit.
+'lock' locks the rows with SELECT ... FOR UPDATE when they are read, before the
+rest of the order is written. The final UPDATE is the same in both modes.
+
+allocate() decides which warehouses ship an order: as few warehouses as
+possible, then the nearest to the destination. It reads every relevant stock
+level in one query, plans in memory, and takes the stock with one conditional
+UPDATE. If stock moved between the read and the write, it replans, up to
+ALLOCATION_ATTEMPTS times. Products without stock levels are not managed per
+warehouse; for them Product.stock alone is checked (services.create_order).
+"""
+from functools import reduce
+from math import asin, cos, radians, sin, sqrt
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, When
+from django.utils import timezone
+from shoply import metrics
+from . import cache
+from .models import Product, ProductChange, StockLevel
+
+ALLOCATION_ATTEMPTS = 3
+
+
+class StockConflict(Exception):
+    """Stock changed between planning and the conditional update."""
+
+
+def locks_stock():
+    mode = settings.ORDER_STOCK_DECREMENT
+    if mode not in ('lock', 'conditional'):
+        raise ImproperlyConfigured(f"ORDER_STOCK_DECREMENT must be 'lock' or 'conditional', not {mode!r}.")
+    return mode == 'lock'
+
+
+def read_products(product_ids):
+    """``{id: Product}`` with name, price and stock; row-locked in 'lock' mode. Call inside a transaction."""
+    products = Product.objects.only('name', 'price', 'stock').filter(pk__in=product_ids).order_by('pk')
+    if locks_stock():
+        products = products.select_for_update()  # in id order, so two orders cannot deadlock
+    return {product.pk: product for product in products}
+
+
+def decrement_stock(quantities):
+    """
+    Take ``{product_id: units}`` off Product.stock in one conditional UPDATE, or raise
+    ValidationError (and roll the transaction back) if any product is short.
+    Does what Product.save()'s signals would: change log and (on commit) cache invalidation.
+    """
+    condition = reduce(or_, (Q(pk=pk, stock__gte=units) for pk, units in quantities.items()))
+    taken = Product.objects.filter(condition).update(
+        stock=Case(*(When(pk=pk, then=F('stock') - units) for pk, units in quantities.items())),
+        updated_at=timezone.now(),
+    )
+    if taken != len(quantities):
+        raise ValidationError(shortage_message(quantities))
+
+    ProductChange.objects.bulk_create(ProductChange(product_id=pk, action=ProductChange.UPDATED) for pk in quantities)
+    product_ids = list(quantities)
+    transaction.on_commit(lambda: cache.invalidate(product_ids))  # not before the rest of the order is written
+    stock_outs = Product.objects.filter(pk__in=list(quantities), stock=0).count()
+    if stock_outs:
+        metrics.STOCK_OUTS.inc(amount=stock_outs)
+
+
+def shortage_message(quantities):
+    products = Product.objects.only('name', 'stock').in_bulk(list(quantities))
+    for pk, units in quantities.items():
+        product = products.get(pk)
+        if product is None:
+            return f"Product {pk} is no longer available."
+        if units > product.stock:
+            return f"Insufficient stock for {product.name}. Available: {product.stock}"
+    return "Stock changed while placing the order; please try again."
+
+
+def distance_km(a, b):
+    """Great-circle distance between two ``(latitude, longitude)`` points."""
+    lat1, lon1, lat2, lon2 = map(radians, (*a, *b))
+    h = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 12742 * asin(sqrt(h))
+
+
+def plan(demand, levels, distances):
+    """
+    Split ``demand`` (``{product_id: units}``) over warehouses.
+
+    ``levels`` is ``{warehouse_id: {product_id: units}}`` and ``distances`` is
+    ``{warehouse_id: km}``. The warehouses are picked by greedy set cover: each
+    round takes the one that completes the most lines, then covers the most units,
+    then is nearest. One warehouse that can ship everything therefore always wins.
+    Each product then ships from the nearest picked warehouse that has all of it,
+    and is only split when none has. Returns ``[(product_id, warehouse_id, units), ...]``;
+    raises ValidationError when the warehouses together are short.
+    """
+    remaining = {pk: units for pk, units in demand.items() if units > 0}
+    candidates = dict(levels)
+    picked = []
+    while remaining:
+        best, best_key = None, None
+        for warehouse_id, stock in candidates.items():
+            complete = units = 0
+            for pk, need in remaining.items():
+                available = stock.get(pk, 0)
+                complete += available >= need
+                units += min(available, need)
+            key = (complete, units, -distances[warehouse_id], -warehouse_id)
+            if units and (best_key is None or key > best_key):
+                best, best_key = warehouse_id, key
+        if best is None:
+            pk = next(iter(remaining))
+            raise ValidationError(f"Insufficient warehouse stock for product {pk}. Missing: {remaining[pk]}")
+        stock = candidates.pop(best)
+        picked.append(best)
+        for pk, need in list(remaining.items()):
+            if stock.get(pk, 0) >= need:
+                del remaining[pk]
+            else:
+                remaining[pk] = need - stock.get(pk, 0)
+
+    allocations = []
+    for pk, need in demand.items():
+        if need <= 0:
+            continue
+        # Warehouses holding all of it first, then the nearest
+        sources = sorted(picked, key=lambda w: (min(levels[w].get(pk, 0), need) < need,
+                                                distances[w], -levels[w].get(pk, 0), w))
+        for warehouse_id in sources:
+            take = min(levels[warehouse_id].get(pk, 0), need)
+            if take:
+                allocations.append((pk, warehouse_id, take))
+                need -= take
+            if not need:
+                break
+    return allocations
+
+
+def read_levels(product_ids, destination=None):
+    """
+    ``(levels, distances, managed)`` in one query: stock held by active warehouses,
+    their distance to ``destination``, and every product that has stock levels at all.
+    """
+    levels, distances, managed = {}, {}, set()
+    rows = StockLevel.objects.filter(product_id__in=product_ids).values_list(
+        'product_id', 'warehouse_id', 'quantity',
+        'warehouse__is_active', 'warehouse__latitude', 'warehouse__longitude',
+    )
+    for product_id, warehouse_id, quantity, is_active, latitude, longitude in rows:
+        managed.add(product_id)
+        if is_active and quantity:
+            levels.setdefault(warehouse_id, {})[product_id] = quantity
+            if warehouse_id not in distances:
+                distances[warehouse_id] = distance_km((latitude, longitude), destination) if destination else 0
+    return levels, distances, managed
+
+
+def take_stock(allocations):
+    """Decrement every allocated stock level in one UPDATE, only where enough is left."""
+    if not allocations:
+        return
+    updated = StockLevel.objects.filter(reduce(or_, (
+        Q(product_id=pk, warehouse_id=warehouse_id, quantity__gte=units)
+        for pk, warehouse_id, units in allocations
+    ))).update(quantity=Case(*(
+        When(product_id=pk, warehouse_id=warehouse_id, then=F('quantity') - units)
+        for pk, warehouse_id, units in allocations
+    )))
+    if updated != len(allocations):
+        raise StockConflict
+
+
+def allocate(demand, destination=None):
+    """
+    Allocate ``{product_id: units}`` to warehouses and take the stock; see plan().
+    ``destination`` is ``(latitude, longitude)``; without one, ties go to the
+    lowest warehouse id. Must run inside the order's transaction.
+    """
+    for _ in range(ALLOCATION_ATTEMPTS):
+        levels, distances, managed = read_levels(list(demand), destination)
+        allocations = plan({pk: units for pk, units in demand.items() if pk in managed}, levels, distances)
+        try:
+            with transaction.atomic():  # savepoint: a conflict undoes the partial update
+                take_stock(allocations)
+        except StockConflict:
+            continue
+        return allocations
+    raise ValidationError("Stock changed while placing the order; please try again.")
+
+
+def sync_product_stock(product_ids):
+    """Set Product.stock to the sum of its stock levels, through save() so its signals run."""
+    totals = dict(StockLevel.objects.filter(product_id__in=product_ids)
+                  .values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total'))
+    for product in Product.objects.filter(pk__in=totals):
+        if product.stock != totals[product.pk]:
+            product.stock = totals[product.pk]
+            product.save(update_fields=['stock', 'updated_at'])
+
+
+def apportion(total, weights):
+    """Split ``total`` units in proportion to ``weights`` (largest remainder); all-zero weights split evenly."""
+    if not any(weights):
+        weights = [1] * len(weights)
+    weight_sum = sum(weights)
+    shares = [total * weight / weight_sum for weight in weights]
+    counts = [int(share) for share in shares]
+    by_remainder = sorted(range(len(shares)), key=lambda i: (counts[i] - shares[i], i))
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
@@ -0,0 +1,148 @@
+"""
+Best-sellers over sliding windows without scanning OrderItem.
+
+Sales are added to per-product time buckets as orders are created (and taken
+back out when they are cancelled). refresh() sums the buckets of each window into
+LeaderboardEntry and the cache, so requests only read a precomputed list.
+Window edges are exact to LEADERBOARD_BUCKET_SECONDS for the last
+LEADERBOARD_COMPACT_AFTER seconds and to the hour before that.
+
+The refresh-leaderboards periodic task (a `run_tasks` worker) keeps the lists
+fresh off the request path. Without a worker, the first read after
+LEADERBOARD_REFRESH_SECONDS refreshes them; one request at a time does so, the
+others keep serving the previous lists.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from .models import LeaderboardEntry, Product, ProductSalesBucket
+from .serializers import PRODUCT_FIELDS
+
+WINDOWS = {
+    '1h': timedelta(hours=1),
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+}
+CACHE_KEY = 'leaderboard:{}'
+REFRESH_KEY = 'leaderboard:refreshed'  # present while the lists count as fresh
+
+
+def bucket_for(at, now=None):
+    """Start of the bucket a sale at ``at`` is counted in (hourly once compacted)."""
+    now = now or timezone.now()
+    width = settings.LEADERBOARD_BUCKET_SECONDS
+    if at < now - timedelta(seconds=settings.LEADERBOARD_COMPACT_AFTER):
+        width = 3600
+    timestamp = at.timestamp()
+    return datetime.fromtimestamp(timestamp - timestamp % width, tz=dt_timezone.utc)
+
+
+def record_sales(lines, at, sign=1):
+    """Add (or with ``sign=-1`` remove) ``[(product_id, units), ...]`` sold at ``at``."""
+    bucket_start = bucket_for(at)
+    units_by_product = {}
+    for product_id, units in lines:
+        units_by_product[product_id] = units_by_product.get(product_id, 0) + sign * units
+    with transaction.atomic():
+        # Missing rows first, then one UPDATE per product, so concurrent sales never lose units
+        ProductSalesBucket.objects.bulk_create(
+            [ProductSalesBucket(product_id=pk, bucket_start=bucket_start) for pk in units_by_product],
+            ignore_conflicts=True,
+        )
+        for product_id, units in units_by_product.items():
+            ProductSalesBucket.objects.filter(product_id=product_id, bucket_start=bucket_start)\
+                .update(units=F('units') + units)
+
+
+def compact(now=None):
+    """Merge buckets older than LEADERBOARD_COMPACT_AFTER into hourly rows; drop expired ones."""
+    now = now or timezone.now()
+    horizon = bucket_for(now - max(WINDOWS.values()) - timedelta(hours=1), now)
+    cutoff = bucket_for(now - timedelta(seconds=settings.LEADERBOARD_COMPACT_AFTER), now)
+    with transaction.atomic():
+        ProductSalesBucket.objects.filter(bucket_start__lt=horizon).delete()
+        old = ProductSalesBucket.objects.filter(bucket_start__lt=cutoff)
+        hourly = list(
+            old.annotate(hour=TruncHour('bucket_start', tzinfo=dt_timezone.utc))
+            .values('product_id', 'hour').annotate(total=Sum('units')).order_by()
+        )
+        old.delete()
+        ProductSalesBucket.objects.bulk_create(
+            ProductSalesBucket(product_id=row['product_id'], bucket_start=row['hour'], units=row['total'])
+            for row in hourly if row['total']
+        )
+
+
+def refresh(now=None):
+    """Recompute every window's top LEADERBOARD_SIZE products and publish them."""
+    now = now or timezone.now()
+    for window, span in WINDOWS.items():
+        since = bucket_for(now - span, now)
+        top = list(
+            ProductSalesBucket.objects.filter(bucket_start__gte=since)
+            .values('product_id').annotate(total=Sum('units')).filter(total__gt=0)
+            .order_by('-total', 'product_id')[:settings.LEADERBOARD_SIZE]
+        )
+        with transaction.atomic():
+            LeaderboardEntry.objects.filter(window=window).delete()
+            LeaderboardEntry.objects.bulk_create(
+                LeaderboardEntry(window=window, rank=rank, product_id=row['product_id'],
+                                 units=row['total'], refreshed_at=now)
+                for rank, row in enumerate(top, start=1)
+            )
+        cache.delete(CACHE_KEY.format(window))
+    cache.set(REFRESH_KEY, True, settings.LEADERBOARD_REFRESH_SECONDS)
+
+
+def update(now=None):
+    """Compact old buckets and republish every window (the periodic task's work)."""
+    compact(now)
+    refresh(now)
+
+
+def refresh_if_due(refreshed_at):
+    """
+    Update the lists when they are missing or older than LEADERBOARD_REFRESH_SECONDS,
+    unless another request already is (or just did). Returns whether it updated them.
+    """
+    interval = settings.LEADERBOARD_REFRESH_SECONDS
+    if refreshed_at and timezone.now() - refreshed_at < timedelta(seconds=interval):
+        return False
+    if not cache.add(REFRESH_KEY, True, interval):  # single flight
+        return False
+    try:
+        update()
+    except Exception:
+        cache.delete(REFRESH_KEY)
+        raise
+    return True
+
+
+def top_products(window):
+    """
+    ``(refreshed_at, rows)`` for a window, best first. Rows are ``values()`` dicts
+    with every PRODUCT_FIELDS column plus ``units_sold``; cached until the next refresh,
+    which this runs itself when it is due (see refresh_if_due()).
+    """
+    key = CACHE_KEY.format(window)
+    cached = cache.get(key)
+    if cached is not None and refresh_if_due(cached[0]):
+        cached = None
+    if cached is None:
+        rows = list(
+            Product.objects.filter(leaderboard_entries__window=window)
+            .order_by('leaderboard_entries__rank')
+            .values(*PRODUCT_FIELDS, units_sold=F('leaderboard_entries__units'),
+                    refreshed_at=F('leaderboard_entries__refreshed_at'))
+        )
+        refreshed_at = rows[0]['refreshed_at'] if rows else None
+        if refresh_if_due(refreshed_at):
+            return top_products(window)
+        cached = (refreshed_at, rows)
+        cache.set(key, cached, settings.LEADERBOARD_CACHE_SECONDS)
+    return cached
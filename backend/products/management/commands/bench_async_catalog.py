@@ -0,0 +1,91 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from products.models import Product
+
+
+
+class Command(BaseCommand):
+    help = ("In-process load comparison of the WSGI catalog path (DRF view, fixed thread pool) "
+            "and the async path (async view, one event loop). --client-delay models a slow "
+            "client that keeps its request slot busy after the response is produced. For "
+            "production numbers, run uvicorn/gunicorn and an external load generator.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--concurrency', type=int, default=100, help="Simultaneous clients.")
+        parser.add_argument('--workers', type=int, default=8, help="WSGI worker threads.")
+        parser.add_argument('--client-delay', type=float, default=50, help="Milliseconds per slow client.")
+        parser.add_argument('--products', type=int, default=50, help="Products seeded for the listing.")
+
+    def handle(self, *args, **options):
+        seeded = Product.objects.bulk_create(
+            Product(name=f"Async bench {i}", price=Decimal('9.99') + i, stock=i)
+            for i in range(options['products'])
+        )
+        query = {'fields': 'id,name,price,stock', 'min_price': '0'}
+        try:
+            # The in-process test clients send Host: testserver
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                self.report('WSGI (threads)', *self.run_sync(reverse('product-list'), query, options))
+                self.report('ASGI (async)',
+                            *asyncio.run(self.run_async(reverse('product-list-async'), query, options)))
+        finally:
+            Product.objects.filter(pk__in=[p.pk for p in seeded]).delete()
+
+    def run_sync(self, url, query, options):
+        delay = options['client_delay'] / 1000
+        local = threading.local()
+        peak_threads = threading.active_count()
+
+        def one_request(_):
+            nonlocal peak_threads
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            start = time.perf_counter()
+            response = local.client.get(url, query)
+            time.sleep(delay)  # the worker thread is held while the client drains
+            peak_threads = max(peak_threads, threading.active_count())
+            assert response.status_code == 200, response.status_code
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(options['workers'], options['concurrency'])) as pool:
+            latencies = list(pool.map(one_request, range(options['requests'])))
+        return time.perf_counter() - start, latencies, peak_threads
+
+    async def run_async(self, url, query, options):
+        delay = options['client_delay'] / 1000
+        client = AsyncClient()
+        slots = asyncio.Semaphore(options['concurrency'])
+        peak_threads = threading.active_count()
+
+        async def one_request():
+            nonlocal peak_threads
+            async with slots:
+                start = time.perf_counter()
+                response = await client.get(url, query)
+                await asyncio.sleep(delay)  # only a coroutine waits on the slow client
+                peak_threads = max(peak_threads, threading.active_count())
+                assert response.status_code == 200, response.status_code
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one_request() for _ in range(options['requests'])))
+        return time.perf_counter() - start, latencies, peak_threads
+
+    def report(self, label, elapsed, latencies, threads):
+        latencies = sorted(latencies)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f"{label:<15} {len(latencies) / elapsed:8.1f} req/s  "
+            f"p50 {statistics.median(latencies) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  "
+            f"threads {threads}"
+        )
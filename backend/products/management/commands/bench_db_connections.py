@@ -0,0 +1,64 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from products.models import Product
+from shoply.db import connection_stats
+
+
+class Command(BaseCommand):
+    help = ("Measure ProductDetailView latency when every request opens a new database "
+            "connection versus reusing one (persistent connection or pool).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per mode.")
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        product = Product.objects.create(name="Connection bench", price=1, stock=1)
+        url = reverse('product-detail', kwargs={'pk': product.pk})
+        client = Client(HTTP_HOST='localhost')  # must be in ALLOWED_HOSTS
+        configured_max_age = connection.settings_dict['CONN_MAX_AGE']
+        pooled = connection_stats()['pooled']
+
+        try:
+            # CONN_MAX_AGE=0 closes the connection when each request finishes.
+            # With a pool, "closing" hands the connection back instead.
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = 0
+            fresh = self._run(client, url, count)
+
+            connection.settings_dict['CONN_MAX_AGE'] = configured_max_age if pooled else 600
+            connection.close()
+            client.get(url)  # warm-up: open the connection that will be reused
+            reused = self._run(client, url, count)
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = configured_max_age
+            Product.objects.filter(pk=product.pk).delete()
+
+        first_label = "pooled checkout" if pooled else "new connection"
+        second_label = "pooled checkout" if pooled else "persistent"
+        self._report(first_label, fresh)
+        self._report(second_label, reused)
+        saving = statistics.mean(fresh) - statistics.mean(reused)
+        self.stdout.write(self.style.SUCCESS(f"Saving per request: {saving:.3f} ms"))
+        if pooled:
+            self.stdout.write(f"Pool stats: {connection_stats()}")
+
+    @staticmethod
+    def _run(client, url, count):
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.status_code
+        return timings
+
+    def _report(self, label, timings):
+        timings = sorted(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(f"{label:<16} mean {statistics.mean(timings):7.3f} ms  "
+                          f"p50 {statistics.median(timings):7.3f} ms  p95 {p95:7.3f} ms")
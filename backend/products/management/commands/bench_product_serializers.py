@@ -0,0 +1,49 @@
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products.models import Product
+from products.serializers import PRODUCT_FIELDS, ProductSerializer, serialize_product_rows
+
+
+class Command(BaseCommand):
+    help = "Compare ProductSerializer against the values() fast path on a product listing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help="Products to serialize per run.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per serializer; the best is reported.")
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+
+        # Seed inside a transaction that is rolled back, so the database is left untouched
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                Product(name=f"Bench product {i}", description="Benchmark row",
+                        price=Decimal('19.99') + i, stock=i % 50)
+                for i in range(rows)
+            )
+            queryset = Product.objects.order_by('-id')[:rows]
+
+            def model_serializer():
+                return ProductSerializer(queryset, many=True).data
+
+            def fast_path():
+                return serialize_product_rows(queryset.values(*PRODUCT_FIELDS))
+
+            results = {}
+            for label, func in (('ProductSerializer', model_serializer), ('values() fast path', fast_path)):
+                best = min(self._time(func) for _ in range(repeat))
+                results[label] = best
+                self.stdout.write(f"{label:<20} {best * 1000:9.1f} ms  {rows / best:12,.0f} rows/s")
+
+            transaction.set_rollback(True)
+
+        speedup = results['ProductSerializer'] / results['values() fast path']
+        self.stdout.write(self.style.SUCCESS(f"Fast path speedup: {speedup:.1f}x over {rows} rows"))
+
+    @staticmethod
+    def _time(func):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
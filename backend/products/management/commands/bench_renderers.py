@@ -0,0 +1,62 @@
+import gzip
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from products.models import Product
+from products.views import ProductListView
+from shoply.middleware import brotli
+from shoply.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = "Compare JSONRenderer and FastJSONRenderer (plus gzip/brotli) on ProductListView output."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help="Products in the listing.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per renderer; the best is reported.")
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed: FastJSONRenderer falls back to json."))
+
+        # Seed inside a transaction that is rolled back, so the database is left untouched
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                Product(name=f"Bench product {i}", description="Benchmark row " * 8,
+                        price=Decimal('19.99') + i, stock=i % 50)
+                for i in range(rows)
+            )
+            request = APIRequestFactory().get('/api/products/')
+            data = ProductListView.as_view()(request).data
+            transaction.set_rollback(True)
+
+        timings = {}
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            label = type(renderer).__name__
+            best = min(self._time(renderer.render, data) for _ in range(repeat))
+            timings[label] = best
+            self.stdout.write(f"{label:<18} {best * 1000:9.2f} ms")
+
+        speedup = timings['JSONRenderer'] / timings['FastJSONRenderer']
+        self.stdout.write(self.style.SUCCESS(f"FastJSONRenderer speedup: {speedup:.1f}x over {len(data)} products"))
+
+        body = FastJSONRenderer().render(data)
+        self.stdout.write(f"Body: {len(body):,} bytes")
+        codecs = [('gzip', lambda b: gzip.compress(b, compresslevel=6))]
+        if brotli is not None:
+            codecs.append(('br q4', lambda b: brotli.compress(b, quality=4)))
+        for label, compress in codecs:
+            start = time.perf_counter()
+            size = len(compress(body))
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{label:<18} {elapsed * 1000:9.2f} ms  {size:,} bytes ({size / len(body):.0%})")
+
+    @staticmethod
+    def _time(func, *args):
+        start = time.perf_counter()
+        func(*args)
+        return time.perf_counter() - start
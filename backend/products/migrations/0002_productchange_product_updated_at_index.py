@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:16
+
+from django.db import migrations, models
+
+
+def seed_change_log(apps, schema_editor):
+    # Existing products become 'created' entries so a sync from 0 is complete
+    Product = apps.get_model('products', 'Product')
+    ProductChange = apps.get_model('products', 'ProductChange')
+    batch = []
+    for product_id in Product.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=2000):
+        batch.append(ProductChange(product_id=product_id, action='created'))
+        if len(batch) >= 2000:
+            ProductChange.objects.bulk_create(batch)
+            batch = []
+    ProductChange.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField(db_index=True)),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
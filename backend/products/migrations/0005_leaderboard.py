@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(max_length=8)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('units', models.IntegerField()),
+                ('refreshed_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='products.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('window', 'rank'), name='leaderboard_window_rank_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSalesBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('units', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_start'], name='product_sales_bucket_start_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'bucket_start'), name='product_sales_bucket_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_warehouses'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productchange',
+            name='changed_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
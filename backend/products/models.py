@@ -1,16 +1,142 @@
-from django.db import models
-
-class Product(models.Model):
-    name = models.CharField(max_length=100)
-    description = models.TextField(blank=True)
-    price = models.DecimalField(max_digits=10, decimal_places=2)
-    stock = models.PositiveIntegerField(default=0)
-    image = models.ImageField(upload_to='product_images/', blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-    
-    class Meta:
-        app_label = 'products'  # ✅ Explicitly set the app label if needed
-
-    def __str__(self):
-        return self.name
+from django.db import models
+
+class Product(models.Model):
+    name = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    stock = models.PositiveIntegerField(default=0)
+    image = models.ImageField(upload_to='product_images/', blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    class Meta:
+        app_label = 'products'  # ✅ Explicitly set the app label if needed
+        indexes = [
+            # ✅ Back the listing filters and orderings in products/filters.py
+            models.Index(fields=['price'], name='product_price_idx'),
+            models.Index(fields=['-created_at'], name='product_newest_idx'),
+            models.Index(fields=['price'], name='product_in_stock_price_idx', condition=models.Q(stock__gt=0)),
+            models.Index(fields=['-created_at'], name='product_in_stock_newest_idx', condition=models.Q(stock__gt=0)),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class ProductChange(models.Model):
+    """
+    Append-only change log for products. The auto-incrementing id is the sync
+    watermark (read it through products/changes.py, which holds back ids that may
+    still commit out of order); rows for deletes act as tombstones.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTION_CHOICES = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (DELETED, 'Deleted'),
+    ]
+
+    # Plain id rather than a ForeignKey so tombstones outlive the product
+    product_id = models.BigIntegerField(db_index=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        app_label = 'products'
+
+    def __str__(self):
+        return f"#{self.id} {self.action} product {self.product_id}"
+
+class ProductCoPurchase(models.Model):
+    """
+    Sparse co-occurrence matrix: how many paid orders contained both products.
+    Each pair is stored in both directions so a product's neighbours are one
+    index range. Maintained by products/recommendations.py.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        app_label = 'products'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'other'], name='product_copurchase_pair_uniq'),
+        ]
+
+class RelatedProduct(models.Model):
+    """Precomputed top-K "frequently bought together" neighbours of a product."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_to')
+    rank = models.PositiveSmallIntegerField()
+    orders = models.PositiveIntegerField()  # paid orders containing both products
+
+    class Meta:
+        app_label = 'products'
+        constraints = [
+            # ✅ Also the index the related endpoint reads
+            models.UniqueConstraint(fields=['product', 'rank'], name='related_product_rank_uniq'),
+        ]
+
+class ProductSalesBucket(models.Model):
+    """
+    Units sold per product per time bucket (LEADERBOARD_BUCKET_SECONDS wide,
+    merged into hourly rows once older than LEADERBOARD_COMPACT_AFTER). Cancelled
+    orders subtract from the bucket they were counted in. See products/leaderboard.py.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    bucket_start = models.DateTimeField()
+    units = models.IntegerField(default=0)
+
+    class Meta:
+        app_label = 'products'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'bucket_start'], name='product_sales_bucket_uniq'),
+        ]
+        indexes = [models.Index(fields=['bucket_start'], name='product_sales_bucket_start_idx')]
+
+class LeaderboardEntry(models.Model):
+    """Precomputed best-sellers per window ('1h', '24h', '7d'), rebuilt periodically."""
+    window = models.CharField(max_length=8)
+    rank = models.PositiveSmallIntegerField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    units = models.IntegerField()
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        app_label = 'products'
+        constraints = [
+            models.UniqueConstraint(fields=['window', 'rank'], name='leaderboard_window_rank_uniq'),
+        ]
+
+class Warehouse(models.Model):
+    code = models.CharField(max_length=20, unique=True)
+    name = models.CharField(max_length=100)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        app_label = 'products'
+
+    def __str__(self):
+        return f"{self.code} ({self.name})"
+
+class StockLevel(models.Model):
+    """
+    Units of a product held at one warehouse. For products with stock levels,
+    Product.stock is their total: signals resync it after edits, and the
+    allocation engine (products/inventory.py) moves both together.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_levels')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='stock_levels')
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        app_label = 'products'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'warehouse'], name='stock_level_product_warehouse_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x product {self.product_id} at warehouse {self.warehouse_id}"
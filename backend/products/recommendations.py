@@ -0,0 +1,116 @@
+"""
+"Frequently bought together" recommendations.
+
+ProductCoPurchase is a sparse product x product matrix of paid-order
+co-occurrences; RelatedProduct keeps each product's top RECOMMENDATIONS_TOP_K
+neighbours so the product page reads them with one indexed lookup. Paid orders
+are folded in one at a time by record_basket() (see orders/tasks.py); the
+build_recommendations command rebuilds everything from order history, live and
+archived.
+"""
+from itertools import permutations
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from .models import ProductCoPurchase, RelatedProduct
+
+# Advisory lock keys are bigints shared by the whole database; top-K locks use product id + this
+TOP_K_LOCK_BASE = 0x746F706B << 32
+
+
+def record_basket(product_ids):
+    """Count one more order containing all of ``product_ids`` and refresh their neighbours."""
+    product_ids = sorted(set(product_ids))
+    if len(product_ids) < 2:
+        return
+    with transaction.atomic():
+        lock_top_k(product_ids)
+        # Create missing pairs first, then increment in a single UPDATE, so concurrent
+        # baskets touching the same pair never lose a count
+        ProductCoPurchase.objects.bulk_create(
+            [ProductCoPurchase(product_id=a, other_id=b) for a, b in permutations(product_ids, 2)],
+            ignore_conflicts=True,
+        )
+        ProductCoPurchase.objects.filter(product_id__in=product_ids, other_id__in=product_ids)\
+            .exclude(product_id=F('other_id'))\
+            .update(orders=F('orders') + 1)
+        for product_id in product_ids:
+            refresh_related(product_id)
+
+
+def lock_top_k(product_ids):
+    """
+    Make baskets sharing a product take turns, so two never replace the same top-K
+    list at once and collide on its ranks. On PostgreSQL this takes transaction-level
+    advisory locks, in id order so baskets cannot deadlock; checkout locks the
+    product rows themselves and is never blocked. Other databases lock whole tables
+    on write anyway.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for product_id in sorted(product_ids):
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [TOP_K_LOCK_BASE + product_id])
+
+
+def refresh_related(product_id, top_k=None):
+    """
+    Recompute one product's top-K list from its row range of the matrix. Callers
+    hold the product's lock_top_k() lock, as record_basket() does.
+    """
+    top_k = top_k or settings.RECOMMENDATIONS_TOP_K
+    neighbours = ProductCoPurchase.objects.filter(product_id=product_id)\
+        .order_by('-orders', 'other_id').values_list('other_id', 'orders')[:top_k]
+    RelatedProduct.objects.filter(product_id=product_id).delete()
+    RelatedProduct.objects.bulk_create(
+        RelatedProduct(product_id=product_id, related_id=other_id, rank=rank, orders=orders)
+        for rank, (other_id, orders) in enumerate(neighbours, start=1)
+    )
+
+
+def rebuild(sources, chunk_size=100_000, top_k=None):
+    """
+    Recompute the whole matrix from paid orders with set-based SQL, then rank the
+    top-K lists. ``sources`` are ``(order_item_table, order_table)`` pairs, e.g. the
+    live and the archived orders; each is read one order-id range at a time so every
+    self-join stays small, and their counts add up. Runs in one transaction: readers
+    keep the old lists until it commits.
+    """
+    top_k = top_k or settings.RECOMMENDATIONS_TOP_K
+    quote = connection.ops.quote_name
+    copurchase = quote(ProductCoPurchase._meta.db_table)
+    related = quote(RelatedProduct._meta.db_table)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {related}")
+        cursor.execute(f"DELETE FROM {copurchase}")
+        for order_item_table, order_table in sources:
+            items, orders = quote(order_item_table), quote(order_table)
+            cursor.execute(f"SELECT MIN(id), MAX(id) FROM {orders} WHERE is_paid")
+            low, high = cursor.fetchone()
+            if low is None:
+                continue
+            for start in range(low, high + 1, chunk_size):
+                # Items of since-deleted products (NULL in the archive) never join
+                cursor.execute(f"""
+                    INSERT INTO {copurchase} (product_id, other_id, orders)
+                    SELECT a.product_id, b.product_id, COUNT(DISTINCT a.order_id)
+                    FROM {items} a
+                    JOIN {items} b ON b.order_id = a.order_id AND b.product_id <> a.product_id
+                    JOIN {orders} o ON o.id = a.order_id
+                    WHERE o.is_paid AND a.order_id >= %s AND a.order_id < %s
+                    GROUP BY a.product_id, b.product_id
+                    ON CONFLICT (product_id, other_id) DO UPDATE SET orders = {copurchase}.orders + excluded.orders
+                """, [start, start + chunk_size])
+        cursor.execute(f"""
+            INSERT INTO {related} (product_id, related_id, rank, orders)
+            SELECT product_id, other_id, position, orders FROM (
+                SELECT product_id, other_id, orders,
+                       ROW_NUMBER() OVER (PARTITION BY product_id ORDER BY orders DESC, other_id) AS position
+                FROM {copurchase}
+            ) ranked
+            WHERE position <= %s
+        """, [top_k])
+        cursor.execute(f"SELECT COUNT(*) FROM {copurchase}")
+        return cursor.fetchone()[0]
@@ -1,7 +1,55 @@
-from rest_framework import serializers
-from .models import Product
-
-class ProductSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Product
-        fields = ['id', 'name', 'description', 'price', 'stock', 'image', 'created_at', 'updated_at']
+from decimal import Decimal
+from django.utils import timezone
+from rest_framework import serializers
+from .models import Product
+
+class ProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'description', 'price', 'stock', 'image', 'created_at', 'updated_at']
+
+    def __init__(self, *args, **kwargs):
+        # ✅ Optional sparse fieldset: ProductSerializer(..., fields=['id', 'name'])
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+PRODUCT_FIELDS = ProductSerializer.Meta.fields
+PRICE_QUANTUM = Decimal('0.01')
+
+def _row_converters(fields, request):
+    """Per-field converters mirroring what ProductSerializer emits for each column."""
+    tz = timezone.get_current_timezone()
+    storage = Product._meta.get_field('image').storage
+
+    def price(value):
+        return None if value is None else '{:f}'.format(value.quantize(PRICE_QUANTUM))
+
+    def moment(value):
+        if value is None:
+            return None
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    def image(value):
+        if not value:
+            return None
+        url = storage.url(value)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    converters = {'price': price, 'created_at': moment, 'updated_at': moment, 'image': image}
+    return [(name, converters.get(name)) for name in fields]
+
+def serialize_product_rows(rows, fields=PRODUCT_FIELDS, request=None):
+    """
+    Read-only fast path for list views: turn ``Product.objects.values(*fields)``
+    rows straight into output dicts, identical to ProductSerializer's, without
+    building model instances or bound serializer fields per row.
+    """
+    converters = _row_converters(fields, request)
+    return [
+        {name: convert(row[name]) if convert else row[name] for name, convert in converters}
+        for row in rows
+    ]
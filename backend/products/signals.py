@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from . import autocomplete, cache, inventory
+from .models import Product, ProductChange, StockLevel
+
+@receiver(post_save, sender=Product)
+def record_product_save(sender, instance, created, **kwargs):
+    """Append to the change log so delta sync clients pick up the new state."""
+    action = ProductChange.CREATED if created else ProductChange.UPDATED
+    ProductChange.objects.create(product_id=instance.pk, action=action)
+    transaction.on_commit(lambda: cache.invalidate([instance.pk]))  # a reader could re-cache the old row before
+    autocomplete.product_saved(instance.pk, instance.name)
+
+@receiver(post_delete, sender=Product)
+def record_product_delete(sender, instance, **kwargs):
+    """Leave a tombstone so delta sync clients can drop the product."""
+    ProductChange.objects.create(product_id=instance.pk, action=ProductChange.DELETED)
+    transaction.on_commit(lambda: cache.invalidate([instance.pk]))  # a reader could re-cache the old row before
+    autocomplete.product_deleted(instance.pk)
+
+@receiver(post_save, sender=StockLevel)
+@receiver(post_delete, sender=StockLevel)
+def sync_stock_total(sender, instance, origin=None, **kwargs):
+    """Keep Product.stock equal to the warehouse total after edits (not after allocation)."""
+    if not isinstance(origin, Product):
+        inventory.sync_product_stock([instance.product_id])
@@ -0,0 +1,7 @@
+from tasks.queue import task
+from . import leaderboard
+
+@task
+def refresh_leaderboards():
+    """Compact old sales buckets and republish the best-seller lists (TASKS_PERIODIC)."""
+    leaderboard.update()
@@ -1,50 +1,468 @@
-from django.test import TestCase
-from .models import Product
-
-class ProductModelTest(TestCase):
-
-    # ✅ Setup method to create sample products before each test
-    def setUp(self):
-        self.product = Product.objects.create(
-            name="Gaming Laptop",
-            description="A high-end gaming laptop",
-            price=1500.99,
-            stock=10
-        )
-
-    # ✅ Test string representation
-    def test_product_str(self):
-        self.assertEqual(str(self.product), "Gaming Laptop")
-
-    # ✅ Test product creation
-    def test_create_product(self):
-        product_count = Product.objects.count()
-        self.assertEqual(product_count, 1)
-        self.assertEqual(self.product.name, "Gaming Laptop")
-        self.assertEqual(float(self.product.price), 1500.99)
-        self.assertEqual(self.product.stock, 10)
-
-    # ✅ Test updating a product
-    def test_update_product(self):
-        self.product.name = "Gaming Laptop Pro"
-        self.product.price = 1700.99
-        self.product.save()
-
-        updated_product = Product.objects.get(id=self.product.id)
-        self.assertEqual(updated_product.name, "Gaming Laptop Pro")
-        self.assertEqual(float(updated_product.price), 1700.99)
-
-    # ✅ Test deleting a product
-    def test_delete_product(self):
-        self.product.delete()
-        product_count = Product.objects.count()
-        self.assertEqual(product_count, 0)
-
-    # ✅ Test default stock value
-    def test_default_stock(self):
-        product = Product.objects.create(
-            name="Wireless Mouse",
-            description="A reliable wireless mouse",
-            price=29.99
-        )
-        self.assertEqual(product.stock, 0)
+import csv
+import io
+import json
+import time
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from tasks import retention
+from . import autocomplete, leaderboard
+from .cache import CACHE_KEY
+from .checks import check_shared_cache
+from .models import Product, ProductChange
+from .serializers import PRODUCT_FIELDS, ProductSerializer, serialize_product_rows
+
+User = get_user_model()
+
+class ProductModelTest(TestCase):
+
+    # ✅ Setup method to create sample products before each test
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Gaming Laptop",
+            description="A high-end gaming laptop",
+            price=1500.99,
+            stock=10
+        )
+
+    # ✅ Test string representation
+    def test_product_str(self):
+        self.assertEqual(str(self.product), "Gaming Laptop")
+
+    # ✅ Test product creation
+    def test_create_product(self):
+        product_count = Product.objects.count()
+        self.assertEqual(product_count, 1)
+        self.assertEqual(self.product.name, "Gaming Laptop")
+        self.assertEqual(float(self.product.price), 1500.99)
+        self.assertEqual(self.product.stock, 10)
+
+    # ✅ Test updating a product
+    def test_update_product(self):
+        self.product.name = "Gaming Laptop Pro"
+        self.product.price = 1700.99
+        self.product.save()
+
+        updated_product = Product.objects.get(id=self.product.id)
+        self.assertEqual(updated_product.name, "Gaming Laptop Pro")
+        self.assertEqual(float(updated_product.price), 1700.99)
+
+    # ✅ Test deleting a product
+    def test_delete_product(self):
+        self.product.delete()
+        product_count = Product.objects.count()
+        self.assertEqual(product_count, 0)
+
+    # ✅ Test default stock value
+    def test_default_stock(self):
+        product = Product.objects.create(
+            name="Wireless Mouse",
+            description="A reliable wireless mouse",
+            price=29.99
+        )
+        self.assertEqual(product.stock, 0)
+
+class ProductExportTests(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='adminpass', is_staff=True
+        )
+        self.client.force_authenticate(user=self.admin)
+        Product.objects.create(name="Laptop", price=1500.99, stock=10)
+        Product.objects.create(name="Mouse", price=29.99, stock=0)
+        self.url = reverse('product-export')
+
+    # ✅ NDJSON export streams one product per line
+    def test_export_ndjson(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([r['name'] for r in records], ["Laptop", "Mouse"])
+        self.assertEqual(records[0]['price'], "1500.99")
+
+    # ✅ CSV export has a header row followed by one row per product
+    def test_export_csv(self):
+        response = self.client.get(self.url, {'fmt': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:2], ['id', 'name'])
+        self.assertEqual(len(rows), 3)
+
+    # ✅ Unknown formats are rejected and non-admins are denied
+    def test_export_rejects_bad_format_and_non_admin(self):
+        response = self.client.get(self.url, {'fmt': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        user = User.objects.create_user(username='shopper', email='s@example.com', password='pass')
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+@override_settings(PRODUCT_CHANGES_SETTLE_SECONDS=0)
+class ProductChangesTests(APITestCase):
+
+    def setUp(self):
+        self.url = reverse('product-changes')
+        self.laptop = Product.objects.create(name="Laptop", price=1500.99, stock=10)
+        self.mouse = Product.objects.create(name="Mouse", price=29.99, stock=5)
+
+    # ✅ A sync from zero returns the whole catalog and a watermark
+    def test_initial_sync(self):
+        response = self.client.get(self.url, {'since': 0})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['name'] for p in response.data['changed']], ["Laptop", "Mouse"])
+        self.assertEqual(response.data['deleted'], [])
+        self.assertEqual(response.data['next_since'], ProductChange.objects.latest('id').id)
+
+    # ✅ Later syncs only return what changed, with tombstones for deletes
+    def test_incremental_sync_with_tombstones(self):
+        watermark = self.client.get(self.url).data['next_since']
+        self.laptop.stock = 9
+        self.laptop.save()
+        mouse_id = self.mouse.id
+        self.mouse.delete()
+
+        response = self.client.get(self.url, {'since': watermark})
+        self.assertEqual([p['id'] for p in response.data['changed']], [self.laptop.id])
+        self.assertEqual(response.data['changed'][0]['stock'], 9)
+        self.assertEqual(response.data['deleted'], [mouse_id])
+
+        response = self.client.get(self.url, {'since': response.data['next_since']})
+        self.assertEqual(response.data['changed'], [])
+        self.assertEqual(response.data['deleted'], [])
+
+    # ✅ Results are paged by the limit parameter
+    def test_limit_pages_through_changes(self):
+        response = self.client.get(self.url, {'since': 0, 'limit': 1})
+        self.assertTrue(response.data['has_more'])
+        self.assertEqual(len(response.data['changed']), 1)
+        response = self.client.get(self.url, {'since': response.data['next_since'], 'limit': 1})
+        self.assertFalse(response.data['has_more'])
+
+    # ✅ Recent changes, and any after them, wait until they cannot commit out of order
+    @override_settings(PRODUCT_CHANGES_SETTLE_SECONDS=60)
+    def test_recent_changes_are_held_back(self):
+        ProductChange.objects.update(changed_at=timezone.now() - timedelta(minutes=5))
+        settled = ProductChange.objects.latest('id').id
+        self.laptop.save()
+        later = ProductChange.objects.create(product_id=self.mouse.id, action=ProductChange.UPDATED)
+        ProductChange.objects.filter(pk=later.pk).update(changed_at=timezone.now() - timedelta(minutes=5))
+
+        response = self.client.get(self.url, {'since': 0})
+        self.assertEqual(response.data['next_since'], settled)
+        response = self.client.get(self.url, {'since': settled})
+        self.assertEqual((response.data['changed'], response.data['next_since']), ([], settled))
+
+    # ✅ A write transaction that is still open holds back everything written since it began
+    @override_settings(PRODUCT_CHANGES_SETTLE_SECONDS=60)
+    def test_open_transactions_hold_back_changes(self):
+        ProductChange.objects.update(changed_at=timezone.now() - timedelta(minutes=5))
+        first = ProductChange.objects.earliest('id').id
+        began = timezone.now() - timedelta(minutes=10)
+        with mock.patch('products.changes.oldest_write_transaction', return_value=began):
+            response = self.client.get(self.url, {'since': 0})
+        self.assertEqual((response.data['changed'], response.data['next_since']), ([], first - 1))
+
+    # ✅ Cursors older than the change log kept get 410 and a watermark to resync from
+    @override_settings(RETENTION_PRODUCT_CHANGE_DAYS=30)
+    def test_expired_cursor_is_gone(self):
+        kept = ProductChange.objects.get(product_id=self.mouse.id)
+        ProductChange.objects.filter(product_id=self.laptop.id).update(changed_at=timezone.now() - timedelta(days=40))
+        retention.apply('product-changes', sleep=0)
+        self.assertEqual(list(ProductChange.objects.all()), [kept])
+
+        response = self.client.get(self.url, {'since': 0})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        self.assertEqual(response.data['resync_from'], kept.id)
+        response = self.client.get(self.url, {'since': kept.id - 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['name'] for p in response.data['changed']], ["Mouse"])
+
+    def test_invalid_since(self):
+        response = self.client.get(self.url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ProductConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Laptop", price=1500.99, stock=10)
+        self.detail_url = reverse('product-detail', kwargs={'pk': self.product.id})
+        self.list_url = reverse('product-list')
+
+    # ✅ A matching ETag returns 304 without serializing the product
+    def test_detail_etag_not_modified(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        self.assertIn('Last-Modified', response)
+
+        with mock.patch.object(ProductSerializer, 'to_representation') as to_representation:
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        to_representation.assert_not_called()
+
+    # ✅ Updating the product invalidates its ETag
+    def test_detail_etag_changes_on_update(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.product.stock = 3
+        self.product.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    # ✅ The list ETag changes when a product is deleted
+    def test_list_etag_changes_on_delete(self):
+        etag = self.client.get(self.list_url)['ETag']
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.product.delete()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_missing_product_is_404(self):
+        response = self.client.get(reverse('product-detail', kwargs={'pk': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class ProductSparseFieldsTests(APITestCase):
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Laptop", description="Gaming", price=1500.9, stock=10, image='product_images/laptop.png'
+        )
+        Product.objects.create(name="Mouse", price=29.99, stock=0)
+        self.list_url = reverse('product-list')
+
+    # ✅ The fast path emits exactly what ProductSerializer would
+    def test_fast_path_matches_product_serializer(self):
+        request = RequestFactory().get('/api/products/')
+        queryset = Product.objects.order_by('id')
+        expected = ProductSerializer(queryset, many=True, context={'request': request}).data
+        actual = serialize_product_rows(queryset.values(*PRODUCT_FIELDS), request=request)
+        self.assertEqual(actual, [dict(row) for row in expected])
+        self.assertEqual(actual[0]['price'], "1500.90")
+        self.assertTrue(actual[0]['image'].startswith('http://testserver/'))
+
+    # ✅ ?fields= narrows both the payload and the SELECT list
+    def test_list_fields_selection(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.list_url, {'fields': 'name,id'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0], {'id': self.product.id, 'name': "Laptop"})
+        product_query = [q['sql'] for q in queries if 'products_product' in q['sql']][-1]
+        self.assertNotIn('description', product_query)
+
+    def test_detail_fields_selection(self):
+        url = reverse('product-detail', kwargs={'pk': self.product.id})
+        response = self.client.get(url, {'fields': 'price'})
+        self.assertEqual(response.data, {'price': "1500.90"})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(self.list_url, {'fields': 'name,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ProductFilteringTests(APITestCase):
+
+    def setUp(self):
+        self.cheap = Product.objects.create(name="Cable", price=9.99, stock=0)
+        self.mid = Product.objects.create(name="Mouse", price=39.99, stock=5)
+        self.pricey = Product.objects.create(name="Laptop", price=1500.00, stock=2)
+        self.list_url = reverse('product-list')
+        self.facets_url = reverse('product-facets')
+
+    # ✅ Price range and in-stock filters are applied server-side
+    def test_filter_price_range_and_stock(self):
+        response = self.client.get(self.list_url, {'min_price': '10', 'max_price': '2000', 'in_stock': 'true'})
+        self.assertEqual({p['name'] for p in response.data}, {"Mouse", "Laptop"})
+
+        response = self.client.get(self.list_url, {'max_price': '50'})
+        self.assertEqual({p['name'] for p in response.data}, {"Cable", "Mouse"})
+
+    # ✅ Sorting by price and newest
+    def test_ordering(self):
+        response = self.client.get(self.list_url, {'ordering': '-price'})
+        self.assertEqual([p['name'] for p in response.data], ["Laptop", "Mouse", "Cable"])
+        response = self.client.get(self.list_url, {'ordering': 'newest'})
+        self.assertEqual([p['name'] for p in response.data], ["Laptop", "Mouse", "Cable"])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.list_url, {'min_price': 'cheap'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.list_url, {'ordering': 'random'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    # ✅ Facets come from one query and ignore their own filter
+    def test_facets_in_one_query(self):
+        with self.assertNumQueries(2):  # freshness lookup + the aggregate
+            response = self.client.get(self.facets_url, {'in_stock': 'true', 'max_price': '100'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 1)
+        # in-stock count keeps the price filter, buckets keep the stock filter
+        self.assertEqual(response.data['in_stock'], 1)
+        buckets = {(b['min'], b['max']): b['count'] for b in response.data['price_buckets']}
+        self.assertEqual(buckets[(None, '25')], 0)
+        self.assertEqual(buckets[('25', '50')], 1)
+        self.assertEqual(buckets[('500', None)], 1)
+
+class AsyncProductViewsTests(TestCase):
+
+    def setUp(self):
+        self.laptop = Product.objects.create(name="Laptop", price=1500.00, stock=2)
+        Product.objects.create(name="Cable", price=9.99, stock=0)
+
+    # ✅ Same body as the synchronous DRF list view
+    async def test_async_list_matches_sync_list(self):
+        sync_response = await self.async_client.get(reverse('product-list'), {'ordering': 'price'})
+        async_response = await self.async_client.get(reverse('product-list-async'), {'ordering': 'price'})
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.json(), sync_response.json())
+
+    async def test_async_list_filters_and_fields(self):
+        response = await self.async_client.get(
+            reverse('product-list-async'), {'in_stock': 'true', 'fields': 'id,name'}
+        )
+        self.assertEqual(response.json(), [{'id': self.laptop.id, 'name': "Laptop"}])
+
+    async def test_async_detail(self):
+        response = await self.async_client.get(reverse('product-detail-async', kwargs={'pk': self.laptop.id}))
+        self.assertEqual(response.json()['price'], "1500.00")
+        response = await self.async_client.get(reverse('product-detail-async', kwargs={'pk': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_rejects_bad_parameters(self):
+        response = await self.async_client.get(reverse('product-list-async'), {'ordering': 'random'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+@override_settings(PRODUCT_CHANGES_SETTLE_SECONDS=0)
+class AutocompleteTests(APITestCase):
+
+    def setUp(self):
+        autocomplete.index.reset()
+        self.laptop = Product.objects.create(name="Gaming Laptop", price=1500, stock=5)
+        self.lamp = Product.objects.create(name="Desk Lamp", price=30, stock=5)
+        self.cafe = Product.objects.create(name="Café Latte Mug", price=8, stock=5)
+        autocomplete.index.build()
+
+    def tearDown(self):
+        autocomplete.index.reset()
+
+    def names(self, query, **params):
+        response = self.client.get(reverse('product-autocomplete'), {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['name'] for row in response.data['results']]
+
+    # ✅ Any word of the name matches, ignoring case and accents
+    def test_word_prefixes(self):
+        self.assertEqual(self.names('LAP'), ["Gaming Laptop"])
+        self.assertEqual(self.names('gaming l'), ["Gaming Laptop"])
+        self.assertEqual(self.names('cafe'), ["Café Latte Mug"])
+        self.assertEqual(self.names('x'), [])
+        self.assertEqual(self.names(''), [])
+
+    def test_ranked_by_popularity(self):
+        self.assertEqual(self.names('la'), ["Gaming Laptop", "Desk Lamp", "Café Latte Mug"])
+        leaderboard.record_sales([(self.cafe.pk, 3), (self.lamp.pk, 1)], timezone.now())
+        autocomplete.index.refresh_popularity()
+        self.assertEqual(self.names('la'), ["Café Latte Mug", "Desk Lamp", "Gaming Laptop"])
+        self.assertEqual(self.names('la', limit=1), ["Café Latte Mug"])
+
+    # ✅ Saves and deletes in this process update the index once committed
+    def test_signals_update_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lamp.name = "Floor Lamp"
+            self.lamp.save()
+            Product.objects.create(name="Lapel Pin", price=3, stock=1)
+            self.laptop.delete()
+        self.assertEqual(self.names('lap'), ["Lapel Pin"])
+        self.assertEqual(self.names('floor'), ["Floor Lamp"])
+        self.assertEqual(self.names('desk'), [])
+
+    # ✅ Other processes' changes arrive through the ProductChange log
+    def test_sync_from_change_log(self):
+        Product.objects.filter(pk=self.lamp.pk).update(name="Reading Lamp")
+        ProductChange.objects.create(product_id=self.lamp.pk, action=ProductChange.UPDATED)
+        self.assertEqual(self.names('desk'), ["Desk Lamp"])  # not due yet
+        autocomplete.index.sync(force=True)
+        self.assertEqual(self.names('desk'), [])
+        self.assertEqual(self.names('read'), ["Reading Lamp"])
+
+    def test_lookups_skip_the_database(self):
+        autocomplete.index.synced_at = autocomplete.index.popularity_at = time.monotonic()
+        with self.assertNumQueries(0):
+            self.assertEqual(autocomplete.suggest('gam'), [(self.laptop.pk, "Gaming Laptop")])
+
+    def test_stats(self):
+        admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='pass')
+        self.client.force_authenticate(admin)
+        response = self.client.get(reverse('product-autocomplete-stats'))
+        self.assertEqual((response.data['products'], response.data['entries']), (3, 7))
+        self.assertGreater(response.data['memory_bytes']['total'], 0)
+
+class ProductBatchTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.products = [Product.objects.create(name=f"Product {n}", price=n + 1, stock=n) for n in range(5)]
+        self.url = reverse('product-batch')
+
+    # ✅ Requested order kept, duplicates dropped, missing ids reported
+    def test_get_preserves_order(self):
+        a, b, c = self.products[3].pk, self.products[0].pk, self.products[2].pk
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'ids': f"{a},{b},999,{c},{a}", 'fields': 'id,name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data['results']], [a, b, c])
+        self.assertEqual(response.data['results'][0], {'id': a, 'name': "Product 3"})
+        self.assertEqual(response.data['missing'], [999])
+
+    def test_post_uses_cache(self):
+        ids = [product.pk for product in reversed(self.products)]
+        self.client.post(self.url, {'ids': ids}, format='json')
+        with self.assertNumQueries(0):
+            response = self.client.post(self.url, {'ids': ids}, format='json')
+        self.assertEqual(response.data['results'],
+                         ProductSerializer(reversed(self.products), many=True).data)
+
+    def test_cache_follows_updates(self):
+        product = self.products[0]
+        self.client.get(self.url, {'ids': product.pk})
+        product.name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            product.save()
+            self.assertTrue(cache.get(CACHE_KEY.format(product.pk)))  # dropped only once committed
+        self.assertTrue(callbacks)
+        response = self.client.get(self.url, {'ids': product.pk, 'fields': 'name'})
+        self.assertEqual(response.data['results'], [{'name': "Renamed"}])
+
+    # ✅ A long-lived per-process cache is flagged by the deploy checks
+    def test_per_process_cache_check(self):
+        with self.settings(PRODUCT_CACHE_SECONDS=300):
+            self.assertEqual([w.id for w in check_shared_cache(None)], ['products.W001'])
+        with self.settings(PRODUCT_CACHE_SECONDS=5):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_post_body_must_be_an_object(self):
+        for body in ([self.products[0].pk], 7, "ids"):
+            response = self.client.post(self.url, body, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('ids', response.data)
+
+    def test_invalid_ids(self):
+        for ids in ['', 'a,b']:
+            self.assertEqual(self.client.get(self.url, {'ids': ids}).status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(PRODUCT_BATCH_MAX_IDS=2):
+            response = self.client.post(self.url, {'ids': [1, 2, 3]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,16 +1,35 @@
-from django.urls import path
-from .views import (
-    ProductListView,
-    ProductDetailView,
-    ProductCreateView,
-    ProductUpdateView,
-    ProductDeleteView,
-)
-
-urlpatterns = [
-    path('', ProductListView.as_view(), name='product-list'),
-    path('<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
-    path('create/', ProductCreateView.as_view(), name='product-create'),
-    path('<int:pk>/update/', ProductUpdateView.as_view(), name='product-update'),
-    path('<int:pk>/delete/', ProductDeleteView.as_view(), name='product-delete'),
-]
+from django.urls import path
+from .async_views import AsyncProductListView, AsyncProductDetailView
+from .views import (
+    ProductListView,
+    ProductDetailView,
+    ProductCreateView,
+    ProductUpdateView,
+    ProductDeleteView,
+    ProductExportView,
+    ProductChangesView,
+    ProductFacetsView,
+    ProductRelatedView,
+    BestSellersView,
+    ProductAutocompleteView,
+    ProductAutocompleteStatsView,
+    ProductBatchView,
+)
+
+urlpatterns = [
+    path('', ProductListView.as_view(), name='product-list'),
+    path('<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
+    path('batch/', ProductBatchView.as_view(), name='product-batch'),
+    path('create/', ProductCreateView.as_view(), name='product-create'),
+    path('<int:pk>/update/', ProductUpdateView.as_view(), name='product-update'),
+    path('<int:pk>/delete/', ProductDeleteView.as_view(), name='product-delete'),
+    path('<int:pk>/related/', ProductRelatedView.as_view(), name='product-related'),
+    path('export/', ProductExportView.as_view(), name='product-export'),
+    path('changes/', ProductChangesView.as_view(), name='product-changes'),
+    path('facets/', ProductFacetsView.as_view(), name='product-facets'),
+    path('best-sellers/', BestSellersView.as_view(), name='product-best-sellers'),
+    path('autocomplete/', ProductAutocompleteView.as_view(), name='product-autocomplete'),
+    path('autocomplete/stats/', ProductAutocompleteStatsView.as_view(), name='product-autocomplete-stats'),
+    path('async/', AsyncProductListView.as_view(), name='product-list-async'),
+    path('async/<int:pk>/', AsyncProductDetailView.as_view(), name='product-detail-async'),
+]
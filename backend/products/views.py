@@ -1,33 +1,258 @@
-from rest_framework import generics, permissions
-from .models import Product
-from .serializers import ProductSerializer
-
-# ✅ List all products (Public)
-class ProductListView(generics.ListAPIView):
-    queryset = Product.objects.all()
-    serializer_class = ProductSerializer
-    permission_classes = [permissions.AllowAny]
-
-# ✅ Retrieve a single product (Public)
-class ProductDetailView(generics.RetrieveAPIView):
-    queryset = Product.objects.all()
-    serializer_class = ProductSerializer
-    permission_classes = [permissions.AllowAny]
-
-# ✅ Create a product (Admin only)
-class ProductCreateView(generics.CreateAPIView):
-    queryset = Product.objects.all()
-    serializer_class = ProductSerializer
-    permission_classes = [permissions.IsAdminUser]
-
-# ✅ Update a product (Admin only)
-class ProductUpdateView(generics.UpdateAPIView):
-    queryset = Product.objects.all()
-    serializer_class = ProductSerializer
-    permission_classes = [permissions.IsAdminUser]
-
-# ✅ Delete a product (Admin only)
-class ProductDeleteView(generics.DestroyAPIView):
-    queryset = Product.objects.all()
-    serializer_class = ProductSerializer
-    permission_classes = [permissions.IsAdminUser]
+from django.conf import settings
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from shoply.conditional import conditional_get
+from shoply.pagination import EstimatedCountPagination
+from shoply.streaming import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, streaming_export
+from . import autocomplete, cache as product_cache, leaderboard
+from .changes import cursor_expired, settled_changes, settled_watermark
+from .filters import filter_products, parse_product_fields, parse_product_filters, parse_product_ids, product_facets
+from .models import Product, ProductChange
+from .serializers import PRODUCT_FIELDS, ProductSerializer, serialize_product_rows
+
+def catalog_freshness(request, *args, **kwargs):
+    """Latest change-log entry: bumps on every create, update and delete."""
+    latest = ProductChange.objects.order_by('-id').values_list('id', 'changed_at').first()
+    return latest or (0, None)
+
+def product_freshness(request, pk, *args, **kwargs):
+    updated_at = Product.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    return (updated_at.isoformat(), updated_at) if updated_at else None
+
+class SparseFieldsMixin:
+    """Honour ?fields=id,name,... by narrowing both the serializer and the SELECT."""
+
+    def get_requested_fields(self):
+        return parse_product_fields(self.request.query_params, PRODUCT_FIELDS)
+
+    def get_queryset(self):
+        return super().get_queryset().only(*self.get_requested_fields())
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['fields'] = self.get_requested_fields()
+        return super().get_serializer(*args, **kwargs)
+
+# ✅ Opt-in pagination for the product listing: only with ?page= or ?page_size=
+class ProductPagination(EstimatedCountPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param not in request.query_params \
+                and self.page_size_query_param not in request.query_params:
+            return None  # unpaginated list, as before
+        return super().paginate_queryset(queryset, request, view)
+
+# ✅ List all products (Public)
+class ProductListView(SparseFieldsMixin, generics.ListAPIView):
+    queryset = Product.objects.all()
+    serializer_class = ProductSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = ProductPagination
+
+    @conditional_get(catalog_freshness)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        # ✅ ?min_price=&max_price=&in_stock=true&ordering=newest|oldest|price|-price
+        return filter_products(queryset, parse_product_filters(self.request.query_params))
+
+    def list(self, request, *args, **kwargs):
+        # Read-only fast path: values() rows straight to dicts, no ModelSerializer per row
+        fields = self.get_requested_fields()
+        rows = self.filter_queryset(self.get_queryset()).values(*fields)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serialize_product_rows(page, fields, request))
+        return Response(serialize_product_rows(rows, fields, request))
+
+# ✅ Facet counts for the current listing filters, in one aggregate query (Public)
+class ProductFacetsView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    @conditional_get(catalog_freshness)
+    def get(self, request):
+        filters = parse_product_filters(request.query_params)
+        return Response(product_facets(Product.objects.all(), filters))
+
+# ✅ Retrieve a single product (Public)
+class ProductDetailView(SparseFieldsMixin, generics.RetrieveAPIView):
+    queryset = Product.objects.all()
+    serializer_class = ProductSerializer
+    permission_classes = [permissions.AllowAny]
+
+    @conditional_get(product_freshness)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+# ✅ Many products by id in one lookup, in the order asked for (Public)
+class ProductBatchView(APIView):
+    """
+    GET ?ids=3,1,2 or POST {"ids": [3, 1, 2]}; ?fields= narrows each product.
+    Rows come from products/cache.py, so they can lag a change by PRODUCT_CACHE_SECONDS.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        return self.lookup(request, request.query_params.get('ids', ''))
+
+    def post(self, request):
+        # A body that is not an object (e.g. a bare list) gets the same 400 as missing ids
+        return self.lookup(request, request.data.get('ids') if isinstance(request.data, dict) else None)
+
+    def lookup(self, request, raw_ids):
+        ids = parse_product_ids(raw_ids, settings.PRODUCT_BATCH_MAX_IDS)
+        fields = parse_product_fields(request.query_params, PRODUCT_FIELDS)
+        # Cached rows first, then one id IN (...) query for the rest
+        found = product_cache.get_products(ids)
+        rows = [found[pk] for pk in ids if pk in found]
+        return Response({
+            "results": serialize_product_rows(rows, fields, request),
+            "missing": [pk for pk in ids if pk not in found],
+        })
+
+# ✅ Create a product (Admin only)
+class ProductCreateView(generics.CreateAPIView):
+    queryset = Product.objects.all()
+    serializer_class = ProductSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+# ✅ Update a product (Admin only)
+class ProductUpdateView(generics.UpdateAPIView):
+    queryset = Product.objects.all()
+    serializer_class = ProductSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+# ✅ Delete a product (Admin only)
+class ProductDeleteView(generics.DestroyAPIView):
+    queryset = Product.objects.all()
+    serializer_class = ProductSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+# ✅ Stream the full catalog as NDJSON or CSV (Admin only)
+class ProductExportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    export_fields = ['id', 'name', 'description', 'price', 'stock', 'image', 'created_at', 'updated_at']
+
+    def get(self, request):
+        export_format = request.query_params.get('fmt', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # .iterator() uses a server-side cursor on PostgreSQL, so memory stays flat
+        queryset = Product.objects.order_by('id')
+
+        def records():
+            return queryset.values(*self.export_fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+        def rows():
+            return queryset.values_list(*self.export_fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+        return streaming_export('products', export_format, records, self.export_fields, rows)
+
+# ✅ Delta sync: products created, updated or deleted after a watermark (Public)
+class ProductChangesView(APIView):
+    permission_classes = [permissions.AllowAny]
+    default_limit = 500
+    max_limit = 1000
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            return Response({"error": "since and limit must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if since < 0 or limit < 1:
+            return Response({"error": "since must be >= 0 and limit >= 1."}, status=status.HTTP_400_BAD_REQUEST)
+        if cursor_expired(since):
+            # Changes after ``since`` were deleted by retention: list every product, then follow from resync_from
+            return Response({
+                "error": "since is older than the change log kept; resync from a full product listing.",
+                "resync_from": settled_watermark(),
+            }, status=status.HTTP_410_GONE)
+
+        # Fetch one extra row to know whether another page follows
+        # Only committed changes, so next_since never passes one that commits later
+        changes = list(
+            settled_changes(since)
+            .order_by('id')
+            .values_list('id', 'product_id', 'action')[:limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        # Collapse to the latest action per product within this window
+        latest = {}
+        for _, product_id, action in changes:
+            latest[product_id] = action
+        live_ids = [pid for pid, action in latest.items() if action != ProductChange.DELETED]
+        products = Product.objects.filter(id__in=live_ids).order_by('id')
+        changed = ProductSerializer(products, many=True, context={'request': request}).data
+
+        # Anything not found was deleted after this window; report it as gone
+        found = {product['id'] for product in changed}
+        deleted = sorted(pid for pid in latest if pid not in found)
+
+        return Response({
+            "since": since,
+            "next_since": changes[-1][0] if changes else since,
+            "has_more": has_more,
+            "changed": changed,
+            "deleted": deleted,
+        })
+
+# ✅ "Frequently bought together" for a product page, precomputed (Public)
+class ProductRelatedView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, pk):
+        fields = parse_product_fields(request.query_params, PRODUCT_FIELDS)
+        # One lookup on the (product, rank) unique index, joined to the neighbours
+        rows = Product.objects.filter(related_to__product_id=pk).order_by('related_to__rank').values(*fields)
+        return Response(serialize_product_rows(rows, fields, request))
+
+# ✅ Best-selling products over the last 1h, 24h or 7d, precomputed (Public)
+class BestSellersView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        window = request.query_params.get('window', '24h')
+        if window not in leaderboard.WINDOWS:
+            return Response({"error": f"window must be one of: {', '.join(leaderboard.WINDOWS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), settings.LEADERBOARD_SIZE)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        fields = parse_product_fields(request.query_params, PRODUCT_FIELDS)
+
+        refreshed_at, rows = leaderboard.top_products(window)
+        rows = rows[:max(limit, 0)]
+        results = serialize_product_rows(rows, fields, request)
+        for result, row in zip(results, rows):
+            result['units_sold'] = row['units_sold']
+        return Response({"window": window, "refreshed_at": refreshed_at, "results": results})
+
+# ✅ Search-box suggestions from the in-memory prefix index, most popular first (Public)
+class ProductAutocompleteView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), settings.AUTOCOMPLETE_MAX_RESULTS)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        results = autocomplete.suggest(query, max(limit, 0))
+        return Response({"query": query, "results": [{"id": pk, "name": name} for pk, name in results]})
+
+# ✅ Size and memory use of this process's autocomplete index (Admin only)
+class ProductAutocompleteStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(autocomplete.index.stats())
@@ -0,0 +1,37 @@
+import hashlib
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+_FRESHNESS_ATTR = '_conditional_freshness'
+
+
+def conditional_get(freshness):
+    """
+    Method decorator adding strong ETag and Last-Modified handling to a DRF
+    ``get`` handler, built on Django's ``condition`` decorator.
+
+    ``freshness(request, *args, **kwargs)`` must return ``(version, last_modified)``
+    from a cheap indexed lookup, or ``None`` when the object does not exist. It runs
+    once per request; when the client's validators match, a 304 is returned before
+    the view (and its serializer) runs.
+    """
+    def _freshness(request, *args, **kwargs):
+        if not hasattr(request, _FRESHNESS_ATTR):
+            setattr(request, _FRESHNESS_ATTR, freshness(request, *args, **kwargs))
+        return getattr(request, _FRESHNESS_ATTR)
+
+    def etag(request, *args, **kwargs):
+        result = _freshness(request, *args, **kwargs)
+        if result is None:
+            return None
+        # The path (query string included) and renderer identify the representation
+        renderer = getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+        key = f"{request.get_full_path()}|{renderer}|{result[0]}"
+        return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+    def last_modified(request, *args, **kwargs):
+        result = _freshness(request, *args, **kwargs)
+        return result[1] if result else None
+
+    return method_decorator(condition(etag_func=etag, last_modified_func=last_modified))
@@ -0,0 +1,123 @@
+import json
+
+from django.conf import settings
+from django.db import connections
+
+
+def connection_stats(alias='default'):
+    """
+    Connection reuse figures for one database alias.
+
+    With a psycopg pool this includes the pool's own counters, notably how many
+    requests had to queue for a connection and the total time spent waiting.
+    """
+    connection = connections[alias]
+    settings_dict = connection.settings_dict
+    stats = {
+        'alias': alias,
+        'vendor': connection.vendor,
+        'conn_max_age': settings_dict.get('CONN_MAX_AGE'),
+        'health_checks': settings_dict.get('CONN_HEALTH_CHECKS'),
+        'pooled': False,
+    }
+
+    # DatabaseWrapper.pool only exists on the PostgreSQL backend (Django 5.1+)
+    pool = getattr(connection, 'pool', None)
+    if pool is None:
+        stats['connected'] = connection.connection is not None
+        return stats
+
+    pool_stats = pool.get_stats()
+    queued = pool_stats.get('requests_queued', 0)
+    wait_ms = pool_stats.get('requests_wait_ms', 0)
+    stats.update({
+        'pooled': True,
+        'pool_min': pool_stats.get('pool_min'),
+        'pool_max': pool_stats.get('pool_max'),
+        'pool_size': pool_stats.get('pool_size'),
+        'pool_available': pool_stats.get('pool_available'),
+        'requests_waiting': pool_stats.get('requests_waiting', 0),
+        'requests_num': pool_stats.get('requests_num', 0),
+        'requests_queued': queued,
+        'requests_wait_ms': wait_ms,
+        'avg_wait_ms': round(wait_ms / queued, 3) if queued else 0.0,
+        'requests_errors': pool_stats.get('requests_errors', 0),
+        'connections_num': pool_stats.get('connections_num', 0),
+        'connections_lost': pool_stats.get('connections_lost', 0),
+    })
+    return stats
+
+
+def oldest_write_transaction(using='default'):
+    """
+    Start time of the oldest open transaction in another session that has written
+    something (holds an xid), on PostgreSQL; None elsewhere or when there is none.
+    Other roles' sessions only show up for the same role or pg_read_all_stats members.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT min(xact_start) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND backend_xid IS NOT NULL AND pid <> pg_backend_pid()"
+        )
+        return cursor.fetchone()[0]
+
+
+def table_estimate(queryset):
+    """pg_class.reltuples for the queryset's table (kept current by autovacuum/ANALYZE), or None."""
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                       [connection.ops.quote_name(queryset.model._meta.db_table)])
+        row = cursor.fetchone()
+    # reltuples is -1 until the table has been vacuumed or analyzed once
+    return row[0] if row and row[0] >= 0 else None
+
+
+def plan_estimate(queryset):
+    """The planner's row estimate for the queryset; EXPLAIN plans it without running it."""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_rows(queryset, threshold=None):
+    """
+    ``(count, is_estimate)`` for a queryset without paying for an exact COUNT(*) on
+    large results. On PostgreSQL, results of at least ``threshold`` rows
+    (ESTIMATED_COUNT_THRESHOLD) are counted from planner statistics:
+
+    * unfiltered: the table's reltuples, a catalog lookup;
+    * filtered: a COUNT(*) capped at ``threshold`` rows first, so small results stay
+      exact in one query, then EXPLAIN's estimate only when the cap is reached.
+
+    Other databases always get the exact count.
+    """
+    threshold = settings.ESTIMATED_COUNT_THRESHOLD if threshold is None else threshold
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.count(), False
+
+    query = queryset.query
+    if query.low_mark or query.high_mark is not None or query.combinator:
+        return queryset.count(), False
+    if not query.where and not query.distinct:
+        estimate = table_estimate(queryset)
+        if estimate is not None and estimate >= threshold:
+            return estimate, True
+        return queryset.count(), False
+
+    capped = queryset[:threshold].count()
+    if capped < threshold:
+        return capped, False
+    return max(plan_estimate(queryset), threshold), True
+
+
+def estimated_count(queryset, threshold=None):
+    """Row count of a queryset, estimated for large results; see count_rows."""
+    return count_rows(queryset, threshold)[0]
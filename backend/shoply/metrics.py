@@ -0,0 +1,245 @@
+"""
+Prometheus-style metrics without a client library.
+
+Updates are lock-free: each thread writes to its own shard of every metric, and
+shards are only merged when /metrics is scraped. With METRICS_DIR set, every
+process periodically dumps its merged values to METRICS_DIR/<pid>.json and the
+scraping process sums all files, so counters add up across gunicorn/uvicorn
+workers. Gauges are computed at scrape time by the scraping process.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        (registry or REGISTRY).register(self)
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            self._shards.append(shard)  # atomic under the GIL; once per thread
+            return shard
+
+    def describe(self):
+        return {'type': self.type, 'help': self.documentation, 'labelnames': list(self.labelnames)}
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labelvalues, amount=1):
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def collect(self):
+        totals = {}
+        for shard in list(self._shards):
+            for labels, value in shard.copy().items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(float(bound) for bound in buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, *labelvalues):
+        shard = self._shard()
+        slots = shard.get(labelvalues)
+        if slots is None:
+            # one count per bucket, one for +Inf, then the running sum
+            slots = shard[labelvalues] = [0] * (len(self.buckets) + 2)
+        slots[bisect_left(self.buckets, value)] += 1
+        slots[-1] += value
+
+    def collect(self):
+        totals = {}
+        for shard in list(self._shards):
+            for labels, slots in shard.copy().items():
+                merged = totals.setdefault(labels, [0] * len(slots))
+                for index, value in enumerate(slots):
+                    merged[index] += value
+        return totals
+
+    def describe(self):
+        return {**super().describe(), 'buckets': list(self.buckets)}
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.gauges = {}
+        self._last_flush = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def register_gauge(self, name, documentation, labelnames, callback):
+        """``callback()`` returns ``[(labelvalues, value), ...]``; it runs only when scraped."""
+        self.gauges[name] = (documentation, tuple(labelnames), callback)
+
+    def snapshot(self):
+        return {
+            name: {**metric.describe(),
+                   'samples': [[list(labels), value] for labels, value in metric.collect().items()]}
+            for name, metric in self.metrics.items()
+        }
+
+    def flush(self):
+        directory = settings.METRICS_DIR
+        self._last_flush = time.monotonic()
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(self.snapshot(), fh)
+        os.replace(tmp_path, path)
+
+    def maybe_flush(self):
+        if settings.METRICS_DIR and time.monotonic() - self._last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def aggregate(self):
+        """Merged snapshot across every process that has written to METRICS_DIR."""
+        if not settings.METRICS_DIR:
+            return self.snapshot()
+        self.flush()
+        merged = {}
+        for filename in os.listdir(settings.METRICS_DIR):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(settings.METRICS_DIR, filename)) as fh:
+                    snapshot = json.load(fh)
+            except (OSError, ValueError):
+                continue  # a file being replaced right now
+            for name, family in snapshot.items():
+                target = merged.setdefault(name, {**family, 'samples': {}})
+                for labels, value in family['samples']:
+                    key = tuple(labels)
+                    if isinstance(value, list):
+                        current = target['samples'].setdefault(key, [0] * len(value))
+                        target['samples'][key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target['samples'][key] = target['samples'].get(key, 0) + value
+        for family in merged.values():
+            family['samples'] = [[list(labels), value] for labels, value in family['samples'].items()]
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name, family in sorted(self.aggregate().items()):
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            labelnames = family['labelnames']
+            for labelvalues, value in sorted(family['samples']):
+                pairs = list(zip(labelnames, labelvalues))
+                if family['type'] != 'histogram':
+                    lines.append(f"{name}{_labels(pairs)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip([*family['buckets'], '+Inf'], value[:-1]):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _number(bound)
+                    lines.append(f"{name}_bucket{_labels(pairs + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(pairs)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(pairs)} {cumulative}")
+
+        for name, (documentation, labelnames, callback) in sorted(self.gauges.items()):
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for labelvalues, value in callback():
+                lines.append(f"{name}{_labels(list(zip(labelnames, labelvalues)))} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', "Request latency by URL name, method and status.",
+    ('view', 'method', 'status'),
+)
+DB_QUERY_DURATION = Histogram(
+    'db_query_duration_seconds', "Database query latency by connection alias.",
+    ('alias',), buckets=QUERY_BUCKETS,
+)
+ORDERS_CREATED = Counter('orders_created_total', "Orders created.")
+ORDERS_PAID = Counter('orders_paid_total', "Orders that became paid.")
+STOCK_OUTS = Counter('stock_out_events_total', "Times a product's stock reached zero.")
+PAYMENT_PROVIDER_DURATION = Histogram(
+    'payment_provider_duration_seconds', "Latency of payment provider calls by provider and outcome.",
+    ('provider', 'outcome'),
+)
+
+
+def time_queries(execute, sql, params, many, context):
+    """Connection execute_wrapper that records every query's duration."""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        DB_QUERY_DURATION.observe(time.perf_counter() - start, context['connection'].alias)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """connection_created receiver; also called for connections that were already open."""
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+def _pool_gauges(key):
+    def callback():
+        from .db import connection_stats
+        samples = []
+        for alias in settings.DATABASES:
+            stats = connection_stats(alias)
+            if stats['pooled']:
+                samples.append(((alias,), stats[key]))
+        return samples
+    return callback
+
+
+REGISTRY.register_gauge('db_pool_requests_queued', "Pool checkouts that had to wait.",
+                        ('alias',), _pool_gauges('requests_queued'))
+REGISTRY.register_gauge('db_pool_wait_milliseconds', "Total time spent waiting for a pooled connection.",
+                        ('alias',), _pool_gauges('requests_wait_ms'))
+REGISTRY.register_gauge('db_pool_available', "Idle connections in the pool.",
+                        ('alias',), _pool_gauges('pool_available'))
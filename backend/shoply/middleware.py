@@ -0,0 +1,243 @@
+import random
+import re
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from . import metrics, profiler
+from .routers import PIN_COOKIE, end_request_routing, start_request_routing
+
+try:
+    import brotli
+except ImportError:  # optional: `pip install brotli` to offer br encoding
+    brotli = None
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class MetricsMiddleware:
+    """
+    Records request latency by URL name, method and status, and times every
+    database query on every connection. Not loaded when
+    METRICS_ENABLED is off. Works under WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        connection_created.connect(metrics.install_query_timer, dispatch_uid='shoply.metrics')
+        for connection in connections.all(initialized_only=True):
+            metrics.install_query_timer(sender=None, connection=connection)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, duration):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        metrics.HTTP_REQUEST_DURATION.observe(duration, view, request.method, str(response.status_code))
+        metrics.REGISTRY.maybe_flush()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe requests read from replicas and pins a client to the primary for
+    REPLICA_PIN_SECONDS after it writes, so it always reads its own writes.
+    Not loaded at all when no replicas are configured. Works under WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            state = end_request_routing(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            state = end_request_routing(token)
+        return self.finish(request, response, state)
+
+    def start(self, request):
+        pinned = request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+        return start_request_routing(use_replicas=not pinned)
+
+    def finish(self, request, response, state):
+        if state.wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+
+class ProfilerMiddleware:
+    """
+    Samples the call stack of selected requests into a flamegraph-compatible
+    profile (see shoply/profiler.py). A request is profiled when a staff user
+    sends "X-Profile: 1", or at random with probability PROFILER_SAMPLE_RATE.
+    The stored profile's name comes back in the X-Profile-Id header.
+
+    Not loaded at all unless PROFILER_ENABLED is set, so it costs nothing when
+    disabled. When enabled it runs synchronously: under ASGI the view runs in a
+    worker thread whose stack is the one being sampled.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        sampler = profiler.StackSampler(threading.get_ident(), settings.PROFILER_INTERVAL).start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        match = request.resolver_match
+        response['X-Profile-Id'] = profiler.save_profile(stacks, match.url_name if match else None)
+        return response
+
+    def should_profile(self, request):
+        if request.headers.get('X-Profile') == '1' and self.is_staff(request):
+            return True
+        return settings.PROFILER_SAMPLE_RATE > 0 and random.random() < settings.PROFILER_SAMPLE_RATE
+
+    def is_staff(self, request):
+        return is_staff_request(request)
+
+
+def is_staff_request(request):
+    """Whether a staff user sent the request, by session or by JWT."""
+    # The API authenticates with JWT inside the views, so check the token here too
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff:
+        return True
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return result is not None and result[0].is_staff
+
+
+_ACCEPT_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*')
+
+
+def accepted_encodings(header):
+    """Encodings the client accepts, mapped to their q-value (q=0 entries dropped)."""
+    encodings = {}
+    for part in header.split(','):
+        match = _ACCEPT_ENCODING_RE.fullmatch(part)
+        if not match:
+            continue
+        try:
+            quality = float(match[2]) if match[2] else 1.0
+        except ValueError:
+            continue
+        if quality > 0:
+            encodings[match[1].lower()] = quality
+    return encodings
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses responses above COMPRESSION_MIN_SIZE bytes with brotli or gzip,
+    whichever the client prefers (brotli wins ties when installed). Streaming
+    responses are gzipped on the fly. Like Django's GZipMiddleware, strong ETags
+    are weakened and gzip output gets random padding against BREACH.
+    """
+    # Random bytes added to the gzip filename field, as in GZipMiddleware
+    max_random_bytes = 100
+
+    def __init__(self, get_response):
+        if not settings.COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def choose_encoding(self, request, streaming):
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        candidates = ['gzip'] if streaming or brotli is None else ['br', 'gzip']
+        best = max(candidates, key=lambda name: accepted.get(name, 0))
+        return best if accepted.get(best, 0) > 0 else None
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code < 200:
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.choose_encoding(request, response.streaming)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.compress_async(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=self.max_random_bytes
+                )
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # The compressed entity is no longer byte-for-byte the one the ETag names
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    async def compress_async(self, chunks):
+        # Same approach as GZipMiddleware: each chunk is a complete gzip member
+        async for chunk in chunks:
+            yield compress_string(chunk, max_random_bytes=self.max_random_bytes)
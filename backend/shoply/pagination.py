@@ -0,0 +1,76 @@
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from .db import count_rows
+
+
+class EstimatedPage(Page):
+    has_more = None  # set when the count is an estimate: whether a row follows this page
+
+    def has_next(self):
+        return super().has_next() if self.has_more is None else self.has_more
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count is a planner estimate for large results (see shoply.db.count_rows).
+    With an estimate, any page number is served, since the real last pages may lie
+    beyond the estimated num_pages; whether a next page exists is read from the rows.
+    """
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        count, self.count_is_estimate = count_rows(self.object_list)
+        return count
+
+    def validate_number(self, number):
+        self.count  # evaluating the count sets count_is_estimate
+        if not self.count_is_estimate:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_is_estimate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])  # one extra: is there more?
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.has_more = len(rows) > self.per_page
+        return page
+
+    def _get_page(self, *args, **kwargs):
+        return EstimatedPage(*args, **kwargs)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    PageNumberPagination without an exact COUNT(*) on large results. The response
+    says whether ``count`` is an estimate; with an estimate, ``next`` follows the
+    rows actually there and pages past the real end come back empty, not 404.
+    """
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'count_is_estimate': self.page.paginator.count_is_estimate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_estimate'] = {'type': 'boolean', 'example': False}
+        return response_schema
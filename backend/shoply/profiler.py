@@ -0,0 +1,95 @@
+"""
+On-demand sampling profiler for live requests.
+
+While a request is profiled, a background thread snapshots the request thread's
+stack every PROFILER_INTERVAL seconds. Identical stacks are counted and written
+to PROFILER_DIR in the "collapsed" format (``root;caller;callee count`` per
+line) that flamegraph.pl, speedscope and inferno read directly.
+"""
+import os
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.utils import timezone
+
+PROFILE_SUFFIX = '.folded'
+PROFILE_NAME_RE = re.compile(r'^[\w.-]+\.folded$')
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{code.co_qualname}"
+
+
+def collapse_stack(frame):
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Samples one thread's stack from a daemon thread until stop() is called."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='shoply-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+
+def save_profile(stacks, label):
+    """Write collapsed stacks to PROFILER_DIR and prune the oldest files; returns the file name."""
+    os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+    label = re.sub(r'[^\w.-]', '_', label or 'unmatched')
+    name = f"{timezone.now():%Y%m%dT%H%M%S}-{label}-{uuid.uuid4().hex[:8]}{PROFILE_SUFFIX}"
+    with open(os.path.join(settings.PROFILER_DIR, name), 'w') as fh:
+        for stack, count in stacks.most_common():
+            fh.write(f"{stack} {count}\n")
+
+    for stale in list_profiles()[settings.PROFILER_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(settings.PROFILER_DIR, stale['name']))
+        except OSError:
+            pass
+    return name
+
+
+def list_profiles():
+    """Stored profiles, newest first."""
+    try:
+        entries = [entry for entry in os.scandir(settings.PROFILER_DIR)
+                   if entry.is_file() and PROFILE_NAME_RE.match(entry.name)]
+    except FileNotFoundError:
+        return []
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    return [{'name': entry.name, 'size': entry.stat().st_size} for entry in entries]
+
+
+def profile_path(name):
+    """Absolute path of a stored profile, or None for names that are not ours."""
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    path = os.path.join(settings.PROFILER_DIR, name)
+    return path if os.path.isfile(path) else None
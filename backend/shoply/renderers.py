@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional: `pip install orjson` for the fast path
+    orjson = None
+
+
+class DecimalStringEncoder(JSONEncoder):
+    """DRF's JSONEncoder, but Decimals become exact strings instead of floats."""
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return super().default(obj)
+
+
+_default = DecimalStringEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Compact JSON renderer backed by orjson. Output matches JSONRenderer's, except
+    that raw Decimals are written as exact strings. Falls back to the stdlib
+    encoder when orjson is unavailable, when indentation is requested (browsable API)
+    or for values orjson cannot encode, such as integers wider than 64 bits.
+    """
+    encoder_class = DecimalStringEncoder
+    # Datetimes go through _default so they keep DRF's 'Z' suffix for UTC
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same as JSONRenderer: keep the output a strict JavaScript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
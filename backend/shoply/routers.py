@@ -0,0 +1,100 @@
+import random
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+PRIMARY = 'default'
+
+# Cookie that keeps a client on the primary for a short window after it writes
+PIN_COOKIE = 'primary_pin'
+
+
+@dataclass
+class RoutingState:
+    use_replicas: bool
+    wrote: bool = False
+
+
+# Unset outside of requests (management commands, tasks): everything uses the primary
+_routing = ContextVar('db_routing', default=None)
+
+# alias -> (checked_at, healthy); per process, refreshed every REPLICA_LAG_CHECK_INTERVAL
+_replica_health = {}
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def start_request_routing(use_replicas):
+    """Set the routing state for the current request; returns a token for end_request_routing."""
+    return _routing.set(RoutingState(use_replicas=use_replicas))
+
+
+def end_request_routing(token):
+    state = _routing.get()
+    _routing.reset(token)
+    return state
+
+
+def replica_lag(alias):
+    """Replication delay of a replica in seconds (0 when it has replayed everything)."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0] or 0)
+
+
+def replica_is_healthy(alias):
+    now = time.monotonic()
+    checked_at, healthy = _replica_health.get(alias, (None, False))
+    if checked_at is not None and now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return healthy
+    try:
+        healthy = replica_lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS
+    except DatabaseError:
+        healthy = False
+    _replica_health[alias] = (now, healthy)
+    return healthy
+
+
+def choose_replica():
+    """A random healthy replica, or None if all of them are lagging or down."""
+    candidates = [alias for alias in settings.REPLICA_DATABASES if replica_is_healthy(alias)]
+    return random.choice(candidates) if candidates else None
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads to a replica only while serving a safe request from a client that
+    has not written recently (see ReplicaRoutingMiddleware). Writes, and any read
+    after a write in the same request, go to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or not state.use_replicas:
+            return PRIMARY
+        return choose_replica() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.use_replicas = False
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
@@ -1,170 +1,331 @@
-"""
-Django settings for shoply project.
-
-Generated by 'django-admin startproject' using Django 5.1.7.
-
-For more information on this file, see
-https://docs.djangoproject.com/en/5.1/topics/settings/
-
-For the full list of settings and their values, see
-https://docs.djangoproject.com/en/5.1/ref/settings/
-"""
-
-import os
-from pathlib import Path
-from dotenv import load_dotenv
-
-STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
-
-# Load Environment Variables
-load_dotenv()
-
-# Define BASE_DIR using Pathlib
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-# Secret Key & Debug Mode
-SECRET_KEY = os.getenv('SECRET_KEY')
-DEBUG = os.getenv('DEBUG', 'True') == 'True'
-
-ALLOWED_HOSTS = ['localhost', '127.0.0.1']
-
-
-# Application definition
-
-INSTALLED_APPS = [
-    'django.contrib.admin',
-    'django.contrib.auth',
-    'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
-    
-    # Custom Apps
-    'users',
-    'products',
-    'orders',
-    
-    # Third-Party Apps
-    'rest_framework',
-    'rest_framework_simplejwt.token_blacklist',  # Enable Token Blacklist
-    'corsheaders',
-]
-
-MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'corsheaders.middleware.CorsMiddleware',  # Enable CORS
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-]
-
-# Root URL Configuration
-ROOT_URLCONF = 'shoply.urls'
-
-# Templates
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
-        },
-    },
-]
-
-# WSGI Application
-WSGI_APPLICATION = 'shoply.wsgi.application'
-
-
-# Database Configuration (PostgreSQL)
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.getenv('DB_NAME'),
-        'USER': os.getenv('DB_USER'),
-        'PASSWORD': os.getenv('DB_PASSWORD'),
-        'HOST': os.getenv('DB_HOST', 'localhost'),
-        'PORT': os.getenv('DB_PORT', '5432'),
-    }
-}
-
-AUTH_USER_MODEL = 'users.User'
-
-# Password validation
-# https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
-
-AUTH_PASSWORD_VALIDATORS = [
-    {
-        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
-    },
-]
-
-# JWT Authentication (DRF)
-REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    ),
-    'DEFAULT_PERMISSION_CLASSES': (
-        'rest_framework.permissions.IsAuthenticated',
-    ),
-}
-
-# JWT Settings
-from datetime import timedelta
-SIMPLE_JWT = {
-    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
-    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'AUTH_HEADER_TYPES': ('Bearer',),
-}
-
-# Internationalization
-LANGUAGE_CODE = 'en-us'
-TIME_ZONE = 'Asia/Ho_Chi_Minh'
-USE_I18N = True
-USE_L10N = True
-USE_TZ = True
-
-# Static & Media Files
-STATIC_URL = '/static/'
-MEDIA_URL = '/media/'
-
-STATICFILES_DIRS = [BASE_DIR / 'static']
-STATIC_ROOT = BASE_DIR / 'staticfiles'
-MEDIA_ROOT = BASE_DIR / 'media'
-
-CORS_ALLOWED_ORIGINS = [
-    "http://localhost:8000",
-    "http://127.0.0.1:8000",
-]
-
-# Default Auto Field
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-
-# ✅ Cấu hình gửi email
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
-EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')  # Thay bằng email thật
-EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')  # Thay bằng mật khẩu email thật
-
-# ✅ URL frontend để người dùng truy cập đặt lại mật khẩu
-FRONTEND_URL = "http://localhost:3000"
+"""
+Django settings for shoply project.
+
+Generated by 'django-admin startproject' using Django 5.1.7.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.1/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.1/ref/settings/
+"""
+
+import os
+from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
+from dotenv import load_dotenv
+
+STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
+
+# Load Environment Variables
+load_dotenv()
+
+# Define BASE_DIR using Pathlib
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Secret Key & Debug Mode
+SECRET_KEY = os.getenv('SECRET_KEY')
+DEBUG = os.getenv('DEBUG', 'True') == 'True'
+
+ALLOWED_HOSTS = ['localhost', '127.0.0.1']
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    
+    # Custom Apps
+    'users',
+    'products',
+    'orders',
+    'tasks',
+    
+    # Third-Party Apps
+    'rest_framework',
+    'rest_framework_simplejwt.token_blacklist',  # Enable Token Blacklist
+    'corsheaders',
+]
+
+MIDDLEWARE = [
+    'shoply.middleware.MetricsMiddleware',  # Request/query latency for /metrics
+    'django.middleware.security.SecurityMiddleware',
+    'shoply.middleware.ReplicaRoutingMiddleware',  # Only active when replicas are configured
+    'shoply.middleware.CompressionMiddleware',  # gzip/brotli above COMPRESSION_MIN_SIZE
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'corsheaders.middleware.CorsMiddleware',  # Enable CORS
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'shoply.middleware.ProfilerMiddleware',  # Only active with PROFILER_ENABLED
+]
+
+# Root URL Configuration
+ROOT_URLCONF = 'shoply.urls'
+
+# Templates
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [BASE_DIR / 'templates'],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+# WSGI Application
+WSGI_APPLICATION = 'shoply.wsgi.application'
+
+
+# Cache shared by every process, e.g. redis://localhost:6379/1. Without it each
+# process keeps its own local-memory cache (see PRODUCT_CACHE_SECONDS)
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+
+# Database Configuration (PostgreSQL)
+# The driver is psycopg2 from requirements.txt. DB_POOL=True uses a psycopg 3 pool
+# instead, which needs `pip install -r requirements-pool.txt`; once psycopg 3 is
+# installed Django uses it for every connection, pooled or not. Without the pool,
+# connections are persistent: each thread keeps one for DB_CONN_MAX_AGE seconds
+# (default 60; 0 closes it after every request, Django's own default). Django
+# requires CONN_MAX_AGE=0 when pooling.
+DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+DB_OPTIONS = {}
+if DB_POOL:
+    try:
+        from psycopg_pool import ConnectionPool
+    except ImportError:
+        raise ImproperlyConfigured("DB_POOL=True needs psycopg 3 and psycopg_pool: pip install -r requirements-pool.txt")
+    DB_OPTIONS['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),  # seconds to wait for a free connection
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '600')),
+        'check': ConnectionPool.check_connection,  # health check on checkout
+    }
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('DB_NAME'),
+        'USER': os.getenv('DB_USER'),
+        'PASSWORD': os.getenv('DB_PASSWORD'),
+        'HOST': os.getenv('DB_HOST', 'localhost'),
+        'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': DB_OPTIONS,
+    }
+}
+
+# Read replicas: comma-separated host[:port] list sharing the primary's credentials.
+# DB_REPLICA_NAME lets a replica point at a different database, e.g. two local databases.
+REPLICA_DATABASES = []
+for index, replica in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(','))):
+    host, _, port = replica.strip().partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['shoply.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', '15'))  # read-your-writes window
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('DB_REPLICA_MAX_LAG', '5'))  # beyond this, read the primary
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', '5'))
+
+AUTH_USER_MODEL = 'users.User'
+
+# Password validation
+# https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+# JWT Authentication (DRF)
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'rest_framework_simplejwt.authentication.JWTAuthentication',
+    ),
+    'DEFAULT_PERMISSION_CLASSES': (
+        'rest_framework.permissions.IsAuthenticated',
+    ),
+}
+
+# Fast JSON rendering/parsing (orjson when installed, exact Decimal-as-string)
+if os.getenv('API_FAST_JSON', 'True') == 'True':
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+        'shoply.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    )
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = (
+        'shoply.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    )
+
+# Response compression (brotli needs the optional `brotli` package)
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True') == 'True'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))  # bytes
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+
+# Prometheus metrics at /metrics. With several worker processes set METRICS_DIR to a
+# directory shared by them (emptied on every deploy) so the scrape sums all workers.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))  # seconds
+# Scrapes send "Authorization: Bearer <METRICS_TOKEN>" or come from staff users; anyone
+# can read the metrics only with METRICS_PUBLIC=True (e.g. behind a private network)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_PUBLIC = os.getenv('METRICS_PUBLIC', 'False') == 'True'
+
+# On-demand sampling profiler: staff send "X-Profile: 1", or a fraction of requests is sampled
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'False') == 'True'
+PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', '0'))  # 0.0 - 1.0
+PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL', '0.002'))  # seconds between stack samples
+PROFILER_DIR = os.getenv('PROFILER_DIR', str(BASE_DIR / 'profiles'))
+PROFILER_MAX_FILES = int(os.getenv('PROFILER_MAX_FILES', '200'))
+
+# Background tasks (tasks app). Eager runs tasks inline as before; set TASKS_EAGER=False
+# and run `python manage.py run_tasks` to move the work off request threads.
+TASKS_EAGER = os.getenv('TASKS_EAGER', 'True') == 'True'
+TASKS_BATCH_SIZE = int(os.getenv('TASKS_BATCH_SIZE', '10'))
+TASKS_POLL_INTERVAL = float(os.getenv('TASKS_POLL_INTERVAL', '1'))  # seconds
+TASKS_MAX_ATTEMPTS = int(os.getenv('TASKS_MAX_ATTEMPTS', '5'))
+TASKS_RETRY_BASE_DELAY = float(os.getenv('TASKS_RETRY_BASE_DELAY', '10'))  # doubles per attempt
+TASKS_RETRY_MAX_DELAY = float(os.getenv('TASKS_RETRY_MAX_DELAY', '3600'))
+TASKS_LEASE_SECONDS = int(os.getenv('TASKS_LEASE_SECONDS', '600'))  # running longer = worker died
+# Best-sellers lists older than this are refreshed; by run_tasks, or on read without a worker
+LEADERBOARD_REFRESH_SECONDS = 60
+# label -> {'task': dotted name, 'interval': seconds, 'args': [...], 'kwargs': {...}}
+TASKS_PERIODIC = {
+    'refresh-leaderboards': {'task': 'products.tasks.refresh_leaderboards', 'interval': LEADERBOARD_REFRESH_SECONDS},
+    'apply-retention': {'task': 'tasks.tasks.apply_retention', 'interval': 3600},
+}
+
+# Retention (tasks/retention.py): old rows are deleted in keyed batches with a pause between them
+RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '1000'))
+RETENTION_SLEEP = float(os.getenv('RETENTION_SLEEP', '0.2'))  # seconds between batches
+RETENTION_MAX_SECONDS = int(os.getenv('RETENTION_MAX_SECONDS', '300'))  # per periodic run; resumes next time
+RETENTION_STATUS_HISTORY_DAYS = int(os.getenv('RETENTION_STATUS_HISTORY_DAYS', '730'))
+RETENTION_FINISHED_TASK_DAYS = int(os.getenv('RETENTION_FINISHED_TASK_DAYS', '30'))
+RETENTION_PRODUCT_CHANGE_DAYS = int(os.getenv('RETENTION_PRODUCT_CHANGE_DAYS', '30'))
+
+# Paginated listings and admin changelists report PostgreSQL's row estimate instead
+# of an exact COUNT(*) once the estimate reaches this many rows
+ESTIMATED_COUNT_THRESHOLD = int(os.getenv('ESTIMATED_COUNT_THRESHOLD', '100000'))
+
+# "Frequently bought together" neighbours kept per product
+RECOMMENDATIONS_TOP_K = int(os.getenv('RECOMMENDATIONS_TOP_K', '10'))
+
+# Best-sellers leaderboard (products/leaderboard.py), refreshed as LEADERBOARD_REFRESH_SECONDS says
+LEADERBOARD_BUCKET_SECONDS = 300
+LEADERBOARD_COMPACT_AFTER = 2 * 3600  # seconds; older buckets are merged per hour
+LEADERBOARD_SIZE = 100  # products kept per window
+LEADERBOARD_CACHE_SECONDS = 300
+
+# Product change log readers (/api/products/changes/, autocomplete) skip changes written
+# this long before the oldest open write transaction (see products/changes.py)
+PRODUCT_CHANGES_SETTLE_SECONDS = int(os.getenv('PRODUCT_CHANGES_SETTLE_SECONDS', '10'))
+# Product rows cached for stock hints and batch lookups (products/cache.py). Only a
+# shared cache (REDIS_URL) sees invalidations from every process; with the default
+# per-process cache, other workers serve a changed row until it expires, so the
+# entries only live a few seconds there
+PRODUCT_CACHE_SECONDS = int(os.getenv('PRODUCT_CACHE_SECONDS', '300' if REDIS_URL else '5'))
+# Ids accepted per /api/products/batch/ request
+PRODUCT_BATCH_MAX_IDS = 200
+# Distinct products a cart may hold (orders/cart.py)
+CART_MAX_LINES = 100
+
+# Search-box suggestions (products/autocomplete.py): how often each process applies
+# product changes made elsewhere, and refreshes popularity (units sold, 7 days)
+AUTOCOMPLETE_SYNC_SECONDS = 5
+AUTOCOMPLETE_POPULARITY_SECONDS = 300
+AUTOCOMPLETE_MAX_RESULTS = 50
+
+# Closed orders older than this move to the archive tables (archive_orders command)
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv('ORDER_ARCHIVE_AFTER_DAYS', '365'))
+
+# How orders take Product.stock (products/inventory.py): 'lock' (as orders always
+# have) takes SELECT ... FOR UPDATE row locks up front and holds them for the whole
+# transaction; 'conditional' only runs one UPDATE ... WHERE stock >= n at its end
+ORDER_STOCK_DECREMENT = os.getenv('ORDER_STOCK_DECREMENT', 'lock')
+
+# JWT Settings
+from datetime import timedelta
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'AUTH_HEADER_TYPES': ('Bearer',),
+}
+
+# Internationalization
+LANGUAGE_CODE = 'en-us'
+TIME_ZONE = 'Asia/Ho_Chi_Minh'
+USE_I18N = True
+USE_L10N = True
+USE_TZ = True
+
+# Static & Media Files
+STATIC_URL = '/static/'
+MEDIA_URL = '/media/'
+
+STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+CORS_ALLOWED_ORIGINS = [
+    "http://localhost:8000",
+    "http://127.0.0.1:8000",
+]
+
+# Default Auto Field
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# ✅ Cấu hình gửi email
+EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_HOST = 'smtp.gmail.com'
+EMAIL_PORT = 587
+EMAIL_USE_TLS = True
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')  # Thay bằng email thật
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')  # Thay bằng mật khẩu email thật
+
+# ✅ URL frontend để người dùng truy cập đặt lại mật khẩu
+FRONTEND_URL = "http://localhost:3000"
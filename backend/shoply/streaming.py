@@ -0,0 +1,51 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Rows fetched per round-trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(records):
+    """Encode an iterable of dicts as newline-delimited JSON, one line at a time."""
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for record in records:
+        yield encoder.encode(record) + '\n'
+
+
+def csv_lines(header, rows):
+    """Encode a header and an iterable of row tuples as CSV, one line at a time."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def streaming_export(filename, export_format, ndjson_records, csv_header, csv_rows):
+    """
+    Build a StreamingHttpResponse for an export in the requested format.
+
+    ``ndjson_records`` and ``csv_rows`` are zero-argument callables so only the
+    generator for the chosen format is created (and its query executed).
+    """
+    if export_format == 'csv':
+        content = csv_lines(csv_header, csv_rows())
+    else:
+        content = ndjson_lines(ndjson_records())
+
+    response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
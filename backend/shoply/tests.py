@@ -0,0 +1,344 @@
+import datetime
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from products.models import Product
+from rest_framework_simplejwt.tokens import AccessToken
+from . import metrics, profiler, routers
+from .middleware import CompressionMiddleware, brotli
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .db import connection_stats, count_rows
+from .pagination import EstimatedCountPaginator
+
+User = get_user_model()
+
+class DatabaseStatsTests(APITestCase):
+
+    def setUp(self):
+        self.url = reverse('health-db')
+
+    # ✅ Without a pool, persistent-connection settings are reported
+    def test_connection_stats_without_pool(self):
+        stats = connection_stats()
+        self.assertFalse(stats['pooled'])
+        self.assertIn('conn_max_age', stats)
+        self.assertTrue(stats['connected'])
+
+    def test_stats_endpoint_is_admin_only(self):
+        user = User.objects.create_user(username='shopper', email='s@example.com', password='pass')
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = User.objects.create_user(username='admin', email='a@example.com', password='pass', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['databases'][0]['alias'], 'default')
+
+@override_settings(REPLICA_DATABASES=['replica_0'], REPLICA_MAX_LAG_SECONDS=5, REPLICA_LAG_CHECK_INTERVAL=60)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        routers._replica_health.clear()
+
+    # ✅ Outside of a request everything goes to the primary
+    def test_reads_use_primary_outside_requests(self):
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    @mock.patch('shoply.routers.replica_lag', return_value=0.2)
+    def test_safe_request_reads_from_replica(self, replica_lag):
+        token = routers.start_request_routing(use_replicas=True)
+        try:
+            self.assertEqual(self.router.db_for_read(Product), 'replica_0')
+            self.assertEqual(self.router.db_for_read(Product), 'replica_0')
+        finally:
+            routers.end_request_routing(token)
+        replica_lag.assert_called_once_with('replica_0')  # health is cached
+
+    # ✅ A lagging or unreachable replica falls back to the primary
+    @mock.patch('shoply.routers.replica_lag', return_value=30)
+    def test_lagging_replica_falls_back_to_primary(self, replica_lag):
+        token = routers.start_request_routing(use_replicas=True)
+        try:
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+        finally:
+            routers.end_request_routing(token)
+
+    # ✅ After a write, the rest of the request reads its own writes
+    @mock.patch('shoply.routers.replica_lag', return_value=0)
+    def test_write_pins_request_to_primary(self, replica_lag):
+        token = routers.start_request_routing(use_replicas=True)
+        try:
+            self.assertEqual(self.router.db_for_write(Product), 'default')
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+        finally:
+            state = routers.end_request_routing(token)
+        self.assertTrue(state.wrote)
+
+    def test_only_primary_is_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'products'))
+        self.assertFalse(self.router.allow_migrate('replica_0', 'products'))
+
+
+# The "replica" is the test database itself, so views work while routing is observed
+@override_settings(REPLICA_DATABASES=['default'])
+class ReplicaRoutingMiddlewareTests(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', email='a@example.com', password='pass', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+
+    @mock.patch('shoply.routers.choose_replica', return_value='default')
+    def test_client_is_pinned_after_writing(self, choose_replica):
+        self.client.get(reverse('product-list'))
+        self.assertTrue(choose_replica.called)
+
+        response = self.client.post(reverse('product-create'), {'name': "Desk", 'price': '99.00', 'stock': 3})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+
+        # The pin cookie now travels with the client: reads stay on the primary
+        choose_replica.reset_mock()
+        response = self.client.get(reverse('product-list'))
+        self.assertEqual(len(response.data), 1)
+        choose_replica.assert_not_called()
+
+
+class FastJSONTests(SimpleTestCase):
+
+    # ✅ Same bytes as DRF's JSONRenderer for serializer output
+    def test_matches_json_renderer(self):
+        data = [{'id': 1, 'name': "Áo thun \u2028", 'price': "19.99", 'tags': [], 'image': None,
+                 'when': datetime.datetime(2025, 1, 2, 3, 4, 5, 6, tzinfo=datetime.timezone.utc)}]
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    # ✅ Raw Decimals are exact strings, never floats
+    def test_decimal_is_exact_string(self):
+        rendered = FastJSONRenderer().render({'total_price': Decimal('12345678.10')})
+        self.assertEqual(rendered, b'{"total_price":"12345678.10"}')
+
+    def test_falls_back_without_orjson(self):
+        with mock.patch('shoply.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render({'a': 1}), b'{"a":1}')
+
+    def test_parser(self):
+        parsed = FastJSONParser().parse(io.BytesIO(b'{"items": [{"product": 1, "price": "19.99"}]}'))
+        self.assertEqual(parsed, {'items': [{'product': 1, 'price': "19.99"}]})
+
+
+@override_settings(COMPRESSION_ENABLED=True, COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTests(SimpleTestCase):
+
+    def respond(self, body, accept_encoding):
+        def view(request):
+            response = HttpResponse(body, content_type='application/json')
+            response['ETag'] = '"abc"'
+            return response
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(view)(request)
+
+    def test_gzip_above_threshold(self):
+        body = b'{"name":"product"}' * 50
+        response = self.respond(body, 'gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), body)
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_small_or_unaccepted_responses_are_untouched(self):
+        self.assertFalse(self.respond(b'{}', 'gzip').has_header('Content-Encoding'))
+        self.assertFalse(self.respond(b'x' * 500, 'identity').has_header('Content-Encoding'))
+        self.assertFalse(self.respond(b'x' * 500, 'gzip;q=0').has_header('Content-Encoding'))
+
+    def test_brotli_preferred_when_available(self):
+        body = b'{"name":"product"}' * 50
+        response = self.respond(body, 'gzip, deflate, br')
+        if brotli is None:
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+        else:
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertEqual(brotli.decompress(response.content), body)
+
+
+class MetricsTests(APITestCase):
+
+    def setUp(self):
+        self.registry = metrics.Registry()
+
+    # ✅ Per-thread shards add up to the exact total
+    def test_counter_across_threads(self):
+        counter = metrics.Counter('jobs_total', "Jobs.", ('kind',), registry=self.registry)
+        threads = [threading.Thread(target=lambda: [counter.inc('a') for _ in range(1000)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc('b', amount=5)
+        self.assertEqual(counter.collect(), {('a',): 4000, ('b',): 5})
+
+    def test_histogram_exposition(self):
+        histogram = metrics.Histogram('op_seconds', "Op.", ('op',), buckets=(0.1, 1), registry=self.registry)
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, 'read')
+        text = self.registry.render()
+        self.assertIn('# TYPE op_seconds histogram', text)
+        self.assertIn('op_seconds_bucket{op="read",le="0.1"} 1', text)
+        self.assertIn('op_seconds_bucket{op="read",le="1.0"} 2', text)
+        self.assertIn('op_seconds_bucket{op="read",le="+Inf"} 3', text)
+        self.assertIn('op_seconds_count{op="read"} 3', text)
+        self.assertIn('op_seconds_sum{op="read"} 5.55', text)
+
+    # ✅ Every worker's dump in METRICS_DIR is summed at scrape time
+    def test_aggregates_other_processes(self):
+        counter = metrics.Counter('jobs_total', "Jobs.", registry=self.registry)
+        counter.inc(amount=2)
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            other = {'jobs_total': {'type': 'counter', 'help': "Jobs.", 'labelnames': [], 'samples': [[[], 3]]}}
+            with open(os.path.join(directory, '999999.json'), 'w') as fh:
+                json.dump(other, fh)
+            self.assertIn('jobs_total 5', self.registry.render())
+
+    @override_settings(METRICS_PUBLIC=True)
+    def test_request_latency(self):
+        self.client.get(reverse('product-list'))
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('http_request_duration_seconds_count{view="product-list",method="GET",status="200"}', text)
+        self.assertIn('db_query_duration_seconds_count{alias="default"}', text)
+
+    # ✅ Scrapes need the token or a staff user unless the endpoint is made public
+    def test_access(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code,
+                             status.HTTP_403_FORBIDDEN)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer secret').status_code,
+                             status.HTTP_200_OK)
+
+        user = User.objects.create_user(username='shopper', email='s@example.com', password='pass')
+        admin = User.objects.create_user(username='admin', email='a@example.com', password='pass', is_staff=True)
+        response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class StackSamplerTests(SimpleTestCase):
+
+    # ✅ The sampler sees the sampled thread's own frames, root first
+    def test_collapsed_stacks(self):
+        def busy_loop():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        sampler = profiler.StackSampler(threading.get_ident(), 0.001).start()
+        busy_loop()
+        stacks = sampler.stop()
+        self.assertTrue(stacks)
+        hottest = stacks.most_common(1)[0][0]
+        self.assertTrue(hottest.endswith('busy_loop'), hottest)
+        self.assertIn('test_collapsed_stacks;', hottest)
+
+
+class ProfilerMiddlewareTests(APITestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.settings_override = override_settings(
+            PROFILER_ENABLED=True, PROFILER_DIR=self.directory.name, PROFILER_INTERVAL=0.001
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.admin = User.objects.create_user(username='admin', email='a@example.com', password='pass', is_staff=True)
+        self.shopper = User.objects.create_user(username='shopper', email='s@example.com', password='pass')
+
+    def get_products(self, user):
+        token = AccessToken.for_user(user)
+        return self.client.get(reverse('product-list'), HTTP_X_PROFILE='1', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_staff_header_stores_profile(self):
+        response = self.get_products(self.admin)
+        name = response['X-Profile-Id']
+        self.assertIn('-product-list-', name)
+
+        self.client.force_authenticate(user=self.admin)
+        listing = self.client.get(reverse('profile-list'))
+        self.assertEqual([p['name'] for p in listing.data['profiles']], [name])
+        download = self.client.get(reverse('profile-download', args=[name]))
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('profile-download', args=['x.txt'])).status_code, 404)
+
+    def test_header_ignored_for_non_staff(self):
+        response = self.get_products(self.shopper)
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertEqual(profiler.list_profiles(), [])
+
+    def test_sample_rate(self):
+        with override_settings(PROFILER_SAMPLE_RATE=1.0):
+            self.assertTrue(self.client.get(reverse('product-list')).has_header('X-Profile-Id'))
+
+
+class EstimatedCountTests(APITestCase):
+
+    def setUp(self):
+        Product.objects.bulk_create(Product(name=f"P{i}", price=i, stock=1) for i in range(5))
+        # Pretend to be PostgreSQL; the capped COUNT(*) still runs against the test database
+        postgres = mock.MagicMock(vendor='postgresql')
+        patcher = mock.patch('shoply.db.connections', {'default': postgres})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_exact_without_estimates(self):
+        with mock.patch('shoply.db.connections', {'default': mock.MagicMock(vendor='sqlite')}):
+            self.assertEqual(count_rows(Product.objects.all(), threshold=1), (5, False))
+
+    # ✅ Unfiltered: table statistics above the threshold, exact count below it
+    def test_unfiltered_uses_table_estimate(self):
+        with mock.patch('shoply.db.table_estimate', return_value=2_000_000):
+            self.assertEqual(count_rows(Product.objects.order_by('id'), threshold=100), (2_000_000, True))
+        with mock.patch('shoply.db.table_estimate', return_value=50):
+            self.assertEqual(count_rows(Product.objects.all(), threshold=100), (5, False))
+
+    # ✅ Filtered: a capped count decides, EXPLAIN only once the cap is reached
+    def test_filtered_uses_capped_count_then_plan(self):
+        with mock.patch('shoply.db.plan_estimate', return_value=900) as plan:
+            self.assertEqual(count_rows(Product.objects.filter(price__gte=2), threshold=10), (3, False))
+            plan.assert_not_called()
+            self.assertEqual(count_rows(Product.objects.filter(price__gte=2), threshold=3), (900, True))
+
+    def test_paginated_response_flags_estimate(self):
+        with mock.patch('shoply.db.table_estimate', return_value=2_000_000), \
+                override_settings(ESTIMATED_COUNT_THRESHOLD=100):
+            response = self.client.get(reverse('product-list'), {'page_size': 2})
+        self.assertEqual(response.data['count'], 2_000_000)
+        self.assertTrue(response.data['count_is_estimate'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(EstimatedCountPaginator([1, 2], 10).count, 2)
+
+    # ✅ An undercounting estimate neither hides nor 404s the real last pages
+    def test_pages_beyond_an_undercount(self):
+        with mock.patch('shoply.pagination.count_rows', return_value=(2, True)):
+            response = self.client.get(reverse('product-list'), {'page_size': 2, 'page': 2})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([row['name'] for row in response.data['results']], ["P2", "P3"])
+            self.assertIsNotNone(response.data['next'])
+            response = self.client.get(reverse('product-list'), {'page_size': 2, 'page': 3})
+            self.assertEqual([row['name'] for row in response.data['results']], ["P4"])
+            self.assertIsNone(response.data['next'])
@@ -1,13 +1,18 @@
-from django.urls import path
-from users.views import RegisterView, login
-from django.contrib import admin
-from django.urls import path, include
-
-urlpatterns = [
-    path('register/', RegisterView.as_view(), name='register'),
-    path('login/', login, name='login'),
-    path('api/users/', include('users.urls')),
-    path('admin/', admin.site.urls),
-    path('api/products/', include('products.urls')),
-    path('api/orders/', include('orders.urls')),
-]
\ No newline at end of file
+from django.urls import path
+from users.views import RegisterView, login
+from django.contrib import admin
+from django.urls import path, include
+from .views import DatabaseStatsView, ProfileDownloadView, ProfileListView, metrics_view
+
+urlpatterns = [
+    path('register/', RegisterView.as_view(), name='register'),
+    path('login/', login, name='login'),
+    path('api/users/', include('users.urls')),
+    path('admin/', admin.site.urls),
+    path('api/products/', include('products.urls')),
+    path('api/orders/', include('orders.urls')),
+    path('api/health/db/', DatabaseStatsView.as_view(), name='health-db'),
+    path('metrics', metrics_view, name='metrics'),
+    path('api/health/profiles/', ProfileListView.as_view(), name='profile-list'),
+    path('api/health/profiles/<str:name>/', ProfileDownloadView.as_view(), name='profile-download'),
+]
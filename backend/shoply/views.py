@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from . import metrics, profiler
+from .db import connection_stats
+from .middleware import is_staff_request
+
+# ✅ Connection reuse and pool wait statistics per database (Admin only)
+class DatabaseStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({"databases": [connection_stats(alias) for alias in settings.DATABASES]})
+
+
+# ✅ Prometheus scrape endpoint (bearer METRICS_TOKEN or staff; public only with METRICS_PUBLIC)
+def metrics_view(request):
+    if not settings.METRICS_PUBLIC:
+        token = settings.METRICS_TOKEN
+        authorization = request.headers.get('Authorization', '')
+        if not (token and constant_time_compare(authorization, f"Bearer {token}")) and not is_staff_request(request):
+            return HttpResponseForbidden()
+    return HttpResponse(metrics.REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ✅ Stored request profiles, newest first (Admin only)
+class ProfileListView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({"profiles": profiler.list_profiles()})
+
+
+# ✅ Download one profile in collapsed-stack format for flamegraph tools (Admin only)
+class ProfileDownloadView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, name):
+        path = profiler.profile_path(name)
+        if path is None:
+            raise Http404
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=name, content_type='text/plain')
@@ -0,0 +1,18 @@
+from django.contrib import admin
+from shoply.pagination import EstimatedCountPaginator
+from .models import RetentionCheckpoint, Task
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'run_at', 'attempts', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('=key',)
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(RetentionCheckpoint)
+class RetentionCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('policy', 'cutoff', 'rows_deleted', 'total_deleted', 'started_at', 'finished_at')
+    readonly_fields = [field.name for field in RetentionCheckpoint._meta.fields]
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from tasks import retention
+
+
+class Command(BaseCommand):
+    help = ("Delete rows past their retention (order status history, expired JWTs, expired "
+            "sessions, finished tasks, old product changes) in small keyed batches with a pause between them. An "
+            "interrupted run resumes from its checkpoint. Defaults to every policy.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('policies', nargs='*', metavar='policy',
+                            help=f"Any of: {', '.join(retention.POLICIES)}.")
+        parser.add_argument('--batch-size', type=int, default=settings.RETENTION_BATCH_SIZE)
+        parser.add_argument('--sleep', type=float, default=settings.RETENTION_SLEEP,
+                            help="Seconds to pause between batches.")
+        parser.add_argument('--max-seconds', type=float, default=None,
+                            help="Stop after this long; the next run carries on from the checkpoint.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the rows a run would delete.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        try:
+            selected = retention.policies(options['policies'])
+        except LookupError as e:
+            raise CommandError(str(e))
+
+        if options['dry_run']:
+            for label, count in retention.pending_counts(options['policies']).items():
+                self.stdout.write(f"{label}: {count} rows to delete")
+            return
+
+        def progress(checkpoint, deleted):
+            self.stdout.write(f"{checkpoint.policy}: deleted {deleted} rows "
+                              f"({checkpoint.rows_deleted} this run, up to key {checkpoint.last_key})")
+
+        results = retention.apply_all(options['policies'], options['batch_size'], options['sleep'],
+                                      options['max_seconds'], progress)
+        for label, _ in selected:
+            checkpoint = results.get(label)
+            if checkpoint is None:
+                self.stdout.write(f"{label}: not reached, time is up")
+            elif checkpoint.finished_at:
+                self.stdout.write(self.style.SUCCESS(f"{label}: done, {checkpoint.rows_deleted} rows deleted"))
+            else:
+                self.stdout.write(f"{label}: paused after {checkpoint.rows_deleted} rows, resumes next run")
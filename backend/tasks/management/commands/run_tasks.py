@@ -0,0 +1,92 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connections
+from tasks.queue import claim_tasks, enqueue_periodic_tasks, execute, requeue_stale_tasks
+
+logger = logging.getLogger(__name__)
+
+
+def work(worker_id, stop, batch_size, poll_interval, once):
+    """One worker loop: claim a batch, run it, sleep only when the queue is empty."""
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                batch = claim_tasks(worker_id, batch_size)
+                for row in batch:
+                    execute(row)
+            except DatabaseError:
+                # Unfinished tasks stay 'running' until their lease expires and are requeued
+                logger.exception("Worker %s lost its database connection", worker_id)
+                batch = []
+            if not batch:
+                if once:
+                    return
+                stop.wait(poll_interval)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ("Run background task workers (threads or processes) against the tasks.Task table. "
+            "Workers claim due tasks in batches with SELECT ... FOR UPDATE SKIP LOCKED, so any "
+            "number of run_tasks processes can share the queue. Also queues TASKS_PERIODIC entries.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread',
+                            help="Processes suit CPU-bound tasks; they need a platform with fork().")
+        parser.add_argument('--batch-size', type=int, default=settings.TASKS_BATCH_SIZE,
+                            help="Tasks claimed per round trip.")
+        parser.add_argument('--poll-interval', type=float, default=settings.TASKS_POLL_INTERVAL,
+                            help="Seconds to wait when no task is due.")
+        parser.add_argument('--once', action='store_true', help="Exit once no task is due.")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError("--workers must be at least 1.")
+        if options['mode'] == 'process' and 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError("--mode process needs fork(); use --mode thread on this platform.")
+
+        requeue_stale_tasks()
+        enqueue_periodic_tasks()
+        if options['mode'] == 'thread':
+            stop = threading.Event()
+            workers = [threading.Thread(target=work, args=self.worker_args(n, stop, options), daemon=True)
+                       for n in range(options['workers'])]
+        else:
+            context = multiprocessing.get_context('fork')
+            stop = context.Event()
+            connections.close_all()  # children must not share the parent's sockets
+            workers = [context.Process(target=work, args=self.worker_args(n, stop, options), daemon=True)
+                       for n in range(options['workers'])]
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} {options['mode']} worker(s)")
+
+        last_maintenance = time.monotonic()
+        while any(worker.is_alive() for worker in workers):
+            stop.wait(1)
+            if not stop.is_set() and time.monotonic() - last_maintenance >= 1:
+                close_old_connections()
+                requeue_stale_tasks()
+                enqueue_periodic_tasks()
+                last_maintenance = time.monotonic()
+        stop.set()
+        for worker in workers:
+            worker.join()
+        connections.close_all()
+
+    def worker_args(self, number, stop, options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{number}"
+        return worker_id, stop, options['batch_size'], options['poll_interval'], options['once']
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetentionCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('policy', models.CharField(max_length=100, unique=True)),
+                ('cutoff', models.DateTimeField(blank=True, null=True)),
+                ('last_key', models.CharField(blank=True, max_length=255)),
+                ('rows_deleted', models.BigIntegerField(default=0)),
+                ('total_deleted', models.BigIntegerField(default=0)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
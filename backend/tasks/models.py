@@ -0,0 +1,59 @@
+from django.db import models
+from django.utils import timezone
+
+class Task(models.Model):
+    """
+    A unit of deferred work, claimed by `manage.py run_tasks` workers with
+    SELECT ... FOR UPDATE SKIP LOCKED. Finished rows are kept for inspection.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200)  # dotted path of a function registered with @task
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    # Optional de-duplication key, e.g. one row per periodic task and interval
+    key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # ✅ Workers only ever scan due, queued rows
+            models.Index(fields=['run_at'], name='task_due_idx', condition=models.Q(status='queued')),
+            models.Index(fields=['locked_at'], name='task_running_idx', condition=models.Q(status='running')),
+        ]
+
+    def __str__(self):
+        return f"{self.name} [{self.status}]"
+
+
+class RetentionCheckpoint(models.Model):
+    """How far the current (or last) run of one retention policy got; see tasks/retention.py."""
+    policy = models.CharField(max_length=100, unique=True)
+    cutoff = models.DateTimeField(null=True, blank=True)  # rows older than this go in the current run
+    last_key = models.CharField(max_length=255, blank=True)  # primary key of the last deleted row
+    rows_deleted = models.BigIntegerField(default=0)  # in the current run
+    total_deleted = models.BigIntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)  # empty while a run is unfinished
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        state = 'finished' if self.finished_at else 'in progress'
+        return f"{self.policy}: {self.rows_deleted} rows ({state})"
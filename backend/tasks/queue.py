@@ -0,0 +1,165 @@
+"""
+Database-backed task queue.
+
+    from tasks.queue import task
+
+    @task(max_attempts=3)
+    def send_receipt(order_id):
+        ...
+
+    send_receipt.delay(order.id)                 # as soon as a worker is free
+    send_receipt.schedule(run_at, order.id)      # not before run_at
+
+Tasks are rows in tasks.Task written in the caller's transaction, so they are
+only visible to workers if the surrounding write commits. With TASKS_EAGER the
+function runs inline instead, which is how the project behaved before the queue.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from shoply import metrics
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# dotted name -> function
+registry = {}
+
+
+def task(func=None, *, max_attempts=None):
+    """Register ``func`` as a task and give it ``.delay()`` and ``.schedule()``."""
+    def register(func):
+        name = f"{func.__module__}.{func.__name__}"
+        registry[name] = func
+        func.task_name = name
+        func.delay = lambda *args, **kwargs: enqueue(name, args, kwargs, max_attempts=max_attempts)
+        func.schedule = lambda run_at, *args, **kwargs: enqueue(
+            name, args, kwargs, run_at=run_at, max_attempts=max_attempts
+        )
+        return func
+    return register(func) if func is not None else register
+
+
+def enqueue(name, args=(), kwargs=None, run_at=None, max_attempts=None, key=None):
+    """Queue a registered task; returns the Task (None when run eagerly or ``key`` already exists)."""
+    if name not in registry:
+        raise LookupError(f"Unknown task {name!r}")
+    if settings.TASKS_EAGER:
+        registry[name](*args, **(kwargs or {}))
+        return None
+    return insert_task(name, args, kwargs, run_at, max_attempts, key)
+
+
+def insert_task(name, args=(), kwargs=None, run_at=None, max_attempts=None, key=None):
+    row = Task(name=name, args=list(args), kwargs=kwargs or {}, run_at=run_at or timezone.now(),
+               max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS, key=key)
+    try:
+        with transaction.atomic():
+            row.save()
+    except IntegrityError:  # another row already holds ``key``
+        return None
+    return row
+
+
+def claim_tasks(worker_id, limit):
+    """Lock up to ``limit`` due tasks for this worker; concurrent workers skip each other's rows."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status=Task.QUEUED, run_at__lte=now)
+            .order_by('run_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Task.objects.filter(id__in=ids).update(
+            status=Task.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1
+        )
+    return list(Task.objects.filter(id__in=ids).order_by('run_at'))
+
+
+def retry_delay(attempts):
+    """Exponential backoff with +/-10% jitter so failed tasks do not retry in lockstep."""
+    delay = min(settings.TASKS_RETRY_BASE_DELAY * 2 ** (attempts - 1), settings.TASKS_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.9, 1.1)
+
+
+def execute(row):
+    """
+    Run one claimed task and record the outcome (success, retry or failure).
+
+    The lease starts again here rather than at claim time, so tasks waiting behind
+    a long one in the same batch are not requeued under the worker. A task whose
+    lease already ran out (requeued, possibly claimed elsewhere) is left alone: None.
+    """
+    renewed = Task.objects.filter(pk=row.pk, status=Task.RUNNING, locked_by=row.locked_by).update(
+        locked_at=timezone.now()
+    )
+    if not renewed:
+        logger.warning("Task %s (%s) lost its lease before it started; skipped", row.pk, row.name)
+        return None
+    func = registry.get(row.name)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task {row.name!r}")
+        func(*row.args, **row.kwargs)
+    except Exception:
+        row.last_error = traceback.format_exc()
+        if row.attempts >= row.max_attempts:
+            row.status = Task.FAILED
+            row.finished_at = timezone.now()
+            logger.error("Task %s (%s) failed permanently", row.pk, row.name)
+        else:
+            row.status = Task.QUEUED
+            row.run_at = timezone.now() + timedelta(seconds=retry_delay(row.attempts))
+    else:
+        row.status = Task.SUCCEEDED
+        row.finished_at = timezone.now()
+    row.save(update_fields=['status', 'run_at', 'last_error', 'finished_at'])
+    return row.status
+
+
+def requeue_stale_tasks():
+    """Give tasks held by a crashed worker (lease expired) back to the queue."""
+    expired = timezone.now() - timedelta(seconds=settings.TASKS_LEASE_SECONDS)
+    return Task.objects.filter(status=Task.RUNNING, locked_at__lt=expired).update(status=Task.QUEUED)
+
+
+# label -> last interval queued by this process, to skip the INSERT until the next one
+_periodic_slots = {}
+
+
+def enqueue_periodic_tasks(now=None):
+    """
+    Queue every TASKS_PERIODIC entry whose interval has started. The key names
+    the interval, so several run_tasks processes never queue the same one twice.
+    """
+    now = now or timezone.now()
+    for label, entry in settings.TASKS_PERIODIC.items():
+        slot = int(now.timestamp() // entry['interval'])
+        if _periodic_slots.get(label) == slot:
+            continue
+        if entry['task'] not in registry:
+            raise ImproperlyConfigured(f"TASKS_PERIODIC[{label!r}] names unknown task {entry['task']!r}")
+        insert_task(entry['task'], entry.get('args', ()), entry.get('kwargs'),
+                    key=f"periodic:{label}:{slot}")
+        _periodic_slots[label] = slot
+
+
+def register_metrics():
+    def queue_depth():
+        rows = Task.objects.filter(status=Task.QUEUED).values('name').annotate(n=Count('id'))
+        return [((row['name'],), row['n']) for row in rows]
+
+    metrics.REGISTRY.register_gauge(
+        'task_queue_depth', "Queued tasks by task name (emails: users.tasks.send_email).",
+        ('task',), queue_depth,
+    )
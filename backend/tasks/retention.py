@@ -0,0 +1,152 @@
+"""
+Retention: delete rows nobody needs any more without long locks.
+
+Each policy names a model, the timestamp column that ages its rows and how old
+they may get. apply() deletes matching rows in primary-key order, at most
+RETENTION_BATCH_SIZE per short transaction with RETENTION_SLEEP seconds between
+batches, so other writers are only ever blocked for one small batch. Progress is
+kept in RetentionCheckpoint: a run interrupted by a deploy, a crash or its time
+budget resumes after the last deleted key with the same cutoff, instead of
+rescanning the rows it already kept.
+
+    python manage.py apply_retention                     # every policy
+    python manage.py apply_retention sessions --dry-run  # what would go
+
+The apply-retention periodic task runs the same code with a time budget.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import RetentionCheckpoint, Task
+
+logger = logging.getLogger(__name__)
+
+
+class Policy:
+    """
+    Rows of ``model`` (``'app_label.Model'``) whose ``field`` is older than the
+    ``max_age`` setting in days (0: older than now, for expiry timestamps).
+    Skipped when ``model``'s app is not installed.
+    """
+
+    def __init__(self, model, field, max_age=None, filters=None):
+        self.model_name = model
+        self.field = field
+        self.max_age = max_age
+        self.filters = filters or {}
+
+    @property
+    def installed(self):
+        try:
+            apps.get_app_config(self.model_name.split('.')[0])
+        except LookupError:
+            return False
+        return True
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_name)
+
+    def cutoff(self, now):
+        days = getattr(settings, self.max_age) if self.max_age else 0
+        return now - timedelta(days=days)
+
+    def expired(self, cutoff):
+        return self.model._default_manager.filter(**{f"{self.field}__lt": cutoff}, **self.filters)
+
+
+# label -> policy, applied in this order (blacklisted tokens before the outstanding tokens they point at)
+POLICIES = {
+    'order-status-history': Policy('orders.OrderStatusHistory', 'changed_at', 'RETENTION_STATUS_HISTORY_DAYS'),
+    'archived-order-status-history': Policy(
+        'orders.ArchivedOrderStatusHistory', 'changed_at', 'RETENTION_STATUS_HISTORY_DAYS'),
+    'blacklisted-tokens': Policy('token_blacklist.BlacklistedToken', 'token__expires_at'),
+    'outstanding-tokens': Policy('token_blacklist.OutstandingToken', 'expires_at'),
+    'sessions': Policy('sessions.Session', 'expire_date'),
+    'finished-tasks': Policy('tasks.Task', 'finished_at', 'RETENTION_FINISHED_TASK_DAYS',
+                             filters={'status__in': [Task.SUCCEEDED, Task.FAILED]}),
+    # Consumers further behind than this get 410 from /api/products/changes/ and resync
+    'product-changes': Policy('products.ProductChange', 'changed_at', 'RETENTION_PRODUCT_CHANGE_DAYS'),
+}
+
+
+def policies(labels=None):
+    """``[(label, policy), ...]`` for ``labels`` (default: all) whose app is installed."""
+    unknown = set(labels or ()) - set(POLICIES)
+    if unknown:
+        raise LookupError(f"Unknown retention policies: {', '.join(sorted(unknown))}")
+    return [(label, policy) for label, policy in POLICIES.items()
+            if (not labels or label in labels) and policy.installed]
+
+
+def checkpoint_for(label, policy, now):
+    """The policy's checkpoint, with a new run (cutoff, no position) started unless one is unfinished."""
+    checkpoint, _ = RetentionCheckpoint.objects.get_or_create(policy=label)
+    if checkpoint.started_at is None or checkpoint.finished_at is not None:
+        checkpoint.cutoff = policy.cutoff(now)
+        checkpoint.last_key = ''
+        checkpoint.rows_deleted = 0
+        checkpoint.started_at = now
+        checkpoint.finished_at = None
+        checkpoint.save()
+    return checkpoint
+
+
+def apply(label, batch_size=None, sleep=None, deadline=None, progress=None):
+    """
+    Delete ``label``'s expired rows batch by batch from its checkpoint. Stops early
+    at ``deadline`` (a time.monotonic() value) and resumes there next time.
+    ``progress(checkpoint, deleted)`` is called after every batch. Returns the checkpoint.
+    """
+    policy = POLICIES[label]
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    sleep = settings.RETENTION_SLEEP if sleep is None else sleep
+    checkpoint = checkpoint_for(label, policy, timezone.now())
+    model = policy.model
+    expired = policy.expired(checkpoint.cutoff).order_by('pk')
+
+    while True:
+        pending = expired
+        if checkpoint.last_key:
+            pending = pending.filter(pk__gt=model._meta.pk.to_python(checkpoint.last_key))
+        with transaction.atomic():
+            keys = list(pending.values_list('pk', flat=True)[:batch_size])
+            if keys:
+                # Through the ORM so cascades (e.g. blacklist rows of a token) go too, within the batch
+                deleted = model._default_manager.filter(pk__in=keys).delete()[0]
+                checkpoint.last_key = str(keys[-1])
+                checkpoint.rows_deleted += deleted
+                checkpoint.total_deleted += deleted
+            if len(keys) < batch_size:
+                checkpoint.finished_at = timezone.now()
+            checkpoint.save()
+        if keys:
+            logger.info("Retention %s: deleted %s rows (%s this run)", label, deleted, checkpoint.rows_deleted)
+            if progress:
+                progress(checkpoint, deleted)
+        if checkpoint.finished_at or (deadline is not None and time.monotonic() >= deadline):
+            return checkpoint
+        if sleep:
+            time.sleep(sleep)
+
+
+def apply_all(labels=None, batch_size=None, sleep=None, max_seconds=None, progress=None):
+    """Apply every policy in turn within ``max_seconds``; returns ``{label: checkpoint}`` of those reached."""
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    results = {}
+    for label, _ in policies(labels):
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        results[label] = apply(label, batch_size, sleep, deadline, progress)
+    return results
+
+
+def pending_counts(labels=None, now=None):
+    """``{label: rows}`` a new run would delete now, for dry runs."""
+    now = now or timezone.now()
+    return {label: policy.expired(policy.cutoff(now)).count() for label, policy in policies(labels)}
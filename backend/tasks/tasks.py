@@ -0,0 +1,8 @@
+from django.conf import settings
+from .queue import task
+from . import retention
+
+@task(max_attempts=1)
+def apply_retention():
+    """Run the retention policies for at most RETENTION_MAX_SECONDS (TASKS_PERIODIC); the next run resumes."""
+    retention.apply_all(max_seconds=settings.RETENTION_MAX_SECONDS)
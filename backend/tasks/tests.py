@@ -0,0 +1,220 @@
+import io
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+from orders.models import Order, OrderStatusHistory
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from users.tasks import send_email
+from . import queue, retention
+from .models import RetentionCheckpoint, Task
+
+calls = []
+
+
+@queue.task(max_attempts=2)
+def record(value):
+    calls.append(value)
+
+
+@queue.task
+def explode():
+    raise RuntimeError("boom")
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    # ✅ delay() only writes a row; a worker runs it
+    def test_delay_and_execute(self):
+        row = record.delay(3)
+        self.assertEqual(calls, [])
+        [claimed] = queue.claim_tasks('test-worker', 10)
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (row.pk, Task.RUNNING, 1))
+        self.assertEqual(queue.execute(claimed), Task.SUCCEEDED)
+        self.assertEqual(calls, [3])
+
+    def test_scheduled_tasks_wait_until_due(self):
+        record.schedule(timezone.now() + timedelta(hours=1), 1)
+        self.assertEqual(queue.claim_tasks('test-worker', 10), [])
+
+    def test_batch_claim_is_limited(self):
+        for value in range(5):
+            record.delay(value)
+        self.assertEqual(len(queue.claim_tasks('test-worker', 3)), 3)
+        self.assertEqual(len(queue.claim_tasks('test-worker', 3)), 2)
+
+    # ✅ Failures retry with exponential backoff until max_attempts
+    @override_settings(TASKS_RETRY_BASE_DELAY=10, TASKS_MAX_ATTEMPTS=3)
+    def test_retry_with_backoff_then_fail(self):
+        explode.delay()
+        [row] = queue.claim_tasks('test-worker', 1)
+        self.assertEqual(queue.execute(row), Task.QUEUED)
+        self.assertGreater(row.run_at, timezone.now() + timedelta(seconds=8))
+        self.assertIn('RuntimeError: boom', row.last_error)
+
+        Task.objects.filter(pk=row.pk).update(run_at=timezone.now())
+        [row] = queue.claim_tasks('test-worker', 1)
+        self.assertEqual(queue.execute(row), Task.QUEUED)
+
+        Task.objects.filter(pk=row.pk).update(run_at=timezone.now())
+        [row] = queue.claim_tasks('test-worker', 1)
+        self.assertEqual(row.attempts, 3)
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            self.assertEqual(queue.execute(row), Task.FAILED)
+        self.assertIsNotNone(row.finished_at)
+
+    @override_settings(TASKS_LEASE_SECONDS=60)
+    def test_stale_running_tasks_are_requeued(self):
+        record.delay(1)
+        [row] = queue.claim_tasks('crashed-worker', 1)
+        Task.objects.filter(pk=row.pk).update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(queue.requeue_stale_tasks(), 1)
+        self.assertEqual(len(queue.claim_tasks('test-worker', 1)), 1)
+
+    # ✅ Each task's lease starts when it runs: a long batch does not get its tail run twice
+    @override_settings(TASKS_LEASE_SECONDS=60)
+    def test_lease_is_renewed_per_task(self):
+        record.delay(1)
+        record.delay(2)
+        first, second = queue.claim_tasks('slow-worker', 2)
+        Task.objects.filter(pk__in=[first.pk, second.pk]).update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(queue.execute(first), Task.SUCCEEDED)
+        self.assertEqual(queue.requeue_stale_tasks(), 1)  # only the one still waiting
+
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            self.assertIsNone(queue.execute(second))
+        [again] = queue.claim_tasks('test-worker', 1)
+        self.assertEqual(queue.execute(again), Task.SUCCEEDED)
+        self.assertEqual(calls, [1, 2])
+
+    # ✅ One row per periodic interval, however often it is checked
+    @override_settings(TASKS_PERIODIC={'tick': {'task': record.task_name, 'interval': 60, 'args': [7]}})
+    def test_periodic_tasks_are_deduplicated(self):
+        now = timezone.now()
+        queue._periodic_slots.clear()
+        queue.enqueue_periodic_tasks(now)
+        queue._periodic_slots.clear()  # as if a second run_tasks process checked too
+        queue.enqueue_periodic_tasks(now)
+        queue.enqueue_periodic_tasks(now + timedelta(seconds=60))
+        self.assertEqual(Task.objects.filter(name=record.task_name).count(), 2)
+
+    def test_emails_are_queued(self):
+        send_email.delay("Subject", "Body", 'noreply@example.com', ['user@example.com'])
+        self.assertEqual(len(mail.outbox), 0)
+        queue.execute(queue.claim_tasks('test-worker', 1)[0])
+        self.assertEqual(mail.outbox[0].subject, "Subject")
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        self.assertIsNone(record.delay(5))
+        self.assertEqual(calls, [5])
+        self.assertFalse(Task.objects.exists())
+
+
+@override_settings(TASKS_EAGER=False)
+class RunTasksCommandTests(TransactionTestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_worker_drains_queue_in_batches(self):
+        for value in range(20):
+            record.delay(value)
+        # One worker: the in-memory SQLite test database locks whole tables
+        with mock.patch('signal.signal'):
+            call_command('run_tasks', workers=1, once=True, batch_size=4, stdout=io.StringIO())
+        self.assertEqual(sorted(calls), list(range(20)))
+        self.assertEqual(Task.objects.filter(name=record.task_name, status=Task.SUCCEEDED).count(), 20)
+
+    # ✅ Concurrent workers claim with SKIP LOCKED: every task runs exactly once
+    @skipUnlessDBFeature('has_select_for_update_skip_locked')  # SQLite locks the whole database
+    def test_concurrent_workers_never_share_a_task(self):
+        for value in range(60):
+            record.delay(value)
+        with mock.patch('signal.signal'):
+            call_command('run_tasks', workers=4, once=True, batch_size=2, stdout=io.StringIO())
+        self.assertEqual(sorted(calls), list(range(60)))
+        rows = Task.objects.filter(name=record.task_name)
+        self.assertEqual(rows.filter(status=Task.SUCCEEDED, attempts=1).count(), 60)
+
+
+class RetentionTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='keeper', email='keeper@example.com', password='pass')
+        self.order = Order.objects.create(user=self.user)
+        self.now = timezone.now()
+
+    def history(self, days_ago):
+        row = OrderStatusHistory.objects.create(order=self.order, previous_status='pending', new_status='shipped')
+        OrderStatusHistory.objects.filter(pk=row.pk).update(changed_at=self.now - timedelta(days=days_ago))
+        return row
+
+    def token(self, jti, expires_in_days, blacklisted=False):
+        token = OutstandingToken.objects.create(user=self.user, jti=jti, token=jti,
+                                                expires_at=self.now + timedelta(days=expires_in_days))
+        if blacklisted:
+            BlacklistedToken.objects.create(token=token)
+        return token
+
+    # ✅ Only rows past their retention go, a few per batch
+    @override_settings(RETENTION_STATUS_HISTORY_DAYS=365)
+    def test_status_history_is_deleted_in_batches(self):
+        old = [self.history(400) for _ in range(5)]
+        recent = self.history(10)
+        out = io.StringIO()
+        call_command('apply_retention', 'order-status-history', batch_size=2, sleep=0, stdout=out)
+        self.assertEqual(list(OrderStatusHistory.objects.values_list('pk', flat=True)), [recent.pk])
+        checkpoint = RetentionCheckpoint.objects.get(policy='order-status-history')
+        self.assertEqual((checkpoint.rows_deleted, checkpoint.last_key), (5, str(old[-1].pk)))
+        self.assertIsNotNone(checkpoint.finished_at)
+        self.assertEqual(out.getvalue().count('deleted 2 rows'), 2)
+        self.assertIn('done, 5 rows deleted', out.getvalue())
+
+    def test_expired_tokens_sessions_and_tasks(self):
+        self.token('expired-blacklisted', -1, blacklisted=True)
+        self.token('expired', -1)
+        live = self.token('live', 1, blacklisted=True)
+        Session.objects.create(session_key='old', session_data='', expire_date=self.now - timedelta(hours=1))
+        Session.objects.create(session_key='new', session_data='', expire_date=self.now + timedelta(hours=1))
+        queued = Task.objects.create(name='t')
+        Task.objects.create(name='t', status=Task.SUCCEEDED, finished_at=self.now - timedelta(days=90))
+
+        results = retention.apply_all(sleep=0)
+        self.assertEqual(list(OutstandingToken.objects.all()), [live])
+        self.assertEqual(list(BlacklistedToken.objects.values_list('token', flat=True)), [live.pk])
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['new'])
+        self.assertEqual(list(Task.objects.all()), [queued])
+        self.assertEqual(results['blacklisted-tokens'].rows_deleted, 1)
+        self.assertEqual(results['outstanding-tokens'].rows_deleted, 2)
+
+    # ✅ An interrupted run carries on from its last key with the same cutoff
+    def test_resumes_from_checkpoint(self):
+        for _ in range(3):
+            self.history(800)
+        with override_settings(RETENTION_STATUS_HISTORY_DAYS=365):
+            checkpoint = retention.apply('order-status-history', batch_size=1, sleep=0, deadline=0)
+        self.assertIsNone(checkpoint.finished_at)
+        self.assertEqual(OrderStatusHistory.objects.count(), 2)
+
+        with override_settings(RETENTION_STATUS_HISTORY_DAYS=1000):  # ignored until this run finishes
+            checkpoint = retention.apply('order-status-history', batch_size=1, sleep=0)
+        self.assertEqual(checkpoint.rows_deleted, 3)
+        self.assertFalse(OrderStatusHistory.objects.exists())
+
+    def test_dry_run_and_unknown_policy(self):
+        self.history(1000)
+        out = io.StringIO()
+        call_command('apply_retention', 'order-status-history', 'sessions', dry_run=True, stdout=out)
+        self.assertIn('order-status-history: 1 rows to delete', out.getvalue())
+        self.assertEqual(OrderStatusHistory.objects.count(), 1)
+        with self.assertRaises(CommandError):
+            call_command('apply_retention', 'nonsense', stdout=io.StringIO())
@@ -1,3 +1,17 @@
-from django.contrib import admin
-
-# Register your models here.
+from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from shoply.pagination import EstimatedCountPaginator
+from .models import User
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    list_display = ('username', 'email', 'is_verified', 'is_staff', 'date_joined')
+    list_filter = ('is_staff', 'is_active', 'is_verified')
+    search_fields = ('=username', '=email')  # unique indexes; no LIKE scans
+    ordering = ('-id',)
+    fieldsets = BaseUserAdmin.fieldsets + (
+        ('Shop', {'fields': ('is_verified', 'profile_image')}),
+    )
+    # ✅ Planner estimate instead of COUNT(*) on large tables
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
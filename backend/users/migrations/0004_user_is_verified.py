@@ -1,18 +1,18 @@
-# Generated by Django 5.1.7 on 2025-03-24 07:19
-
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('users', '0003_alter_user_groups_alter_user_user_permissions_and_more'),
-    ]
-
-    operations = [
-        migrations.AddField(
-            model_name='user',
-            name='is_verified',
-            field=models.BooleanField(default=False),
-        ),
-    ]
+# Generated by Django 5.1.7 on 2025-03-24 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_user_groups_alter_user_user_permissions_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='is_verified',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,7 @@
+from django.core.mail import send_mail
+from tasks.queue import task
+
+@task
+def send_email(subject, message, from_email, recipient_list):
+    """Deliver an email from a task worker instead of the request thread."""
+    send_mail(subject, message, from_email, recipient_list, fail_silently=False)